@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址资源库
+知识库中的大量页面会重复使用同一批图标、示意图和图片。资源库按内容的SHA-256保存文件，
+同一个资源在一批导出中只下载一次，各文档通过硬链接（跨文件系统时复制）引用同一份内容；
+资源库总大小超过上限时，按最近使用时间淘汰（本次运行用到的资源不会被淘汰）。
+URL到内容的映射只在本次运行内有效（同一URL背后的图片可能被替换），跨运行只按内容哈希复用：
+以后的运行仍要下载一次，但内容未变时不再保存新的副本。
+
+资源库目录结构：
+    <root>/index.db                 索引（SQLite）：资源大小和最近使用时间
+    <root>/objects/ab/abcdef....png  资源文件（以内容哈希命名）
+
+合并PDF时，dedupe_pdf_images()（或可分批调用的 PdfImageDeduper）把不同文档中内容相同的图片对象合并为同一个对象。
+
+用法：
+    python3 asset_store.py stats --root ./feishu_exports/.assets
+    python3 asset_store.py evict --root ./feishu_exports/.assets --max-mb 512
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+DEFAULT_MAX_MB = 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    sha256 TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_assets_last_used ON assets(last_used);
+
+-- 旧版本跨运行保存的URL映射（不再使用）
+DROP TABLE IF EXISTS urls;
+"""
+
+
+class AssetStore:
+    def __init__(self, root, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        """
+        初始化资源库
+
+        Args:
+            root (str): 资源库目录
+            max_bytes (int): 资源库总大小上限（字节），0表示不限制
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), timeout=30,
+                                     isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+        # 本次运行中用到的资源（不参与淘汰）
+        self._pinned = set()
+        # 本次运行中下载过的URL → 内容哈希
+        self._urls = {}
+
+        self.references = 0          # 文档引用资源的次数
+        self.url_hits = 0            # 通过URL命中、无需下载的次数
+        self.content_hits = 0        # 下载后发现内容已存在的次数
+        self.downloaded_bytes = 0    # 实际下载的字节数
+        self.bytes_saved = 0         # 因去重而无需下载或保存的字节数
+        self.evicted = 0
+
+    def object_path(self, sha256, ext):
+        """资源文件路径"""
+        return os.path.join(self.root, "objects", sha256[:2], sha256 + ext)
+
+    def lookup_url(self, url):
+        """
+        按URL查找本次运行中已下载的资源（命中时记为一次引用）
+
+        Returns:
+            tuple: (sha256, 资源文件路径)，未命中时返回 None
+        """
+        with self._lock:
+            sha256 = self._urls.get(url)
+            if not sha256:
+                return None
+            row = self._conn.execute("SELECT sha256, ext, size_bytes FROM assets WHERE sha256 = ?",
+                                     (sha256,)).fetchone()
+            path = self.object_path(sha256, row['ext']) if row else None
+            if not path or not os.path.exists(path):
+                del self._urls[url]
+                if row:
+                    self._conn.execute("DELETE FROM assets WHERE sha256 = ?", (sha256,))
+                return None
+            self.url_hits += 1
+            self.bytes_saved += row['size_bytes']
+            self._touch(row['sha256'])
+            return row['sha256'], path
+
+    def put(self, data, ext="", url=None):
+        """
+        保存下载到的资源（内容已存在时只增加引用）
+
+        Args:
+            data (bytes): 资源内容
+            ext (str): 文件扩展名（如 ".png"）
+            url (str): 资源的原始URL，本次运行中之后可通过 lookup_url 直接命中
+
+        Returns:
+            tuple: (sha256, 资源文件路径)
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        self.downloaded_bytes += len(data)
+        with self._lock:
+            row = self._conn.execute("SELECT ext FROM assets WHERE sha256 = ?", (sha256,)).fetchone()
+            if row and os.path.exists(self.object_path(sha256, row['ext'])):
+                ext = row['ext']
+                self.content_hits += 1
+                self.bytes_saved += len(data)
+            else:
+                path = self.object_path(sha256, ext)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+                now = time.time()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO assets (sha256, ext, size_bytes, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)", (sha256, ext, len(data), now, now))
+            if url:
+                self._urls[url] = sha256
+            self._touch(sha256)
+        self.evict()
+        return sha256, self.object_path(sha256, ext)
+
+    def _touch(self, sha256):
+        self.references += 1
+        self._pinned.add(sha256)
+        self._conn.execute("UPDATE assets SET last_used = ?, uses = uses + 1 WHERE sha256 = ?",
+                           (time.time(), sha256))
+
+    def link(self, source, target):
+        """让文档目录中的文件引用资源库中的同一份内容（硬链接，失败时复制）"""
+        if os.path.exists(target):
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+        return target
+
+    def asset_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM assets").fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        """按最近使用时间淘汰资源，直到总大小不超过上限；返回淘汰的数量"""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        if not limit:
+            return 0
+        evicted = 0
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM assets").fetchone()[0]
+            if total <= limit:
+                return 0
+            rows = self._conn.execute("SELECT sha256, ext, size_bytes FROM assets ORDER BY last_used").fetchall()
+            for row in rows:
+                if total <= limit:
+                    break
+                if row['sha256'] in self._pinned:
+                    continue
+                try:
+                    os.remove(self.object_path(row['sha256'], row['ext']))
+                except FileNotFoundError:
+                    pass
+                self._conn.execute("DELETE FROM assets WHERE sha256 = ?", (row['sha256'],))
+                total -= row['size_bytes']
+                evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def get_stats(self):
+        """本次运行的去重统计"""
+        unique = len(self._pinned)
+        return {
+            'references': self.references,
+            'unique_assets': unique,
+            'dedup_ratio': round(self.references / unique, 2) if unique else 0.0,
+            'url_hits': self.url_hits,
+            'content_hits': self.content_hits,
+            'downloaded_bytes': self.downloaded_bytes,
+            'bytes_saved': self.bytes_saved,
+            'evicted': self.evicted,
+            'store_bytes': self.total_bytes(),
+        }
+
+    def print_summary(self):
+        stats = self.get_stats()
+        print(f"🗃️  资源去重: 引用 {stats['references']} 次 / 实际 {stats['unique_assets']} 个资源"
+              f"（去重比 {stats['dedup_ratio']}），节省 {stats['bytes_saved'] / 1024 / 1024:.1f}MB")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ---------- PDF图片去重 ----------
+
+def image_data(image):
+    """
+    图片流解码后的数据（JPEG 等图片编码保持原样），无法解码时返回 None；
+    解码结果只用于计算内容键，不缓存在对象上
+    """
+    decoded = getattr(image, "decoded_self", None)
+    try:
+        return image.get_data()
+    except Exception:
+        return None
+    finally:
+        if decoded is None and getattr(image, "decoded_self", None) is not None:
+            image.decoded_self = None
+
+
+def stored_length(stream):
+    """流对象在文件中占用的字节数（读入的流取 /Length，新建的未编码流取数据长度）"""
+    length = stream.get("/Length")
+    if length is not None:
+        return int(length.get_object())
+    return len(stream.get_data() or b"")
+
+
+def image_content_key(image, cache):
+    """图片对象的内容键：解码后的数据 + 影响显示的字典项（含软蒙版）；无法解码的图片不与其他图片合并"""
+    ref = getattr(image, "indirect_reference", None)
+    cache_key = (id(ref.pdf), ref.idnum) if ref is not None else id(image)
+    if cache_key in cache:
+        return cache[cache_key]
+    data = image_data(image)
+    if data is None:
+        cache[cache_key] = uuid.uuid4().hex
+        return cache[cache_key]
+    digest = hashlib.sha256(data)
+    for name in ("/Width", "/Height", "/BitsPerComponent", "/ColorSpace", "/Decode", "/ImageMask"):
+        if name in image:
+            digest.update(f"{name}={image[name]!r}".encode("utf-8", "replace"))
+    if "/SMask" in image:
+        digest.update(image_content_key(image["/SMask"].get_object(), cache).encode())
+    cache[cache_key] = digest.hexdigest()
+    return cache[cache_key]
+
+
+class PdfImageDeduper:
+    """
+    把不同页面/文档中内容相同的图片对象替换为同一个对象引用，写出时只保存一份图片数据。
+    可以分多次调用 dedupe()（如边导出边合并时每并入一个文档调用一次），之前见过的图片会被复用。
+    """
+
+    def __init__(self):
+        self.first_refs = {}
+        self.key_cache = {}
+        self.seen_objects = set()
+        self.visited_resources = set()
+        self.stats = {'images': 0, 'unique_images': 0, 'bytes_saved': 0}
+
+    def dedupe(self, pages):
+        """
+        Args:
+            pages (list): PyPDF2 的 PageObject 列表（如 PdfMerger.pages 中的 pagedata）
+
+        Returns:
+            dict: 累计的 {'images': 图片对象数, 'unique_images': 去重后数量, 'bytes_saved': 节省的字节数}
+        """
+        for page in pages:
+            self._walk(page.get("/Resources"))
+        return dict(self.stats)
+
+    def _walk(self, resources):
+        from PyPDF2.generic import IndirectObject, NameObject
+
+        resources = resources.get_object() if resources is not None else None
+        if not resources or id(resources) in self.visited_resources:
+            return
+        self.visited_resources.add(id(resources))
+        xobjects = resources.get("/XObject")
+        xobjects = xobjects.get_object() if xobjects is not None else None
+        if not xobjects:
+            return
+        for name in list(xobjects.keys()):
+            ref = xobjects.raw_get(name)
+            obj = ref.get_object()
+            subtype = obj.get("/Subtype")
+            if subtype == "/Form":
+                self._walk(obj.get("/Resources"))
+                continue
+            if subtype != "/Image" or not isinstance(ref, IndirectObject):
+                continue
+
+            object_id = (id(ref.pdf), ref.idnum)
+            key = image_content_key(obj, self.key_cache)
+            first = self.first_refs.get(key)
+            if object_id not in self.seen_objects:
+                self.seen_objects.add(object_id)
+                self.stats['images'] += 1
+                if first is None:
+                    self.stats['unique_images'] += 1
+                else:
+                    self.stats['bytes_saved'] += stored_length(obj)
+            if first is None:
+                self.first_refs[key] = ref
+            elif (id(first.pdf), first.idnum) != object_id:
+                xobjects[NameObject(name)] = first
+
+
+def dedupe_pdf_images(pages):
+    """
+    合并前把不同页面/文档中内容相同的图片对象替换为同一个对象引用，
+    写出时只保存一份图片数据
+
+    Args:
+        pages (list): PyPDF2 的 PageObject 列表（如 PdfMerger.pages 中的 pagedata）
+
+    Returns:
+        dict: {'images': 图片对象数, 'unique_images': 去重后数量, 'bytes_saved': 节省的字节数}
+    """
+    return PdfImageDeduper().dedupe(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="内容寻址资源库")
+    parser.add_argument("--root", default="./feishu_exports/.assets", help="资源库目录")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="资源库大小和资源数量")
+    evict = subparsers.add_parser("evict", help="按最近使用时间淘汰资源")
+    evict.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB)
+    args = parser.parse_args()
+
+    store = AssetStore(args.root, max_bytes=0)
+    if args.command == "stats":
+        count = store.asset_count()
+        print(f"🗃️  资源 {count} 个，共 {store.total_bytes() / 1024 / 1024:.1f}MB")
+    elif args.command == "evict":
+        evicted = store.evict(int(args.max_mb * 1024 * 1024))
+        print(f"🧹 已淘汰 {evicted} 个资源，剩余 {store.total_bytes() / 1024 / 1024:.1f}MB")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
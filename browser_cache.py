@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化浏览器磁盘缓存
+Selenium 每次启动Chrome都使用全新的临时配置，回收浏览器后飞书的JS/CSS包和字体都要重新下载。
+这里为每个导出进程分配一个固定的缓存槽位（--disk-cache-dir），重启浏览器、再次运行时都能复用；
+同一台机器上的多个导出进程共享同一个缓存根目录，各自持有一个槽位（Chrome的缓存目录不能被多个
+浏览器同时使用），槽位由文件锁分配，进程退出后自动释放。
+
+缓存是否命中、过期与否完全遵循HTTP缓存头（由Chrome自身的HTTP缓存处理），
+每个槽位的大小由 --disk-cache-size 限制，超出后由Chrome按LRU淘汰。
+命中率从浏览器的performance日志中统计（Network.requestServedFromCache / response.fromDiskCache）。
+
+注：飞书全站HTTPS，本地转发代理需要中间人解密才能缓存，因此采用浏览器磁盘缓存方案。
+"""
+
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class BrowserDiskCache:
+    def __init__(self, root, max_mb=1024, max_slots=16):
+        """
+        初始化浏览器磁盘缓存
+
+        Args:
+            root (str): 缓存根目录（同一台机器上的导出进程共用）
+            max_mb (int): 每个槽位的缓存大小上限（MB）
+            max_slots (int): 最多同时使用的槽位数（即同时运行的导出进程数）
+        """
+        self.root = root
+        self.max_mb = max_mb
+        self.max_slots = max_slots
+        self.slot_dir = None
+        self._lock_file = None
+
+        # 当前文档的统计
+        self._doc_requests = 0
+        self._doc_hits = 0
+        self._doc_network_bytes = 0
+        self._cached_ids = set()
+
+        # 每个文档的 (请求数, 命中数, 网络流量)
+        self.documents = []
+
+    def acquire(self):
+        """获取一个空闲的缓存槽位，返回槽位目录"""
+        if self.slot_dir:
+            return self.slot_dir
+        os.makedirs(self.root, exist_ok=True)
+        for slot in range(self.max_slots):
+            lock_file = open(os.path.join(self.root, f"slot-{slot}.lock"), 'a+')
+            if self._try_lock(lock_file):
+                self._lock_file = lock_file
+                self.slot_dir = os.path.join(self.root, f"slot-{slot}")
+                os.makedirs(self.slot_dir, exist_ok=True)
+                return self.slot_dir
+            lock_file.close()
+        raise RuntimeError(f"浏览器缓存槽位已全部占用（{self.max_slots} 个）")
+
+    @staticmethod
+    def _try_lock(lock_file):
+        try:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def release(self):
+        """释放缓存槽位（缓存内容保留，供下次使用）"""
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+        self.slot_dir = None
+
+    def configure_chrome(self, chrome_options):
+        """让Chrome使用当前槽位作为磁盘缓存，并开启performance日志用于统计命中率"""
+        chrome_options.add_argument(f"--disk-cache-dir={os.path.abspath(self.acquire())}")
+        chrome_options.add_argument(f"--disk-cache-size={int(self.max_mb * 1024 * 1024)}")
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    def collect(self, entries):
+        """从performance日志中统计缓存命中（一个文档处理完后调用）"""
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+
+            method = message.get('method')
+            params = message.get('params', {})
+
+            if method == 'Network.requestServedFromCache':
+                self._cached_ids.add(params.get('requestId'))
+            elif method == 'Network.responseReceived':
+                response = params.get('response', {})
+                if response.get('url', '').startswith('data:'):
+                    continue
+                self._doc_requests += 1
+                if response.get('fromDiskCache') or params.get('requestId') in self._cached_ids:
+                    self._doc_hits += 1
+            elif method == 'Network.loadingFinished':
+                if params.get('requestId') not in self._cached_ids:
+                    self._doc_network_bytes += int(params.get('encodedDataLength', 0))
+                self._cached_ids.discard(params.get('requestId'))
+
+        self.documents.append((self._doc_requests, self._doc_hits, self._doc_network_bytes))
+        self._doc_requests = self._doc_hits = self._doc_network_bytes = 0
+
+    @staticmethod
+    def _summarize(documents):
+        requests = sum(d[0] for d in documents)
+        hits = sum(d[1] for d in documents)
+        return {
+            'documents': len(documents),
+            'requests': requests,
+            'cache_hits': hits,
+            'hit_ratio': round(hits / requests, 3) if requests else 0.0,
+            'avg_network_kb': round(sum(d[2] for d in documents) / len(documents) / 1024, 1) if documents else 0.0,
+        }
+
+    def slot_size_bytes(self):
+        """当前槽位在磁盘上的大小"""
+        total = 0
+        for dirpath, _, filenames in os.walk(self.slot_dir or ""):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
+
+    def get_stats(self):
+        """缓存命中统计：全部文档，以及第一个文档与之后文档的对比"""
+        return {
+            'slot_dir': self.slot_dir,
+            'slot_size_mb': round(self.slot_size_bytes() / 1024 / 1024, 1),
+            'overall': self._summarize(self.documents),
+            'first_document': self._summarize(self.documents[:1]),
+            'later_documents': self._summarize(self.documents[1:]),
+        }
+
+    def print_summary(self):
+        stats = self.get_stats()
+        overall, first, later = stats['overall'], stats['first_document'], stats['later_documents']
+        print(f"💽 浏览器缓存: 命中率 {overall['hit_ratio']:.0%}（{overall['cache_hits']}/{overall['requests']}），"
+              f"首个文档网络流量 {first['avg_network_kb']:.0f}KB，之后平均 {later['avg_network_kb']:.0f}KB")
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段导出流水线
+逐个文档执行“打开 → 等待 → 打印 → 对话框 → 休息”时，网络、CPU和磁盘轮流空闲。
+流水线把导出拆成五个阶段，阶段之间用有界队列连接，各阶段同时处理不同的文档：
+
+    渲染（多个标签页并行加载） → 展开（滚动整篇文档，加载懒加载的内容和图片）
+    → 打印（CDP Page.printToPDF 直接返回PDF数据，不弹出对话框）
+    → 写入/校验（解码、检查PDF能否解析及是否完整、写文件） → 后处理（状态库、合并文件、进度）
+
+渲染、展开和打印需要操作浏览器，由主线程依次驱动（同一个WebDriver不能并发调用）；
+写入在线程池中运行（线程数可配置），后处理在一个单独的线程中依次记录结果。下游队列已满时上游阻塞等待（背压），
+进度显示中的队列深度和各阶段利用率可以看出哪个阶段是瓶颈。
+"""
+
+import base64
+import io
+import os
+import queue
+import re
+import threading
+import time
+
+from export_verifier import SIGNALS_JS
+
+# 写入/校验阶段的默认线程数（后处理阶段修改合并文件、进度和状态库，始终只有一个线程依次处理）
+DEFAULT_STAGE_WORKERS = {
+    'write': 2,
+}
+
+STAGE_LABELS = {
+    'render': "渲染",
+    'materialize': "展开",
+    'print': "打印",
+    'write': "写入",
+    'post': "后处理",
+}
+
+# Page.printToPDF 参数：保留背景色，使用页面CSS指定的纸张大小
+PRINT_OPTIONS = {
+    'printBackground': True,
+    'preferCSSPageSize': True,
+    'transferMode': 'ReturnAsBase64',
+}
+
+# 逐屏滚动到文档末尾，触发虚拟列表和图片的懒加载，等待图片加载完成后回到顶部；
+# 滚动过程中同时采集页面信号，供写入阶段校验PDF是否完整。
+# 参数：最大滚动次数、等待倍数（重新导出疑似不完整的文档时加大）；回调返回页面信号和滚动次数
+MATERIALIZE_SCRIPT = SIGNALS_JS + r"""
+const maxScrolls = arguments[0];
+const patience = arguments[1] || 1;
+const done = arguments[arguments.length - 1];
+
+function imagesLoaded() {
+    return Array.from(document.images).every(img => img.complete);
+}
+
+const container = scroller();
+const signals = createSignals();
+let steps = 0;
+function step() {
+    collectSignals(signals);
+    const atEnd = container.scrollTop + container.clientHeight >= container.scrollHeight - 2;
+    if (atEnd || steps >= maxScrolls) {
+        let waits = 0;
+        const settle = () => {
+            if (imagesLoaded() || waits++ >= 20 * patience) {
+                collectSignals(signals);
+                const summary = summarizeSignals(signals, container);
+                container.scrollTop = 0;
+                summary.steps = steps;
+                done(summary);
+            } else {
+                setTimeout(settle, 100);
+            }
+        };
+        settle();
+        return;
+    }
+    steps++;
+    container.scrollTop += Math.max(200, container.clientHeight * 0.8);
+    setTimeout(step, 100 * patience);
+}
+step();
+"""
+
+# 文档标题后缀（不作为文件名的一部分）
+TITLE_SUFFIX_RE = re.compile(r"\s*[-|–]\s*(飞书云文档|飞书文档|Feishu Docs|Lark Docs)\s*$", re.IGNORECASE)
+INVALID_FILENAME_RE = re.compile(r'[\\/:*?"<>|\r\n\t]+')
+
+_STOP = object()
+
+
+def pdf_filename(title, fallback="untitled"):
+    """由页面标题生成PDF文件名（去掉站点后缀和文件名中不允许的字符）"""
+    name = INVALID_FILENAME_RE.sub("_", TITLE_SUFFIX_RE.sub("", title or "")).strip(" ._")
+    return (name[:120] or fallback) + ".pdf"
+
+
+def claim_path(path):
+    """
+    不与已有文件重名的路径：同名时像浏览器下载一样依次加上 (1)、(2)……
+
+    先以独占方式创建空文件占用该名称，本次运行中的同名文档、以前运行留下的文件
+    和共用下载目录的其他进程写入的文件都不会被覆盖。
+    """
+    stem, ext = os.path.splitext(path)
+    index = 0
+    while True:
+        candidate = f"{stem} ({index}){ext}" if index else path
+        try:
+            os.close(os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return candidate
+        except FileExistsError:
+            index += 1
+
+
+class StageMetrics:
+    def __init__(self, name, workers=1):
+        """
+        一个流水线阶段的统计
+
+        Args:
+            name (str): 阶段名称
+            workers (int): 并行数
+        """
+        self.name = name
+        self.workers = workers
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0   # 上游因本阶段队列已满而等待的时间
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.busy += 1
+        return time.time()
+
+    def end(self, started, ok=True):
+        with self._lock:
+            self.busy -= 1
+            self.processed += 1
+            if not ok:
+                self.failed += 1
+            self.busy_seconds += time.time() - started
+
+    def record(self, seconds, ok=True):
+        """记录一个在别处计时的任务（如标签页加载）"""
+        with self._lock:
+            self.processed += 1
+            if not ok:
+                self.failed += 1
+            self.busy_seconds += seconds
+
+    def queued(self):
+        return 0
+
+    def capacity(self):
+        return None
+
+    def snapshot(self):
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'busy': self.busy,
+            'queued': self.queued(),
+            'capacity': self.capacity(),
+            'processed': self.processed,
+            'failed': self.failed,
+            'utilization': round(min(1.0, self.busy_seconds / (elapsed * self.workers)), 3),
+            'blocked_seconds': round(self.blocked_seconds, 1),
+        }
+
+
+class QueueStage(StageMetrics):
+    def __init__(self, name, handler, workers=1, queue_size=4, downstream=None, on_error=None):
+        """
+        由线程池处理的流水线阶段，输入为有界队列
+
+        Args:
+            name (str): 阶段名称
+            handler (callable): 处理一个任务，返回交给下游的任务（None表示不再向下传递）
+            workers (int): 线程数
+            queue_size (int): 输入队列容量，已满时 put() 阻塞（背压）
+            downstream (QueueStage): 下游阶段
+            on_error (callable): handler 抛出异常时的回调，参数为 (阶段名称, 任务, 异常)
+        """
+        super().__init__(name, workers)
+        self.handler = handler
+        self.downstream = downstream
+        self.on_error = on_error
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.max_queued = 0
+        self.pending = 0   # 已放入、尚未处理完并交给下游的任务数
+        self._threads = []
+
+    def queued(self):
+        return self.queue.qsize()
+
+    def capacity(self):
+        return self.queue.maxsize
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"pipeline-{self.name}-{index + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def put(self, item):
+        """把任务放入队列；队列已满时阻塞，并记录上游被阻塞的时间"""
+        with self._lock:
+            self.pending += 1
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            waited = time.time()
+            self.queue.put(item)
+            with self._lock:
+                self.blocked_seconds += time.time() - waited
+        self.max_queued = max(self.max_queued, self.queue.qsize())
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            started = self.begin()
+            result = None
+            ok = True
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                ok = False
+                if self.on_error:
+                    self.on_error(self.name, item, e)
+            finally:
+                self.end(started, ok)
+            # 等待下游队列的时间不计入本阶段的忙碌时间
+            if result is not None and self.downstream:
+                self.downstream.put(result)
+            with self._lock:
+                self.pending -= 1
+
+    def close(self):
+        """处理完队列中剩余的任务后停止线程"""
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def snapshot(self):
+        stats = super().snapshot()
+        stats['max_queued'] = self.max_queued
+        return stats
+
+
+class PdfWriterStage:
+    def __init__(self, output_dir, verifier=None):
+        """
+        写入/校验阶段：解码打印结果、检查PDF能否解析、与页面信号比较是否完整，然后写入下载目录
+
+        Args:
+            output_dir (str): PDF保存目录
+            verifier (ExportVerifier): 导出结果校验，提供时比较PDF与展开阶段采集的页面信号
+        """
+        self.output_dir = output_dir
+        self.verifier = verifier
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    def reserve_path(self, title):
+        """不与已有文件重名的路径（见 claim_path）"""
+        return claim_path(os.path.join(self.output_dir, pdf_filename(title)))
+
+    def __call__(self, job):
+        from PyPDF2 import PdfReader
+
+        data = base64.b64decode(job['pdf_base64'])
+        if not data.startswith(b"%PDF"):
+            raise ValueError("打印结果不是PDF")
+        reader = PdfReader(io.BytesIO(data))
+        pages = len(reader.pages)
+        if not pages:
+            raise ValueError("打印结果没有页面")
+
+        if self.verifier:
+            job['verification'] = self.verifier.verify([reader], job.get('page_signals'))
+            # 疑似不完整且还可以重新导出：照常写入，由后处理阶段暂存文件并重新排队
+            job['suspect'] = bool(job['verification'] and job['verification']['reasons']
+                                  and job.get('retry_suspect'))
+
+        path = self.reserve_path(job['title'])
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            # 释放占用的名称
+            for leftover in (temp_path, path):
+                try:
+                    os.remove(leftover)
+                except OSError:
+                    pass
+            raise
+        with self._lock:
+            self.bytes_written += len(data)
+
+        job.pop('pdf_base64')
+        job.update(path=path, pages=pages, size_bytes=len(data))
+        return job
+
+
+class ExportPipeline:
+    def __init__(self, write_handler, post_handler, on_error, stage_workers=None, queue_size=4, render_workers=1):
+        """
+        初始化流水线中由线程池处理的阶段（写入/校验、后处理），以及由浏览器驱动的阶段的统计
+
+        Args:
+            write_handler (callable): 写入/校验一个打印结果，返回交给后处理的任务
+            post_handler (callable): 后处理一个已写入的文档
+            on_error (callable): 写入或后处理失败时的回调，参数为 (阶段名称, 任务, 异常)
+            stage_workers (dict): 写入/校验阶段的线程数，如 {'write': 2}（后处理阶段只有一个线程）
+            queue_size (int): 阶段之间队列的容量
+            render_workers (int): 渲染阶段的并行数（标签页数）
+        """
+        workers = dict(DEFAULT_STAGE_WORKERS)
+        workers.update(stage_workers or {})
+
+        self.post = QueueStage('post', post_handler, 1, queue_size, on_error=on_error)
+        self.write = QueueStage('write', write_handler, workers['write'], queue_size,
+                                downstream=self.post, on_error=on_error)
+        self.render = StageMetrics('render', render_workers)
+        self.materialize = StageMetrics('materialize')
+        self.print = StageMetrics('print')
+        self.stages = [self.render, self.materialize, self.print, self.write, self.post]
+
+    def start(self):
+        self.post.start()
+        self.write.start()
+        return self
+
+    def submit(self, job):
+        """把打印结果交给写入阶段（写入队列已满时阻塞）"""
+        self.write.put(job)
+
+    def in_flight(self):
+        """已交给写入阶段、尚未完成后处理的任务数"""
+        return self.write.pending + self.post.pending
+
+    def close(self):
+        """等待写入和后处理阶段处理完所有任务"""
+        self.write.close()
+        self.post.close()
+
+    def snapshot(self, render_queued=0):
+        """
+        各阶段的状态
+
+        Args:
+            render_queued (int): 已加载完成、等待展开和打印的标签页数（渲染与展开之间的“队列”）
+        """
+        stages = [stage.snapshot() for stage in self.stages]
+        stages[0]['queued'] = render_queued
+        return stages
+
+    def bottleneck(self):
+        """利用率最高的阶段"""
+        stages = self.snapshot()
+        return max(stages, key=lambda stage: stage['utilization'])['stage'] if stages else None
+
+    def get_stats(self):
+        return {
+            'stages': self.snapshot(),
+            'bottleneck': self.bottleneck(),
+        }
+
+
+def format_pipeline_status(stages):
+    """进度显示中的一行：各阶段的 忙/并行数 和 队列深度"""
+    parts = []
+    for stage in stages:
+        label = STAGE_LABELS.get(stage['stage'], stage['stage'])
+        part = f"{label} {stage['busy']}/{stage['workers']}"
+        if stage['capacity']:
+            part += f" 队列{stage['queued']}/{stage['capacity']}"
+        elif stage['queued']:
+            part += f" 待处理{stage['queued']}"
+        parts.append(part)
+    return " → ".join(parts)
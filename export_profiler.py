@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行剖析工具（--profile）
+为导出、链接提取、PDF合并等入口收集 cProfile 统计，并可为指定文档保存 Chrome 性能追踪。
+每次运行的结果写入独立的剖析目录：
+    profiles/<入口名>-<时间>/python.prof     cProfile原始数据（可用 snakeviz 等工具查看）
+    profiles/<入口名>-<时间>/summary.txt     耗时最多的函数（按累计时间和自身时间）
+    profiles/<入口名>-<时间>/chrome/         指定文档的Chrome追踪（可在 chrome://tracing 中打开）和页面指标
+
+未开启时 profile_run() 返回空的上下文管理器，不引入任何额外开销。
+"""
+
+import contextlib
+import cProfile
+import hashlib
+import io
+import json
+import os
+import pstats
+from datetime import datetime
+
+# Chrome追踪采集的类别
+TRACE_CATEGORIES = "devtools.timeline,blink.user_timing,v8.execute,disabled-by-default-devtools.timeline"
+
+
+class RunProfiler:
+    def __init__(self, name, profile_root="profiles", top_n=25, trace_urls=None):
+        """
+        初始化剖析器
+
+        Args:
+            name (str): 入口名称（用于剖析目录命名）
+            profile_root (str): 剖析结果根目录
+            top_n (int): 摘要中列出的函数数量
+            trace_urls (list): 需要保存Chrome追踪的文档URL，"*" 表示全部文档
+        """
+        self.name = name
+        self.top_n = top_n
+        self.trace_urls = set(trace_urls or [])
+        self.run_dir = os.path.join(profile_root, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        self._profile = None
+
+    def __enter__(self):
+        os.makedirs(self.run_dir, exist_ok=True)
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        self.write_python_profile()
+        return False
+
+    def write_python_profile(self):
+        """保存cProfile数据和热点函数摘要"""
+        prof_path = os.path.join(self.run_dir, "python.prof")
+        self._profile.dump_stats(prof_path)
+
+        buffer = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=buffer)
+        stats.strip_dirs()
+        buffer.write(f"== 按累计时间排序（前 {self.top_n} 个）==\n")
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+        buffer.write(f"\n== 按自身时间排序（前 {self.top_n} 个）==\n")
+        stats.sort_stats("tottime").print_stats(self.top_n)
+
+        summary_path = os.path.join(self.run_dir, "summary.txt")
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(buffer.getvalue())
+
+        print("\n🔬 热点函数（按自身时间）:")
+        for func, (calls, _, tottime, cumtime) in self.top_functions(stats, min(self.top_n, 10)):
+            filename, line, funcname = func
+            print(f"  {tottime:8.3f}s  {cumtime:8.3f}s  {calls:>8}  {funcname} ({filename}:{line})")
+        print(f"📁 剖析结果已保存到: {self.run_dir}")
+
+    @staticmethod
+    def top_functions(stats, count):
+        """按自身时间排序的前count个函数 [(func, (调用次数, 原始调用次数, 自身时间, 累计时间))]"""
+        items = [(func, values[:4]) for func, values in stats.stats.items()]
+        items.sort(key=lambda item: item[1][2], reverse=True)
+        return items[:count]
+
+    # ---------- Chrome追踪 ----------
+
+    @property
+    def chrome_tracing_enabled(self):
+        return bool(self.trace_urls)
+
+    def should_trace(self, url):
+        return '*' in self.trace_urls or url in self.trace_urls
+
+    def configure_chrome(self, chrome_options):
+        """为Chrome开启performance日志中的追踪事件（仅在指定了追踪文档时调用）"""
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        chrome_options.add_experimental_option("perfLoggingPrefs", {"traceCategories": TRACE_CATEGORIES})
+
+    def record_document(self, driver, url, log_entries):
+        """
+        保存一个文档的Chrome追踪事件和页面性能指标
+
+        Args:
+            driver: Selenium WebDriver实例（当前窗口为该文档）
+            url (str): 文档URL
+            log_entries (list): 处理该文档期间读取到的performance日志
+        """
+        if not self.should_trace(url):
+            return
+
+        chrome_dir = os.path.join(self.run_dir, "chrome")
+        os.makedirs(chrome_dir, exist_ok=True)
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+
+        events = []
+        for entry in log_entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            if message.get('method') == 'Tracing.dataCollected':
+                events.append(message['params'])
+        with open(os.path.join(chrome_dir, f"{key}.trace.json"), 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'metadata': {'url': url}}, f)
+
+        metrics = {}
+        with contextlib.suppress(Exception):
+            driver.execute_cdp_cmd('Performance.enable', {})
+            result = driver.execute_cdp_cmd('Performance.getMetrics', {})
+            metrics = {item['name']: item['value'] for item in result.get('metrics', [])}
+        with open(os.path.join(chrome_dir, f"{key}.metrics.json"), 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'metrics': metrics}, f, ensure_ascii=False, indent=2)
+
+
+def profile_run(name, enabled=False, profile_root="profiles", trace_urls=None):
+    """
+    按需创建剖析器：未开启时返回空的上下文管理器
+
+    用法：
+        with profile_run("merge", args.profile, args.profile_dir) as profiler:
+            ...
+    """
+    if not enabled:
+        return contextlib.nullcontext()
+    return RunProfiler(name, profile_root, trace_urls=trace_urls)
+
+
+def add_profile_arguments(parser):
+    """为命令行入口添加 --profile / --profile-dir 参数"""
+    parser.add_argument("--profile", action="store_true", help="收集cProfile剖析数据")
+    parser.add_argument("--profile-dir", default="profiles", help="剖析结果根目录（默认: profiles）")
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出状态库
+用一个SQLite数据库（WAL模式）统一记录链接、每次导出尝试、输出文件和错误，
+取代分散的 export_log.json / export_report.json / failed_links.txt / test_report.json，
+多个导出进程可以同时安全写入，常见问题（如“上周哪些文档超时失败”、“哪些文档超过30秒”）
+可以直接用索引查询。旧格式的文件仍可以从数据库导出。
+
+用法：
+    python3 export_state.py failed --days 7 --kind timeout
+    python3 export_state.py slow --seconds 30
+    python3 export_state.py --download-dir ./feishu_exports export
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from link_collector import canonical_feishu_url
+
+DEFAULT_DOWNLOAD_DIR = "./feishu_exports"
+DB_NAME = "export_state.db"
+
+# 按类别查询错误时包含的错误类型（如 timeout 同时包含阶段超时和页面加载超时）
+ERROR_KIND_GROUPS = {
+    'timeout': ('timeout', 'load_timeout'),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    host TEXT,
+    total_docs INTEGER,
+    stats TEXT
+);
+CREATE TABLE IF NOT EXISTS links (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    canonical_url TEXT NOT NULL,
+    doc_type TEXT,
+    position INTEGER,
+    added_at REAL NOT NULL,
+    preflight_status TEXT,
+    final_url TEXT,
+    checked_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_links_canonical ON links(canonical_url);
+
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER REFERENCES runs(id),
+    link_id INTEGER NOT NULL REFERENCES links(id),
+    worker TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    duration_s REAL,
+    status TEXT NOT NULL,
+    stage TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_link ON attempts(link_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_status ON attempts(status, started_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_duration ON attempts(duration_s);
+CREATE INDEX IF NOT EXISTS idx_attempts_run ON attempts(run_id, link_id);
+
+CREATE TABLE IF NOT EXISTS outputs (
+    id INTEGER PRIMARY KEY,
+    attempt_id INTEGER REFERENCES attempts(id),
+    link_id INTEGER NOT NULL REFERENCES links(id),
+    path TEXT NOT NULL,
+    size_bytes INTEGER,
+    sha256 TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outputs_link ON outputs(link_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_outputs_sha256 ON outputs(sha256);
+CREATE INDEX IF NOT EXISTS idx_outputs_attempt ON outputs(attempt_id);
+
+CREATE TABLE IF NOT EXISTS errors (
+    id INTEGER PRIMARY KEY,
+    attempt_id INTEGER REFERENCES attempts(id),
+    link_id INTEGER NOT NULL REFERENCES links(id),
+    occurred_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_errors_kind ON errors(kind, occurred_at);
+CREATE INDEX IF NOT EXISTS idx_errors_time ON errors(occurred_at);
+CREATE INDEX IF NOT EXISTS idx_errors_link ON errors(link_id);
+
+CREATE TABLE IF NOT EXISTS link_scans (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT,
+    links TEXT NOT NULL,
+    scanned_at REAL NOT NULL
+);
+"""
+
+
+def default_db_path(download_dir=DEFAULT_DOWNLOAD_DIR):
+    """状态库默认保存在下载目录中，与导出的文件放在一起"""
+    return os.path.join(download_dir, DB_NAME)
+
+
+def doc_type_of(url):
+    """根据URL判断文档类型"""
+    for doc_type in ('wiki', 'docx', 'docs', 'doc', 'sheets', 'base'):
+        if f'/{doc_type}/' in url:
+            return doc_type
+    return 'other'
+
+
+def iso(timestamp):
+    """时间戳转ISO格式字符串"""
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+def file_sha256(path):
+    """计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExportStateStore:
+    def __init__(self, db_path=None):
+        """
+        初始化状态库
+
+        Args:
+            db_path (str): SQLite数据库文件路径，默认为默认下载目录下的 export_state.db
+        """
+        self.db_path = db_path or default_db_path()
+        self._local = threading.local()
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        """每个线程使用独立的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """写事务（BEGIN IMMEDIATE，多进程并发写入时串行化）"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def query(self, sql, params=()):
+        """执行只读查询"""
+        return self._connect().execute(sql, params).fetchall()
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ---------- 运行 ----------
+
+    def start_run(self, total_docs):
+        """记录一次导出运行的开始，返回run_id"""
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (started_at, host, total_docs) VALUES (?, ?, ?)",
+                (time.time(), socket.gethostname(), total_docs))
+            return cursor.lastrowid
+
+    def finish_run(self, run_id, stats=None):
+        """记录运行结束及附加统计"""
+        with self.transaction() as conn:
+            conn.execute("UPDATE runs SET finished_at = ?, stats = ? WHERE id = ?",
+                         (time.time(), json.dumps(stats, ensure_ascii=False) if stats else None, run_id))
+
+    def latest_run_id(self):
+        """最近一次运行的id"""
+        rows = self.query("SELECT MAX(id) AS id FROM runs")
+        return rows[0]['id'] if rows else None
+
+    # ---------- 链接 ----------
+
+    def add_links(self, urls):
+        """登记链接（已存在的链接只更新顺序），返回 {url: link_id}"""
+        now = time.time()
+        with self.transaction() as conn:
+            for position, url in enumerate(urls):
+                conn.execute(
+                    "INSERT INTO links (url, canonical_url, doc_type, position, added_at) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET position = excluded.position",
+                    (url, canonical_feishu_url(url), doc_type_of(url), position, now))
+        return self.link_ids(urls)
+
+    def link_ids(self, urls):
+        """查询链接id"""
+        ids = {}
+        conn = self._connect()
+        for url in urls:
+            row = conn.execute("SELECT id FROM links WHERE url = ?", (url,)).fetchone()
+            if row:
+                ids[url] = row['id']
+        return ids
+
+    def _link_id(self, conn, url):
+        row = conn.execute("SELECT id FROM links WHERE url = ?", (url,)).fetchone()
+        if row:
+            return row['id']
+        cursor = conn.execute(
+            "INSERT INTO links (url, canonical_url, doc_type, added_at) VALUES (?, ?, ?, ?)",
+            (url, canonical_feishu_url(url), doc_type_of(url), time.time()))
+        return cursor.lastrowid
+
+    def record_preflight(self, results):
+        """保存链接预检结果"""
+        now = time.time()
+        with self.transaction() as conn:
+            for result in results:
+                link_id = self._link_id(conn, result['url'])
+                conn.execute(
+                    "UPDATE links SET preflight_status = ?, final_url = ?, checked_at = ? WHERE id = ?",
+                    (result['status'], result.get('final_url'), now, link_id))
+
+    # ---------- 导出尝试 ----------
+
+    def start_attempt(self, run_id, url, worker=""):
+        """记录一次导出尝试的开始，返回attempt_id"""
+        with self.transaction() as conn:
+            link_id = self._link_id(conn, url)
+            cursor = conn.execute(
+                "INSERT INTO attempts (run_id, link_id, worker, started_at, status) "
+                "VALUES (?, ?, ?, ?, 'running')",
+                (run_id, link_id, worker, time.time()))
+            return cursor.lastrowid
+
+    def finish_attempt(self, attempt_id, status, stage=None, error_kind=None, error_msg=None):
+        """
+        记录导出尝试的结果
+
+        Args:
+            attempt_id (int): start_attempt 返回的id
+            status (str): success / failed / timeout / requeued
+            stage (str): 结束时所处的阶段
+            error_kind (str): 错误类型（如 timeout、load_timeout、no_export_button、error）
+            error_msg (str): 错误信息
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute("SELECT link_id, started_at FROM attempts WHERE id = ?",
+                               (attempt_id,)).fetchone()
+            if not row:
+                return
+            conn.execute(
+                "UPDATE attempts SET finished_at = ?, duration_s = ?, status = ?, stage = ? WHERE id = ?",
+                (now, now - row['started_at'], status, stage, attempt_id))
+            if error_kind:
+                conn.execute(
+                    "INSERT INTO errors (attempt_id, link_id, occurred_at, kind, message) VALUES (?, ?, ?, ?, ?)",
+                    (attempt_id, row['link_id'], now, error_kind, error_msg))
+
+    def record_output(self, attempt_id, path):
+        """记录导出尝试生成的文件"""
+        try:
+            size = os.path.getsize(path)
+            sha256 = file_sha256(path)
+        except OSError:
+            size, sha256 = None, None
+        with self.transaction() as conn:
+            row = conn.execute("SELECT link_id FROM attempts WHERE id = ?", (attempt_id,)).fetchone()
+            if not row:
+                return
+            conn.execute(
+                "INSERT INTO outputs (attempt_id, link_id, path, size_bytes, sha256, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (attempt_id, row['link_id'], path, size, sha256, time.time()))
+
+    # ---------- 链接扫描 ----------
+
+    def scanned_links(self, sha256):
+        """内容哈希对应的文件中扫描到的链接，未扫描过时返回 None"""
+        rows = self.query("SELECT links FROM link_scans WHERE sha256 = ?", (sha256,))
+        return json.loads(rows[0]['links']) if rows else None
+
+    def record_link_scan(self, sha256, path, links):
+        """记录一个文件中扫描到的链接"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO link_scans (sha256, path, links, scanned_at) VALUES (?, ?, ?, ?)",
+                (sha256, path, json.dumps(links, ensure_ascii=False), time.time()))
+
+    # ---------- 常用查询 ----------
+
+    def failed_since(self, days=7, kind=None, limit=1000):
+        """最近若干天内的错误（可按错误类型过滤，类别见 ERROR_KIND_GROUPS）"""
+        since = time.time() - days * 86400
+        if kind:
+            kinds = ERROR_KIND_GROUPS.get(kind, (kind,))
+            sql = ("SELECT e.occurred_at, e.kind, e.message, l.url FROM errors e "
+                   "JOIN links l ON l.id = e.link_id "
+                   f"WHERE e.kind IN ({', '.join('?' * len(kinds))}) AND e.occurred_at >= ? "
+                   "ORDER BY e.occurred_at DESC LIMIT ?")
+            params = (*kinds, since, limit)
+        else:
+            sql = ("SELECT e.occurred_at, e.kind, e.message, l.url FROM errors e "
+                   "JOIN links l ON l.id = e.link_id "
+                   "WHERE e.occurred_at >= ? ORDER BY e.occurred_at DESC LIMIT ?")
+            params = (since, limit)
+        return [dict(row) for row in self.query(sql, params)]
+
+    def slow_documents(self, min_seconds=30, limit=1000):
+        """耗时超过指定秒数的导出尝试（最慢的在前）"""
+        sql = ("SELECT l.url, a.duration_s, a.status, a.started_at FROM attempts a "
+               "JOIN links l ON l.id = a.link_id "
+               "WHERE a.duration_s > ? ORDER BY a.duration_s DESC LIMIT ?")
+        return [dict(row) for row in self.query(sql, (min_seconds, limit))]
+
+    def last_attempts(self, run_id):
+        """某次运行中每个链接的最后一次尝试"""
+        sql = ("SELECT l.url, l.position, a.status FROM attempts a "
+               "JOIN links l ON l.id = a.link_id "
+               "WHERE a.id IN (SELECT MAX(id) FROM attempts WHERE run_id = ? GROUP BY link_id) "
+               "ORDER BY a.id")
+        return [dict(row) for row in self.query(sql, (run_id,))]
+
+    def document_costs(self, canonical_urls, recent=5):
+        """
+        每个文档（按规范化URL）最近几次成功导出的耗时和最近一次输出文件的大小
+
+        Returns:
+            dict: {canonical_url: {'durations': [秒, ...], 'size_bytes': 字节数或None}}
+        """
+        costs = {}
+        conn = self._connect()
+        for canonical_url in canonical_urls:
+            durations = [row['duration_s'] for row in conn.execute(
+                "SELECT a.duration_s FROM attempts a JOIN links l ON l.id = a.link_id "
+                "WHERE l.canonical_url = ? AND a.status = 'success' AND a.duration_s IS NOT NULL "
+                "ORDER BY a.id DESC LIMIT ?", (canonical_url, recent))]
+            size = conn.execute(
+                "SELECT o.size_bytes FROM outputs o JOIN links l ON l.id = o.link_id "
+                "WHERE l.canonical_url = ? AND o.size_bytes IS NOT NULL ORDER BY o.id DESC LIMIT 1",
+                (canonical_url,)).fetchone()
+            if durations or size:
+                costs[canonical_url] = {'durations': durations, 'size_bytes': size['size_bytes'] if size else None}
+        return costs
+
+    def recent_costs(self, limit=5000):
+        """最近成功导出的 (文档类型, 耗时, 输出大小)，用于估计未导出过的文档"""
+        rows = self.query(
+            "SELECT l.doc_type, a.duration_s, "
+            "(SELECT o.size_bytes FROM outputs o WHERE o.attempt_id = a.id ORDER BY o.id DESC LIMIT 1) AS size_bytes "
+            "FROM attempts a JOIN links l ON l.id = a.link_id "
+            "WHERE a.status = 'success' AND a.duration_s IS NOT NULL ORDER BY a.id DESC LIMIT ?", (limit,))
+        return [(row['doc_type'], row['duration_s'], row['size_bytes']) for row in rows]
+
+    # ---------- 导出旧格式文件 ----------
+
+    def export_links_file(self, path):
+        """导出 feishu_links.txt（按登记顺序）"""
+        rows = self.query("SELECT url FROM links ORDER BY position IS NULL, position, id")
+        with open(path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(row['url'] + '\n')
+        return len(rows)
+
+    def export_log(self, path, run_id=None):
+        """导出 export_log.json（ProgressMonitor 格式，只包含该次运行的错误）"""
+        run_id = run_id or self.latest_run_id()
+        attempts = self.last_attempts(run_id) if run_id else []
+        run = self.query("SELECT total_docs, finished_at FROM runs WHERE id = ?", (run_id,)) if run_id else []
+        errors = self.query(
+            "SELECT e.occurred_at, e.message, l.url FROM errors e "
+            "JOIN attempts a ON a.id = e.attempt_id JOIN links l ON l.id = e.link_id "
+            "WHERE a.run_id = ? ORDER BY e.occurred_at", (run_id,)) if run_id else []
+        log_data = {
+            'export_time': iso(run[0]['finished_at']) if run and run[0]['finished_at'] else datetime.now().isoformat(),
+            'total_docs': run[0]['total_docs'] if run else 0,
+            'processed_docs': sum(1 for a in attempts if a['status'] == 'success'),
+            'failed_docs': sum(1 for a in attempts if a['status'] in ('failed', 'timeout')),
+            'errors': [{'timestamp': iso(row['occurred_at']), 'url': row['url'], 'error': row['message']}
+                       for row in errors],
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(log_data, f, ensure_ascii=False, indent=2)
+
+    def export_report(self, path, run_id, download_dir, extra=None):
+        """导出 export_report.json（FeishuBatchExporter 格式）"""
+        attempts = self.last_attempts(run_id)
+        processed = [a['url'] for a in attempts if a['status'] == 'success']
+        failed = [a['url'] for a in attempts if a['status'] in ('failed', 'timeout')]
+        report = {
+            'export_time': datetime.now().isoformat(),
+            'total_docs': len(processed) + len(failed),
+            'successful': len(processed),
+            'failed': len(failed),
+            'download_directory': download_dir,
+        }
+        report.update(extra or {})
+        report['processed_links'] = processed
+        report['failed_links'] = failed
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+    def export_failed_links(self, path, run_id):
+        """导出 failed_links.txt"""
+        failed = [a['url'] for a in self.last_attempts(run_id) if a['status'] in ('failed', 'timeout')]
+        with open(path, 'w', encoding='utf-8') as f:
+            for url in failed:
+                f.write(url + '\n')
+        return len(failed)
+
+    def export_test_report(self, path):
+        """导出 test_report.json（按链接预检结果）"""
+        rows = self.query("SELECT url, doc_type, preflight_status, final_url, checked_at FROM links "
+                          "WHERE checked_at IS NOT NULL ORDER BY position IS NULL, position, id")
+        ok = ('reachable', 'redirect')
+        results = [{
+            'url': row['url'],
+            'timestamp': iso(row['checked_at']),
+            'accessible': row['preflight_status'] in ok,
+            'preflight_status': row['preflight_status'],
+            'final_url': row['final_url'],
+            'doc_type': row['doc_type'],
+            'export_feasible': row['preflight_status'] in ok,
+        } for row in rows]
+        report = {
+            'test_time': datetime.now().isoformat(),
+            'total_links': len(results),
+            'successful': sum(1 for r in results if r['export_feasible']),
+            'failed': sum(1 for r in results if not r['export_feasible']),
+            'results': results,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def add_report_arguments(parser):
+    """添加状态库查询子命令（也供 feishu_cli.py report 复用）"""
+    parser.add_argument("--db", help=f"状态库路径（默认: 下载目录/{DB_NAME}）")
+    parser.add_argument("--download-dir", default=DEFAULT_DOWNLOAD_DIR, help="下载目录")
+    subparsers = parser.add_subparsers(dest="report_command", required=True)
+
+    failed = subparsers.add_parser("failed", help="最近失败的文档")
+    failed.add_argument("--days", type=float, default=7)
+    failed.add_argument("--kind", help="错误类型，如 timeout")
+
+    slow = subparsers.add_parser("slow", help="耗时较长的文档")
+    slow.add_argument("--seconds", type=float, default=30)
+
+    export = subparsers.add_parser("export", help="导出旧格式的日志和报告文件")
+    export.add_argument("--run", type=int, help="运行id（默认最近一次）")
+
+
+def run_report(args):
+    """执行状态库查询子命令"""
+    store = ExportStateStore(args.db or default_db_path(args.download_dir))
+
+    if args.report_command == "failed":
+        rows = store.failed_since(args.days, args.kind)
+        for row in rows:
+            print(f"[{iso(row['occurred_at'])[:19]}] {row['kind']}: {row['url']}  {row['message'] or ''}")
+        print(f"共 {len(rows)} 条")
+    elif args.report_command == "slow":
+        rows = store.slow_documents(args.seconds)
+        for row in rows:
+            print(f"{row['duration_s']:7.1f}秒  {row['status']:8s} {row['url']}")
+        print(f"共 {len(rows)} 条")
+    elif args.report_command == "export":
+        run_id = args.run or store.latest_run_id()
+        if not run_id:
+            print("❌ 状态库中还没有导出记录")
+            return
+        store.export_report(os.path.join(args.download_dir, "export_report.json"), run_id, args.download_dir)
+        store.export_failed_links(os.path.join(args.download_dir, "failed_links.txt"), run_id)
+        store.export_log("export_log.json", run_id)
+        store.export_test_report("test_report.json")
+        store.export_links_file(os.path.join(args.download_dir, "feishu_links.txt"))
+        print(f"✅ 已从状态库导出运行 {run_id} 的报告文件")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询导出状态库")
+    add_report_arguments(parser)
+    run_report(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
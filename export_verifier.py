@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出结果校验（截断/空白检测）
+渲染等待时间（delay）不够时，飞书只渲染了文档的一部分就被打印，导出“成功”但内容缺失，
+直到有人读到缺失的章节才会发现。
+
+打印前从页面采集信号：已渲染的块数和文字长度（按块ID累计，虚拟列表滚动时卸载的块也计算在内）、
+图片数、可见区域内仍在加载的图片和占位块、文档总高度（虚拟列表按完整文档预留高度）。
+导出后与PDF的统计（页数、提取的文字长度、空白页数；有图片或矢量图形的页不算空白）比较：
+- PDF文字明显少于页面文字；
+- PDF页数明显少于按文档高度估计的页数；
+- 空白页比例过高，或打印时页面仍在加载。
+
+疑似有问题的文档由导出流程以更长的渲染等待/展开时间重新排队，而不必为所有文档调大 delay。
+"""
+
+import io
+import re
+import threading
+
+# 页面信号采集：由展开脚本（export_pipeline.MATERIALIZE_SCRIPT）在逐屏滚动的过程中调用，
+# 虚拟列表滚出视口后卸载的块也计算在内
+SIGNALS_JS = r"""
+function scroller() {
+    const first = document.querySelector('[data-block-type]');
+    for (let el = first; el; el = el.parentElement) {
+        const overflow = getComputedStyle(el).overflowY;
+        if ((overflow === 'auto' || overflow === 'scroll') && el.scrollHeight > el.clientHeight) return el;
+    }
+    return document.scrollingElement || document.documentElement;
+}
+
+function createSignals() {
+    return {texts: new Map(), visited: new WeakSet(), anonymous: 0, images: new Set()};
+}
+
+function collectSignals(signals) {
+    document.querySelectorAll('[data-block-type]').forEach(el => {
+        const id = el.getAttribute('data-block-id');
+        // 只统计没有子块的块的文字，父块的文字已包含在子块中
+        const leaf = !el.querySelector('[data-block-type]');
+        const length = leaf ? (el.innerText || '').replace(/[\s\u200b\ufeff]/g, '').length : 0;
+        if (id) {
+            // 同一个块先以占位形式出现、之后才填充内容时，取最长的一次
+            signals.texts.set(id, Math.max(signals.texts.get(id) || 0, length));
+        } else if (!signals.visited.has(el)) {
+            signals.visited.add(el);
+            signals.anonymous += length;
+            signals.texts.set('dom-' + signals.texts.size, 0);
+        }
+        el.querySelectorAll('img').forEach(img => signals.images.add(img.currentSrc || img.src));
+    });
+}
+
+function summarizeSignals(signals, container) {
+    let text = signals.anonymous;
+    signals.texts.forEach(length => { text += length; });
+    const viewport = window.innerHeight * 2;
+    const pendingImages = Array.from(document.images).filter(img => {
+        const rect = img.getBoundingClientRect();
+        return !img.complete && rect.bottom > 0 && rect.top < viewport;
+    }).length;
+    return {
+        blocks: signals.texts.size,
+        text_length: text,
+        images: signals.images.size,
+        pending_images: pendingImages,
+        placeholders: document.querySelectorAll('[data-block-type] [class*="skeleton"]').length,
+        scroll_height: container.scrollHeight,
+    };
+}
+"""
+
+# 打印时一页A4大约对应的页面高度（CSS像素），用于由文档高度估计页数
+PAGE_HEIGHT_PX = 1100
+
+# 页面文字少于该字数时不比较文字长度（如只有图片的文档）
+MIN_COMPARABLE_TEXT = 200
+
+# 文字少于该字数且没有图片和图形的页视为空白页
+BLANK_PAGE_CHARS = 5
+
+# 内容流中的绘制操作：填充、描边、渐变和外部对象（白板、流程图、只有表格线的页打印为矢量路径）
+FILL_OPERATORS = {b'f', b'F', b'f*'}
+STROKE_OPERATORS = {b'S', b's'}
+FILL_STROKE_OPERATORS = {b'B', b'B*', b'b', b'b*'}
+SOLID_PAINT_OPERATORS = {b'sh', b'Do', b'INLINE IMAGE'}
+FILL_COLOR_OPERATORS = {b'g', b'rg', b'k', b'sc', b'scn'}
+STROKE_COLOR_OPERATORS = {b'G', b'RG', b'K', b'SC', b'SCN'}
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def page_has_images(page):
+    """页面资源中是否有图片等外部对象"""
+    try:
+        resources = page.get('/Resources')
+        xobjects = resources.get_object().get('/XObject') if resources else None
+        return bool(xobjects and len(xobjects.get_object()))
+    except Exception:
+        return False
+
+
+def is_white(operands):
+    """颜色操作数是否为白色（灰度/RGB为1，CMYK为0；图案等非数值颜色不算白色）"""
+    try:
+        values = [float(value) for value in operands]
+    except (TypeError, ValueError):
+        return False
+    if len(values) == 4:
+        return not any(values)
+    return bool(values) and all(value == 1 for value in values)
+
+
+def page_has_graphics(page):
+    """
+    页面内容流中是否有可见的绘制操作
+    只铺白色背景的页仍视为没有图形（打印背景时每页都会先填充一个白色矩形）
+    """
+    from PyPDF2.generic import ContentStream
+
+    try:
+        contents = page.get_contents()
+        if contents is None:
+            return False
+        operations = ContentStream(contents, page.pdf).operations
+    except Exception:
+        return False
+
+    # 当前填充色/描边色是否为白色（默认黑色），随 q/Q 保存和恢复
+    fill_white, stroke_white = False, False
+    saved = []
+    for operands, operator in operations:
+        if operator == b'q':
+            saved.append((fill_white, stroke_white))
+        elif operator == b'Q':
+            if saved:
+                fill_white, stroke_white = saved.pop()
+        elif operator in FILL_COLOR_OPERATORS:
+            fill_white = is_white(operands)
+        elif operator in STROKE_COLOR_OPERATORS:
+            stroke_white = is_white(operands)
+        elif operator in SOLID_PAINT_OPERATORS:
+            return True
+        elif operator in FILL_OPERATORS and not fill_white:
+            return True
+        elif operator in STROKE_OPERATORS and not stroke_white:
+            return True
+        elif operator in FILL_STROKE_OPERATORS and not (fill_white and stroke_white):
+            return True
+    return False
+
+
+def pdf_stats(source):
+    """
+    PDF的页数、文字长度（不含空白）和空白页数
+
+    Args:
+        source: PDF路径、PDF数据（bytes）或已打开的 PdfReader
+    """
+    from PyPDF2 import PdfReader
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    reader = source if isinstance(source, PdfReader) else PdfReader(source)
+
+    stats = {'pages': 0, 'text_length': 0, 'blank_pages': 0}
+    for page in reader.pages:
+        try:
+            text = page.extract_text() or ""
+        except Exception:
+            text = ""
+        length = len(WHITESPACE_RE.sub("", text))
+        stats['pages'] += 1
+        stats['text_length'] += length
+        if length < BLANK_PAGE_CHARS and not page_has_images(page) and not page_has_graphics(page):
+            stats['blank_pages'] += 1
+    return stats
+
+
+class ExportVerifier:
+    def __init__(self, min_text_ratio=0.5, min_page_ratio=0.4, max_blank_ratio=0.3):
+        """
+        初始化导出结果校验
+
+        Args:
+            min_text_ratio (float): PDF文字长度低于页面文字长度的该比例时视为截断
+            min_page_ratio (float): PDF页数低于按文档高度估计的页数的该比例时视为截断
+            max_blank_ratio (float): 空白页超过该比例时视为渲染不完整
+        """
+        self.min_text_ratio = min_text_ratio
+        self.min_page_ratio = min_page_ratio
+        self.max_blank_ratio = max_blank_ratio
+        self.checked = 0
+        self.unreadable = 0
+        self.suspects = 0
+        self._lock = threading.Lock()
+
+    def check(self, stats, signals=None):
+        """
+        比较PDF统计与页面信号
+
+        Returns:
+            list: 疑似问题的说明，空列表表示正常
+        """
+        reasons = []
+        pages = stats['pages']
+        if not pages:
+            return ["PDF没有页面"]
+
+        if signals:
+            if signals.get('pending_images') or signals.get('placeholders'):
+                reasons.append(f"打印时仍有 {signals.get('pending_images', 0)} 张图片、"
+                               f"{signals.get('placeholders', 0)} 个占位块未加载完成")
+            page_text = signals.get('text_length') or 0
+            if page_text >= MIN_COMPARABLE_TEXT and stats['text_length'] < page_text * self.min_text_ratio:
+                reasons.append(f"PDF中只有 {stats['text_length']} 字，页面中有 {page_text} 字")
+            expected_pages = (signals.get('scroll_height') or 0) / PAGE_HEIGHT_PX
+            if expected_pages >= 3 and pages < expected_pages * self.min_page_ratio:
+                reasons.append(f"PDF只有 {pages} 页，按文档高度估计约 {round(expected_pages)} 页")
+
+        if pages >= 2 and stats['blank_pages'] / pages > self.max_blank_ratio:
+            reasons.append(f"{stats['blank_pages']}/{pages} 页为空白")
+        elif pages == 1 and stats['blank_pages'] and (signals or {}).get('text_length'):
+            reasons.append("PDF为空白页")
+        return reasons
+
+    def verify(self, sources, signals=None):
+        """
+        校验一个文档的导出结果（可在多个线程中同时调用）
+
+        Args:
+            sources (list): 该文档的输出（PDF路径、PDF数据或 PdfReader）
+            signals (dict): 打印前采集的页面信号
+
+        Returns:
+            dict: {'stats', 'reasons'}；输出无法读取（如仍在写入）时返回 None，不作判断
+        """
+        stats = {'pages': 0, 'text_length': 0, 'blank_pages': 0}
+        try:
+            for source in sources:
+                for key, value in pdf_stats(source).items():
+                    stats[key] += value
+        except Exception:
+            with self._lock:
+                self.unreadable += 1
+            return None
+
+        reasons = self.check(stats, signals)
+        with self._lock:
+            self.checked += 1
+            if reasons:
+                self.suspects += 1
+        return {'stats': stats, 'reasons': reasons}
+
+    def get_stats(self):
+        return {
+            'checked': self.checked,
+            'suspects': self.suspects,
+            'unreadable': self.unreadable,
+        }
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出看门狗
+为每个文档及其每个阶段（打开页面、等待渲染、展开懒加载内容、打印、处理对话框、结构化提取）设置墙钟截止时间。
+超时后由后台线程执行恢复动作（通常是强制关闭浏览器，使卡住的Selenium调用立即报错），
+仍未退出时再中断主线程，保证单个卡死的文档不会拖住整个队列。
+中断是异步送达的：阶段已经结束后才到达的中断会被忽略，不会被当作用户按下 Ctrl-C。
+文档总时长在阶段之间同样生效：超时后执行恢复动作，下一个阶段开始时抛出超时异常。
+文档被取消（如共享队列中的租约已丢失）时，下一个阶段开始时抛出 DocumentCancelledError。
+"""
+
+import _thread
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+# 各阶段默认超时时间（秒）
+DEFAULT_STAGE_TIMEOUTS = {
+    'navigate': 45,
+    'render': 30,
+    'print': 60,
+    'dialog': 30,
+    'extract': 60,
+    'materialize': 60,
+}
+
+
+class StageTimeoutError(Exception):
+    def __init__(self, stage, limit, scope="stage"):
+        """
+        阶段超时异常
+
+        Args:
+            stage (str): 超时的阶段名称
+            limit (float): 触发的时间限制（秒）
+            scope (str): "stage" 阶段超时；"document" 整个文档超时
+        """
+        self.stage = stage
+        self.limit = limit
+        self.scope = scope
+        what = "文档总时长" if scope == "document" else f"阶段 {stage}"
+        super().__init__(f"{what} 超过 {limit:.0f} 秒")
+
+
+class DocumentCancelledError(Exception):
+    def __init__(self, url, reason):
+        """
+        文档已被取消，不再继续处理
+
+        Args:
+            url (str): 文档URL
+            reason (str): 取消原因
+        """
+        self.url = url
+        self.reason = reason
+        super().__init__(reason)
+
+
+class ExportWatchdog:
+    def __init__(self, document_timeout=180, stage_timeouts=None, on_timeout=None,
+                 interrupt_grace=10, poll_interval=0.5, is_cancelled=None):
+        """
+        初始化看门狗
+
+        Args:
+            document_timeout (float): 单个文档的总时长上限（秒）
+            stage_timeouts (dict): 各阶段的时长上限（秒），未配置的阶段只受文档总时长限制
+            on_timeout (callable): 超时回调，参数为阶段名称；应能让卡住的操作尽快抛出异常
+            interrupt_grace (float): 执行回调后阶段仍未退出时，再等待多少秒后中断主线程
+            poll_interval (float): 后台线程检查间隔（秒）
+            is_cancelled (callable): 每个阶段开始前调用，参数为文档URL；返回取消原因时不再继续处理该文档
+        """
+        self.document_timeout = document_timeout
+        self.stage_timeouts = dict(DEFAULT_STAGE_TIMEOUTS)
+        if stage_timeouts:
+            self.stage_timeouts.update(stage_timeouts)
+        self.on_timeout = on_timeout
+        self.interrupt_grace = interrupt_grace
+        self.poll_interval = poll_interval
+        self.is_cancelled = is_cancelled
+
+        # 可重入锁：SIGINT 处理函数在主线程中执行，此时主线程可能正持有锁
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self._document_url = None
+        self._document_started = None
+        self._document_deadline = None
+        self._document_limit = None
+        self._stage = None
+        self._stage_deadline = None
+        self._stage_limit = None
+        self._stage_scope = "stage"
+        self._last_stage = None
+        self._stage_in_main_thread = False
+        self._expired = None
+        self._expired_at = None
+        self._interrupted = False
+        self._interrupt_pending = False
+        self._interruptible = False
+        self._previous_sigint = None
+        self._sigint_installed = False
+
+        self.durations = []
+        self.timeouts = []
+
+    def start(self):
+        """启动后台检查线程（在主线程中调用时接管 SIGINT，用于区分看门狗中断和用户 Ctrl-C）"""
+        if self._thread and self._thread.is_alive():
+            return
+        if not self._sigint_installed and threading.current_thread() is threading.main_thread():
+            self._previous_sigint = signal.signal(signal.SIGINT, self._handle_sigint)
+            self._sigint_installed = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="export-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台检查线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval * 4)
+            self._thread = None
+        if self._sigint_installed and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self._previous_sigint)
+            self._sigint_installed = False
+
+    def _handle_sigint(self, signum, frame):
+        with self._lock:
+            watchdog_interrupt = self._interrupt_pending
+            self._interrupt_pending = False
+            interruptible = self._interruptible
+        if not watchdog_interrupt:
+            # 用户按下 Ctrl-C
+            if callable(self._previous_sigint):
+                return self._previous_sigint(signum, frame)
+            raise KeyboardInterrupt
+        if interruptible:
+            raise KeyboardInterrupt
+        # 阶段已经结束（正常退出或已抛出 StageTimeoutError），迟到的中断直接忽略
+
+    def start_document(self, url, scale=1, started_at=None):
+        """
+        开始计时一个文档
+
+        Args:
+            url (str): 文档URL
+            scale (float): 文档总时长上限的倍数（以更长的等待时间重新导出的文档需要相应放宽）
+            started_at (float): 文档实际开始处理的时间（如多标签页模式中开始加载的时间），默认为当前时间
+        """
+        with self._lock:
+            self._document_url = url
+            self._document_started = started_at or time.time()
+            self._document_limit = self.document_timeout * scale
+            self._document_deadline = self._document_started + self._document_limit
+            self._last_stage = None
+            self._expired = None
+            self._expired_at = None
+            self._interrupted = False
+
+    def finish_document(self):
+        """结束文档计时并记录耗时"""
+        with self._lock:
+            if self._document_started is not None:
+                self.durations.append(time.time() - self._document_started)
+            self._document_url = None
+            self._document_started = None
+            self._document_deadline = None
+            self._document_limit = None
+            self._expired = None
+
+    def record_duration(self, seconds):
+        """记录一个未经 start_document 计时的文档耗时（如流水线模式）"""
+        with self._lock:
+            self.durations.append(seconds)
+
+    @contextmanager
+    def stage(self, name, scale=1):
+        """
+        在截止时间内执行一个阶段，超时时抛出 StageTimeoutError
+
+        Args:
+            name (str): 阶段名称
+            scale (float): 阶段时长上限的倍数（等待时间按倍数放大的阶段需要相应放宽）
+
+        用法：
+            with watchdog.stage('navigate'):
+                driver.get(url)
+        """
+        limit = self.stage_timeouts.get(name)
+        limit = limit * scale if limit else None
+
+        url = self._document_url
+        reason = self.is_cancelled(url) if url and self.is_cancelled else None
+        if reason:
+            raise DocumentCancelledError(url, reason)
+
+        with self._lock:
+            now = time.time()
+            # 文档总时长在阶段之间已经用完（后台线程可能已执行恢复动作）
+            if self._document_deadline and (self._expired or now >= self._document_deadline):
+                self._expired = self._expired or (name, self._document_limit, "document")
+                expired = self._take_expired()
+                raise StageTimeoutError(*expired)
+
+            deadline = now + limit if limit else None
+            scope, scope_limit = "stage", limit
+            if self._document_deadline and (deadline is None or self._document_deadline < deadline):
+                deadline = self._document_deadline
+                scope, scope_limit = "document", self._document_limit
+            self._stage = name
+            self._stage_deadline = deadline
+            self._stage_limit = scope_limit
+            self._stage_scope = scope
+            self._stage_in_main_thread = threading.current_thread() is threading.main_thread()
+            self._interruptible = self._stage_in_main_thread
+
+        try:
+            yield
+            # 在 try 内关闭中断：此前到达的看门狗中断都由下面的 except 转换为 StageTimeoutError
+            with self._lock:
+                self._interruptible = False
+        except BaseException as e:
+            with self._lock:
+                self._interruptible = False
+            expired = self._leave_stage()
+            if expired and not isinstance(e, StageTimeoutError):
+                raise StageTimeoutError(*expired) from e
+            raise
+        expired = self._leave_stage()
+        if expired:
+            raise StageTimeoutError(*expired)
+
+    def _leave_stage(self):
+        with self._lock:
+            self._last_stage = self._stage
+            self._stage = None
+            self._stage_deadline = None
+            return self._take_expired()
+
+    def _take_expired(self):
+        """取出并记录已触发的超时（调用方持有锁）"""
+        expired = self._expired
+        self._expired = None
+        if expired:
+            self.timeouts.append({
+                'stage': expired[0],
+                'limit': expired[1],
+                'scope': expired[2],
+                'time': time.time(),
+            })
+        return expired
+
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            callback_stage = None
+            now = time.time()
+            with self._lock:
+                if self._stage is None:
+                    # 阶段之间：文档总时长用完时执行恢复动作，下一个阶段开始时抛出超时异常
+                    if (self._document_deadline and self._expired is None
+                            and now >= self._document_deadline):
+                        self._expired = (self._last_stage or "document", self._document_limit, "document")
+                        self._expired_at = now
+                        callback_stage = self._expired[0]
+                elif self._stage_deadline is None:
+                    continue
+                elif self._expired is None and now >= self._stage_deadline:
+                    self._expired = (self._stage, self._stage_limit, self._stage_scope)
+                    self._expired_at = now
+                    callback_stage = self._stage
+                elif (self._expired is not None and not self._interrupted
+                      and self._stage_in_main_thread and self._interruptible
+                      and now - self._expired_at >= self.interrupt_grace):
+                    # 恢复回调之后阶段仍未退出（例如卡在键盘操作上），中断主线程
+                    # （未接管 SIGINT 时无法区分迟到的中断和用户 Ctrl-C，不中断）
+                    self._interrupted = True
+                    if self._sigint_installed:
+                        self._interrupt_pending = True
+                        _thread.interrupt_main()
+
+            if callback_stage:
+                print(f"\n⏰ 看门狗: 阶段 {callback_stage} 超时，正在重置浏览器...")
+                if self.on_timeout:
+                    try:
+                        self.on_timeout(callback_stage)
+                    except Exception as e:
+                        print(f"⚠️  看门狗恢复操作失败: {e}")
+
+    def percentile(self, percent):
+        """文档耗时的百分位数（秒）"""
+        if not self.durations:
+            return 0.0
+        ordered = sorted(self.durations)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def get_stats(self):
+        """耗时与超时统计"""
+        return {
+            'documents_timed': len(self.durations),
+            'duration_p50': round(self.percentile(50), 2),
+            'duration_p99': round(self.percentile(99), 2),
+            'duration_max': round(max(self.durations), 2) if self.durations else 0.0,
+            'timeouts': len(self.timeouts),
+        }
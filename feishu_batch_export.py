@@ -7,6 +7,9 @@
 需要安装：
 pip install selenium pyautogui webdriver-manager
 
+selenium、pyautogui、webdriver-manager 在真正启动浏览器或操作键盘时才导入，
+导入本模块本身不需要图形界面（pyautogui 导入时需要 DISPLAY）。
+
 使用前请确保：
 1. 安装Chrome浏览器
 2. 安装飞书文档助手Chrome插件
@@ -16,23 +19,42 @@ pip install selenium pyautogui webdriver-manager
 import time
 import os
 import sys
-import json
-import pyautogui
-from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
+import argparse
+import hashlib
+import threading
+from collections import deque
 
 # 导入进度监控器
 from progress_monitor import ProgressMonitor
+from tab_pool import TabPool
+from request_blocker import RequestBlocker
+from export_watchdog import DocumentCancelledError, ExportWatchdog, StageTimeoutError
+from export_state import ExportStateStore, default_db_path
+from work_queue import HTTPWorkQueue, LeasedLinkQueue, LocalLinkQueue
+from export_profiler import add_profile_arguments, profile_run
+from structured_export import StructuredExporter
+from asset_store import AssetStore
+from browser_cache import BrowserDiskCache
+from scheduler import MakespanScheduler
+from streaming_merge import StreamingMerger
+from progress_hub import ProgressPublisher
+from export_verifier import ExportVerifier
+from link_closure import LinkClosure
+from export_pipeline import MATERIALIZE_SCRIPT, PRINT_OPTIONS, STAGE_LABELS, ExportPipeline, PdfWriterStage, claim_path
 
 class FeishuBatchExporter:
-    def __init__(self, links_file, download_dir, delay=3):
+    def __init__(self, links_file, download_dir, delay=3,
+                 recycle_after_docs=50, max_browser_rss_mb=2048, max_requeues=2,
+                 concurrency_mode="single", tab_count=3, tab_load_timeout=60,
+                 block_requests=True, block_list_file="block_list.json", preflight=False,
+                 document_timeout=180, stage_timeouts=None, state_db=None,
+                 work_queue=None, worker_id=None, profiler=None, export_format="pdf",
+                 asset_cache_mb=1024, browser_cache=False, browser_cache_mb=1024,
+                 schedule="file", planned_workers=None,
+                 stream_merge=True, merged_name="飞书文档_合并.pdf", merge_window=20,
+                 progress_hub=None, pipeline_workers=None, pipeline_queue_size=4, pipeline_headless=True,
+                 materialize_max_scrolls=400, verify_exports=True, verify_retries=1, retry_budget_factor=3,
+                 link_closure=False, closure_max_depth=2, closure_domains=None):
         """
         初始化批量导出工具
         
@@ -40,6 +62,53 @@ class FeishuBatchExporter:
             links_file (str): 包含文档链接的文本文件路径
             download_dir (str): 下载目录路径
             delay (int): 每个操作之间的延迟时间（秒）
+            recycle_after_docs (int): 每处理多少个文档后重启一次浏览器（0表示不按数量重启）
+            max_browser_rss_mb (int): 浏览器进程树内存上限（MB），超过后重启浏览器（0表示不限制）
+            max_requeues (int): 浏览器崩溃时同一文档最多重新排队的次数
+            concurrency_mode (str): "single" 逐个处理；"tabs" 在同一浏览器中用多个标签页并行加载；
+                                    "pipeline" 分阶段流水线（多标签页渲染 → 展开 → CDP打印 → 写入/校验 → 后处理）
+            tab_count (int): tabs/pipeline模式下的标签页数量（即渲染阶段的并行数）
+            tab_load_timeout (int): tabs模式下单个标签页的加载超时（秒），超时后替换该标签页
+            block_requests (bool): 是否屏蔽埋点、音视频、头像等与PDF内容无关的请求
+            block_list_file (str): 屏蔽规则JSON文件路径（不存在时使用默认规则）
+            preflight (bool): 启动浏览器前是否先并发预检所有链接，剔除失效和需要登录的链接
+            document_timeout (int): 单个文档的总时长上限（秒），超时后重置浏览器并记为超时
+            stage_timeouts (dict): 各阶段（navigate/render/print/dialog）的时长上限（秒）
+            state_db (str): 导出状态库（SQLite）路径，默认为下载目录下的 export_state.db
+            work_queue: 共享工作队列（SQLiteWorkQueue 或 HTTPWorkQueue），提供时从队列领取文档，
+                        可在多个进程/机器上同时运行导出
+            worker_id (str): 领取文档时使用的工作进程标识，默认为 主机名:进程号
+            profiler (RunProfiler): 性能剖析器（--profile），用于保存指定文档的Chrome追踪
+            export_format (str): "pdf" 通过打印导出PDF；"markdown"/"html" 直接把文档块转换为
+                                 Markdown或HTML（图片存入附属目录），不经过打印和对话框
+            asset_cache_mb (int): markdown/html模式下图片资源库（下载目录/.assets）的大小上限（MB），
+                                  同一图片只下载一次，各文档以硬链接引用
+            browser_cache (bool): 是否为浏览器分配持久化的磁盘缓存（下载目录/.browser_cache），
+                                  重启浏览器和再次运行时复用已下载的JS/CSS/字体；
+                                  开启后同时开启performance日志以统计命中率
+            browser_cache_mb (int): 浏览器磁盘缓存的大小上限（MB）
+            schedule (str): "file" 按文件顺序（默认）；"longest_first" 按历史耗时从长到短处理，
+                            只在并行数大于1时生效（串行处理时顺序不影响总用时）
+            planned_workers (int): 估计总用时时的并行数，默认为标签页数（tabs模式）或1；
+                                   共享队列时应设为参与导出的进程总数
+            stream_merge (bool): pdf模式下每个文档导出后立即并入合并文件（按链接文件顺序，带目录），
+                                 导出结束时合并文件随即可用；使用共享队列时不启用（每个进程只有部分文档）
+            merged_name (str): 合并文件名（保存在下载目录中）
+            merge_window (int): 合并重排缓冲区最多暂存的文档数，超出后按位置提前插入
+            progress_hub (str): 进度汇总服务地址 "host:port"（progress_hub.py serve），
+                                提供时把进度事件发给汇总服务，多个导出进程的进度在其 /status 接口中统一查看
+            pipeline_workers (dict): pipeline模式下写入/校验阶段的线程数，默认 {'write': 2}
+                                     （后处理阶段修改合并文件和进度，始终只有一个线程）
+            pipeline_queue_size (int): pipeline模式下阶段之间队列的容量（已满时上游等待）
+            pipeline_headless (bool): pipeline模式下以无界面方式运行浏览器（打印不需要对话框和窗口焦点）
+            materialize_max_scrolls (int): pipeline模式下展开阶段（以及校验导出时打印前采集页面信号）最多滚动的屏数
+            verify_exports (bool): pdf模式下比较导出的PDF（页数、文字长度、空白页）与打印前采集的页面信号
+                                   （块数、文字长度、文档高度），发现疑似截断或空白的导出
+            verify_retries (int): 疑似不完整的文档最多重新导出的次数（用完后保留最后一次的结果并给出警告）
+            retry_budget_factor (float): 每次重新导出时渲染等待时间（delay）和展开等待时间放大的倍数
+            link_closure (bool): pdf模式下在后台扫描每个导出成功的PDF中的链接，把引用的新飞书文档加入导出队列
+            closure_max_depth (int): 链接闭包的最大深度（链接文件中的文档为第0层，None表示不限制）
+            closure_domains (list): 链接闭包跟随的域名白名单，默认为链接文件中出现的域名
         """
         self.links_file = links_file
         self.download_dir = download_dir
@@ -48,14 +117,119 @@ class FeishuBatchExporter:
         self.processed_links = []
         self.failed_links = []
         
-        # 初始化进度监控器
-        self.monitor = ProgressMonitor()
+        # 浏览器回收策略
+        self.recycle_after_docs = recycle_after_docs
+        self.max_browser_rss_mb = max_browser_rss_mb
+        self.max_requeues = max_requeues
+        self.docs_since_restart = 0
+        self.browser_restarts = 0
+        self.peak_browser_rss_mb = 0.0
+        self.requeue_counts = {}
+        
+        # 并发模式
+        self.concurrency_mode = concurrency_mode
+        self.tab_count = tab_count
+        self.tab_load_timeout = tab_load_timeout
+        
+        # 打印导出：导出后等待输出文件写入完成（大小不再变化）的最长时间（秒）
+        self.output_settle_timeout = 30
+        self.output_poll_interval = 0.5
+        
+        # 分阶段流水线
+        self.pipeline_workers = pipeline_workers
+        self.pipeline_queue_size = pipeline_queue_size
+        self.pipeline_headless = pipeline_headless
+        self.materialize_max_scrolls = materialize_max_scrolls
+        self.pipeline = None
+        self.pdf_writer = None
+        
+        # 导出结果校验：疑似截断/空白的文档以更长的渲染时间重新导出
+        self.verifier = ExportVerifier() if verify_exports and export_format == "pdf" else None
+        self.verify_retries = verify_retries
+        self.retry_budget_factor = retry_budget_factor
+        # 重新导出次数和待重新排队的文档：pipeline模式下由后处理线程写入、主线程读取
+        self._retry_lock = threading.Lock()
+        self.verify_attempts = {}
+        self.retry_links = deque()
+        self.suspect_exports = []
+        self.held_outputs = {}  # 等待重新导出的文档 → 暂存的疑似不完整的导出
+        
+        # 链接闭包：从导出的PDF中发现被引用的文档
+        self.closure_enabled = link_closure and export_format == "pdf"
+        self.closure_max_depth = closure_max_depth
+        self.closure_domains = closure_domains
+        self.link_closure = None
+        self.export_queue = None
+        
+        # 请求屏蔽
+        self.request_blocker = RequestBlocker.from_file(block_list_file) if block_requests else None
+        
+        # 链接预检
+        self.preflight = preflight
+        self.skipped_links = []
+        self.unverified_links = []
+        
+        # 看门狗：每个文档和每个阶段的截止时间
+        self.watchdog = ExportWatchdog(document_timeout, stage_timeouts, on_timeout=self.reset_hung_browser,
+                                       is_cancelled=self.document_cancelled)
+        self.timed_out_links = []
         
         # 确保下载目录存在
         os.makedirs(download_dir, exist_ok=True)
         
+        # 导出状态库：记录链接、每次尝试、输出文件和错误
+        self.state = ExportStateStore(state_db or default_db_path(download_dir))
+        self.run_id = None
+        self.current_attempts = {}
+        
+        # 共享工作队列
+        self.work_queue = work_queue
+        self.worker_id = worker_id
+        self.lease_queue = None
+        
+        # 性能剖析
+        self.profiler = profiler
+        
+        # 持久化浏览器磁盘缓存
+        self.browser_cache = (BrowserDiskCache(os.path.join(download_dir, ".browser_cache"), browser_cache_mb)
+                              if browser_cache else None)
+        
+        # 按历史耗时排程
+        self.scheduler = None
+        if schedule == "longest_first":
+            workers = planned_workers or (tab_count if concurrency_mode in ("tabs", "pipeline") else 1)
+            if workers > 1:
+                self.scheduler = MakespanScheduler(self.state, workers=workers)
+            else:
+                print("🗓️  只有1个工作进程/标签页，最长优先无法缩短总用时，按文件顺序处理")
+        self.export_elapsed = 0.0
+        
+        # 导出格式：pdf 走打印流程，markdown/html 直接提取文档内容
+        self.export_format = export_format
+        self.stream_merge = stream_merge and export_format == "pdf" and work_queue is None
+        self.merged_name = merged_name
+        self.merge_window = merge_window
+        self.streaming_merger = None
+        self.asset_store = None
+        self.structured_exporter = None
+        if export_format != "pdf":
+            self.asset_store = AssetStore(os.path.join(download_dir, ".assets"),
+                                          max_bytes=asset_cache_mb * 1024 * 1024)
+            self.structured_exporter = StructuredExporter(download_dir, export_format,
+                                                          asset_store=self.asset_store)
+        
+        # 初始化进度监控器（可选：同时把进度发给汇总服务）
+        self.progress_publisher = ProgressPublisher(progress_hub, worker_id) if progress_hub else None
+        self.monitor = ProgressMonitor(state_store=self.state, publisher=self.progress_publisher)
+        
     def setup_chrome_driver(self):
         """设置Chrome驱动"""
+        from selenium import webdriver
+        from selenium.common.exceptions import WebDriverException
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+        
         chrome_options = Options()
         
         # 设置下载目录
@@ -78,11 +252,37 @@ class FeishuBatchExporter:
         # 允许扩展（为了使用飞书插件）
         chrome_options.add_argument("--enable-extensions")
         
+        # 多标签页模式下不阻塞等待页面加载，由标签页池自行轮询加载状态
+        if self.concurrency_mode in ("tabs", "pipeline"):
+            chrome_options.page_load_strategy = "none"
+        
+        # 流水线模式通过CDP打印，不需要窗口和对话框
+        if self.concurrency_mode == "pipeline" and self.pipeline_headless:
+            chrome_options.add_argument("--headless=new")
+        
+        # 屏蔽请求通过CDP完成，不需要performance日志；只在性能剖析时开启日志统计被屏蔽的请求
+        if self.request_blocker and self.profiler:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        
+        # 复用持久化的磁盘缓存（槽位全部被占用时不使用缓存）
+        if self.browser_cache:
+            try:
+                self.browser_cache.configure_chrome(chrome_options)
+            except Exception as e:
+                print(f"⚠️  无法使用浏览器缓存: {e}")
+                self.browser_cache = None
+        
+        # 性能剖析：在performance日志中附带指定文档的Chrome追踪事件
+        if self.profiler and self.profiler.chrome_tracing_enabled:
+            self.profiler.configure_chrome(chrome_options)
+        
         try:
             # 自动下载并安装ChromeDriver
             service = Service(ChromeDriverManager().install())
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
             print("✅ Chrome驱动启动成功")
+            self.driver.set_page_load_timeout(self.watchdog.stage_timeouts['navigate'])
+            self.apply_request_blocking()
             return True
         except WebDriverException as e:
             print(f"❌ Chrome驱动启动失败: {e}")
@@ -92,6 +292,153 @@ class FeishuBatchExporter:
             print(f"❌ 未知错误: {e}")
             return False
     
+    def apply_request_blocking(self):
+        """在当前标签页上启用请求屏蔽"""
+        if self.request_blocker and self.driver:
+            self.request_blocker.apply(self.driver)
+    
+    def process_performance_log(self, url):
+        """
+        读取当前浏览器的performance日志，汇总请求屏蔽、缓存命中统计并保存剖析追踪
+        
+        日志读取后即被清空，因此只读取一次，再分别交给请求屏蔽器、浏览器缓存和剖析器。
+        """
+        tracing = self.profiler and self.profiler.chrome_tracing_enabled
+        blocking_stats = self.request_blocker and self.profiler
+        if not self.driver or not (blocking_stats or self.browser_cache or tracing):
+            return
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception:
+            return
+        if blocking_stats:
+            self.request_blocker.collect(self.driver, entries)
+        if self.browser_cache:
+            self.browser_cache.collect(entries)
+        if tracing:
+            try:
+                self.profiler.record_document(self.driver, url, entries)
+            except Exception as e:
+                print(f"⚠️  保存Chrome追踪失败: {e}")
+    
+    def quit_chrome_driver(self):
+        """关闭Chrome驱动（浏览器已崩溃时忽略错误）"""
+        if not self.driver:
+            return
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"⚠️  关闭浏览器时出错: {e}")
+        finally:
+            self.driver = None
+    
+    def restart_chrome_driver(self, reason):
+        """
+        重启Chrome驱动
+        
+        Args:
+            reason (str): 重启原因（用于日志输出）
+        """
+        print(f"♻️  重启Chrome浏览器: {reason}")
+        self.quit_chrome_driver()
+        self.browser_restarts += 1
+        self.docs_since_restart = 0
+        return self.setup_chrome_driver()
+    
+    def reset_hung_browser(self, stage):
+        """
+        看门狗超时回调：强制结束浏览器进程树，让卡住的Selenium调用立即报错，
+        随后由导出循环重启浏览器
+        """
+        if not self.driver:
+            return
+        try:
+            process = self.driver.service.process
+        except AttributeError:
+            return
+        
+        try:
+            import psutil
+            root = psutil.Process(process.pid)
+            for child in root.children(recursive=True):
+                child.kill()
+            root.kill()
+        except ImportError:
+            process.kill()
+        except Exception as e:
+            print(f"⚠️  结束浏览器进程失败: {e}")
+    
+    def is_driver_alive(self):
+        """检查浏览器是否仍可响应"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+    
+    def replace_timed_out_tab(self, pool, tab):
+        """
+        阶段超时后浏览器仍可响应（如结束浏览器进程失败）：只替换卡住的标签页，其他标签页继续处理
+        
+        Returns:
+            bool: 已替换时返回True；浏览器已被重置或替换失败时返回False（需要重启浏览器）
+        """
+        if self.is_driver_alive():
+            try:
+                pool.replace(tab)
+                return True
+            except Exception as e:
+                print(f"⚠️  替换超时的标签页失败: {e}")
+        pool.release(tab)
+        return False
+    
+    def get_browser_rss_mb(self):
+        """
+        统计浏览器进程树（chromedriver及其所有Chrome子进程）的常驻内存
+        
+        Returns:
+            float: 内存占用（MB），无法统计时返回None
+        """
+        try:
+            import psutil
+        except ImportError:
+            return None
+        
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+        except Exception:
+            return None
+        
+        total_rss = 0
+        for process in processes:
+            try:
+                total_rss += process.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total_rss / (1024 * 1024)
+    
+    def should_recycle_browser(self):
+        """
+        判断是否需要重启浏览器
+        
+        Returns:
+            str: 需要重启时返回原因，否则返回None
+        """
+        if self.recycle_after_docs and self.docs_since_restart >= self.recycle_after_docs:
+            return f"已连续处理 {self.docs_since_restart} 个文档"
+        
+        rss_mb = self.get_browser_rss_mb()
+        if rss_mb is None:
+            return None
+        self.peak_browser_rss_mb = max(self.peak_browser_rss_mb, rss_mb)
+        
+        if self.max_browser_rss_mb and rss_mb >= self.max_browser_rss_mb:
+            return f"浏览器内存 {rss_mb:.0f}MB 超过阈值 {self.max_browser_rss_mb}MB"
+        return None
+    
     def load_document_links(self):
         """从文件加载文档链接"""
         try:
@@ -104,6 +451,57 @@ class FeishuBatchExporter:
             print(f"❌ 加载链接文件失败: {e}")
             return []
     
+    def preflight_links(self, links):
+        """
+        启动浏览器前并发预检链接：剔除不存在和需要登录的链接，跳转的链接替换为最终URL，
+        检查出错的链接（可能只是网络波动）仍然导出，在报告中记为未验证
+        
+        Returns:
+            list: 可以导出的链接
+        """
+        from link_preflight import LinkPreflightChecker, SKIP_STATUSES, STATUS_ERROR
+        
+        checker = LinkPreflightChecker(report_file=os.path.join(self.download_dir, "preflight_report.json"))
+        results = checker.check_links(links)
+        checker.print_summary(results)
+        checker.save_report(results)
+        self.state.record_preflight(results)
+        
+        exportable = checker.exportable_links(results)
+        self.skipped_links = [result for result in results if result['status'] in SKIP_STATUSES]
+        self.unverified_links = [result for result in results if result['status'] == STATUS_ERROR]
+        print(f"✅ 预检后导出 {len(exportable)} 个链接（其中未验证 {len(self.unverified_links)} 个），"
+              f"跳过 {len(self.skipped_links)} 个")
+        return exportable
+    
+    def preflight_discovered_links(self, urls):
+        """
+        预检链接闭包发现的新文档（与启动前的预检规则相同）
+        
+        Returns:
+            list: 可以导出的链接
+        """
+        from link_preflight import LinkPreflightChecker, SKIP_STATUSES, STATUS_ERROR, STATUS_LABELS
+        
+        try:
+            checker = LinkPreflightChecker()
+            results = checker.check_links(urls)
+        except Exception as e:
+            print(f"⚠️  预检新发现的文档失败，直接加入导出队列: {e}")
+            return list(urls)
+        try:
+            self.state.record_preflight(results)
+        except Exception as e:
+            print(f"⚠️  写入状态库失败: {e}")
+        
+        for result in results:
+            if result['status'] in SKIP_STATUSES:
+                self.skipped_links.append(result)
+                print(f"⏭️  跳过新发现的文档（{STATUS_LABELS[result['status']]}）: {result['url']}")
+            elif result['status'] == STATUS_ERROR:
+                self.unverified_links.append(result)
+        return checker.exportable_links(results)
+    
     def export_single_document(self, url, doc_index, total_docs):
         """
         导出单个文档
@@ -112,46 +510,384 @@ class FeishuBatchExporter:
             url (str): 文档URL
             doc_index (int): 当前文档索引
             total_docs (int): 总文档数量
+        
+        Returns:
+            str: 'success'、'failed'，浏览器崩溃时返回'requeue'（需重启浏览器后重试），
+                 租约丢失、文档已分配给其他工作进程时返回'cancelled'
         """
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        
+        # 重新导出的文档渲染等待时间按倍数放大，时长上限也相应放宽
+        budget = self.render_budget(url)
+        self.watchdog.start_document(url, scale=budget)
+        self.begin_attempt(url)
         try:
-            # 更新进度显示
-            self.monitor.update_progress(url, False, "正在处理...")
-            
-            # 访问文档页面
-            self.driver.get(url)
+            # 更新当前文档显示（不计入成功/失败）
+            self.monitor.set_current(url, "正在处理...")
             
-            # 等待页面加载完成
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            with self.watchdog.stage('navigate'):
+                # 访问文档页面
+                self.driver.get(url)
+                
+                # 等待页面加载完成
+                WebDriverWait(self.driver, 15).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "body"))
+                )
             
             # 等待页面完全加载
-            time.sleep(self.delay)
+            with self.watchdog.stage('render', scale=budget):
+                time.sleep(self.delay * budget)
             
-            # 尝试找到并点击导出按钮
+            return self.export_loaded_document(url)
+        
+        except StageTimeoutError as e:
+            self.record_timeout(url, e)
+            return 'timeout'
+        except DocumentCancelledError as e:
+            self.record_cancelled(url, e)
+            return 'cancelled'
+        except TimeoutException as e:
+            if self.should_requeue(url):
+                return 'requeue'
+            self.record_failure(url, f"页面加载超时: {str(e)}", kind='load_timeout')
+            return 'failed'
+        except Exception as e:
+            if self.should_requeue(url):
+                return 'requeue'
+            self.record_failure(url, f"处理出错: {str(e)}")
+            return 'failed'
+        finally:
+            self.watchdog.finish_document()
+    
+    def export_loaded_document(self, url):
+        """按导出格式处理当前窗口中已加载完成的文档"""
+        if self.structured_exporter:
+            return self.save_structured_document(url)
+        return self.print_loaded_document(url)
+    
+    def save_structured_document(self, url):
+        """
+        把当前窗口中的文档直接转换为Markdown/HTML（不经过打印）
+        
+        Returns:
+            str: 'success' 或 'failed'
+        """
+        with self.watchdog.stage('extract'):
+            path = self.structured_exporter.export(self.driver, url)
+        
+        if path:
+            self.monitor.update_progress(url, True)
+            self.processed_links.append(url)
+            self.end_attempt(url, 'success', outputs=[path])
+            return 'success'
+        
+        self.record_failure(url, "页面中没有找到文档内容", kind='empty_document')
+        return 'failed'
+    
+    def print_loaded_document(self, url):
+        """
+        打印当前窗口中已加载完成的文档
+        
+        Returns:
+            str: 'success'、'failed'，或导出结果疑似不完整、需要重新导出时返回'retry'
+        """
+        outputs_before = self.snapshot_outputs()
+        signals = self.capture_page_signals(url)
+        
+        # 尝试找到并点击导出按钮
+        with self.watchdog.stage('print'):
             export_success = self.click_export_button()
-            
-            if export_success:
-                # 处理可能的弹窗
+        
+        if export_success:
+            # 处理可能的弹窗
+            with self.watchdog.stage('dialog'):
                 self.handle_download_dialog()
-                
-                # 更新进度为成功
-                self.monitor.update_progress(url, True)
-                self.processed_links.append(url)
-            else:
-                # 更新进度为失败
-                self.monitor.update_progress(url, False, "无法找到导出按钮")
-                self.failed_links.append(url)
-                
-        except TimeoutException as e:
-            self.monitor.update_progress(url, False, f"页面加载超时: {str(e)}")
-            self.failed_links.append(url)
+            
+            # 保存对话框关闭时浏览器可能还在写文件，等写完再校验和交给后续步骤
+            outputs = self.wait_for_new_outputs(outputs_before)
+            if self.verify_outputs(url, outputs, signals):
+                return 'retry'
+            
+            # 更新进度为成功
+            self.monitor.update_progress(url, True)
+            self.processed_links.append(url)
+            self.end_attempt(url, 'success', outputs=outputs)
+            return 'success'
+        
+        # 更新进度为失败
+        self.record_failure(url, "无法找到导出按钮", kind='no_export_button')
+        return 'failed'
+    
+    def render_budget(self, url):
+        """渲染等待时间的倍数：每次因疑似不完整而重新导出时放大 retry_budget_factor 倍"""
+        return self.retry_budget_factor ** self.verify_attempt_count(url)
+    
+    def verify_attempt_count(self, url):
+        """文档因疑似不完整已重新导出的次数"""
+        with self._retry_lock:
+            return self.verify_attempts.get(url, 0)
+    
+    def queue_retry(self, url):
+        """把疑似不完整的文档交给主线程重新排队（可在后处理线程中调用）"""
+        with self._retry_lock:
+            self.retry_links.append(url)
+    
+    def take_retry_links(self):
+        """取出全部待重新排队的文档"""
+        with self._retry_lock:
+            links = list(self.retry_links)
+            self.retry_links.clear()
+        return links
+    
+    def has_retry_links(self):
+        with self._retry_lock:
+            return bool(self.retry_links)
+    
+    def can_retry_suspect(self, url):
+        """疑似不完整的文档是否还可以重新导出"""
+        return self.verifier is not None and self.verify_attempt_count(url) < self.verify_retries
+    
+    def capture_page_signals(self, url):
+        """
+        打印前逐屏滚动到文档末尾并采集页面信号（块数、文字长度、文档高度等），
+        与pipeline模式的展开阶段相同，虚拟列表中不在视口内的块也计算在内；失败时返回None，不影响导出
+        """
+        if not self.verifier:
+            return None
+        budget = self.render_budget(url)
+        try:
+            self.driver.set_script_timeout(self.watchdog.stage_timeouts['materialize'] * budget)
+            with self.watchdog.stage('materialize', scale=budget):
+                signals = self.driver.execute_async_script(MATERIALIZE_SCRIPT, self.materialize_max_scrolls, budget)
+        except (StageTimeoutError, DocumentCancelledError):
+            raise
+        except Exception:
+            return None
+        return signals if isinstance(signals, dict) else None
+    
+    def verify_outputs(self, url, outputs, signals):
+        """
+        校验打印导出的文件
+        
+        Returns:
+            bool: 疑似不完整且已重新排队时返回True（输出文件已移到暂存目录）
+        """
+        if not self.verifier or not outputs:
+            return False
+        verification = self.verifier.verify(outputs, signals)
+        if not verification or not verification['reasons']:
+            return False
+        if self.can_retry_suspect(url):
+            self.requeue_suspect(url, verification, outputs)
+            return True
+        self.warn_suspect(url, verification)
+        return False
+    
+    def requeue_suspect(self, url, verification, outputs=()):
+        """疑似截断或空白的导出：输出文件移到暂存目录，记录本次尝试，之后以更长的渲染时间重新导出"""
+        with self._retry_lock:
+            self.verify_attempts[url] = self.verify_attempts.get(url, 0) + 1
+        self.hold_outputs(url, outputs, verification)
+        reasons = "；".join(verification['reasons'])
+        self.end_attempt(url, 'requeued', kind='suspect_export', error_msg=reasons)
+        print(f"🔍 导出结果疑似不完整，将以 {self.render_budget(url):g} 倍渲染时间重新导出: {url}")
+        print(f"   {reasons}")
+    
+    def hold_outputs(self, url, outputs, verification):
+        """
+        暂存疑似不完整的导出，直到重新导出成功
+        
+        重新导出失败或超时时恢复暂存的文件（见 restore_held_outputs），不会因为重试而什么都没有留下。
+        """
+        self.discard_held_outputs(url)
+        hold_dir = os.path.join(self.download_dir, ".suspect_exports")
+        prefix = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+        held = []
+        for path in outputs:
+            held_path = os.path.join(hold_dir, f"{prefix}-{os.path.basename(path)}")
+            try:
+                os.makedirs(hold_dir, exist_ok=True)
+                os.replace(path, held_path)
+                held.append((held_path, path))
+            except OSError as e:
+                print(f"⚠️  暂存疑似不完整的导出失败: {e}")
+        self.held_outputs[url] = {'paths': held, 'verification': verification}
+    
+    def discard_held_outputs(self, url):
+        """重新导出成功：删除暂存的上一次导出"""
+        held = self.held_outputs.pop(url, None)
+        for held_path, _ in (held['paths'] if held else ()):
+            try:
+                os.remove(held_path)
+            except OSError:
+                pass
+    
+    def restore_held_outputs(self, url, error_msg):
+        """
+        重新导出失败或超时：恢复上一次疑似不完整的导出，记为成功并给出警告
+        
+        Returns:
+            bool: 有暂存的导出并已恢复时返回True
+        """
+        held = self.held_outputs.pop(url, None)
+        if not held:
+            return False
+        outputs = []
+        for held_path, path in held['paths']:
+            try:
+                target = claim_path(path)
+                os.replace(held_path, target)
+                outputs.append(target)
+            except OSError as e:
+                print(f"⚠️  恢复暂存的导出失败: {e}")
+        if not outputs:
+            return False
+        
+        print(f"♻️  重新导出失败（{error_msg}），保留上一次的导出: {url}")
+        self.warn_suspect(url, held['verification'])
+        self.monitor.update_progress(url, True)
+        self.processed_links.append(url)
+        self.end_attempt(url, 'success', kind='suspect_export', error_msg=f"重新导出失败，保留上一次的导出: {error_msg}",
+                         outputs=outputs)
+        return True
+    
+    def warn_suspect(self, url, verification):
+        """重新导出次数已用完仍疑似不完整：保留结果，在总结和报告中列出"""
+        self.suspect_exports.append({'url': url, 'reasons': verification['reasons'], 'pdf': verification['stats']})
+        print(f"⚠️  导出结果疑似不完整（已重新导出 {self.verify_attempt_count(url)} 次）: {url}")
+        print(f"   {'；'.join(verification['reasons'])}")
+    
+    def snapshot_outputs(self):
+        """下载目录中现有的PDF文件"""
+        try:
+            return {name for name in os.listdir(self.download_dir) if name.lower().endswith('.pdf')}
+        except OSError:
+            return set()
+    
+    def find_new_outputs(self, before):
+        """与之前的快照相比新出现的PDF文件路径"""
+        return [os.path.join(self.download_dir, name) for name in sorted(self.snapshot_outputs() - before)]
+    
+    def wait_for_new_outputs(self, before):
+        """
+        等待新出现的PDF写入完成：连续两次检查文件列表和大小都不变（且不为空文件）时返回，
+        最多等待 output_settle_timeout 秒，超时时返回当时已出现的文件
+        
+        Returns:
+            list: 新PDF文件路径
+        """
+        deadline = time.time() + self.output_settle_timeout
+        previous = None
+        while True:
+            sizes = {}
+            for path in self.find_new_outputs(before):
+                try:
+                    sizes[path] = os.path.getsize(path)
+                except OSError:
+                    sizes[path] = 0
+            if sizes and sizes == previous and all(sizes.values()):
+                return list(sizes)
+            if time.time() >= deadline:
+                return list(sizes)
+            previous = sizes
+            time.sleep(self.output_poll_interval)
+    
+    def begin_attempt(self, url):
+        """在状态库中记录一次导出尝试的开始"""
+        try:
+            self.current_attempts[url] = self.state.start_attempt(self.run_id, url, worker=f"pid-{os.getpid()}")
+        except Exception as e:
+            print(f"⚠️  写入状态库失败: {e}")
+    
+    def end_attempt(self, url, status, kind=None, error_msg=None, stage=None, outputs=()):
+        """在状态库中记录导出尝试的结果和输出文件"""
+        if status == 'success':
+            self.discard_held_outputs(url)
+        
+        if self.link_closure and status == 'success':
+            # 共享队列中记录的深度（文档可能由其他进程发现）
+            depth = self.lease_queue.depth(url) if self.lease_queue else None
+            self.link_closure.submit(url, outputs, depth=depth)
+        
+        if self.streaming_merger:
+            try:
+                if status == 'success':
+                    self.streaming_merger.add(url, outputs)
+                elif status in ('failed', 'timeout'):
+                    self.streaming_merger.skip(url)
+            except Exception as e:
+                print(f"⚠️  并入合并文件失败: {e}")
+        
+        if self.lease_queue and status in ('success', 'failed', 'timeout', 'cancelled'):
+            try:
+                self.lease_queue.finish(url, status)
+            except Exception as e:
+                print(f"⚠️  提交工作队列结果失败: {e}")
+        
+        attempt_id = self.current_attempts.pop(url, None)
+        if attempt_id is None:
+            return
+        try:
+            self.state.finish_attempt(attempt_id, status, stage=stage, error_kind=kind, error_msg=error_msg)
+            for path in outputs:
+                self.state.record_output(attempt_id, path)
         except Exception as e:
-            self.monitor.update_progress(url, False, f"处理出错: {str(e)}")
-            self.failed_links.append(url)
+            print(f"⚠️  写入状态库失败: {e}")
+    
+    def record_failure(self, url, error_msg, kind='error'):
+        """记录导出失败的文档（重新导出失败时保留上一次的导出）"""
+        if self.restore_held_outputs(url, error_msg):
+            return
+        self.monitor.update_progress(url, False, error_msg)
+        self.failed_links.append(url)
+        self.end_attempt(url, 'failed', kind=kind, error_msg=error_msg)
+    
+    def record_timeout(self, url, error):
+        """记录看门狗超时的文档（重新导出超时时保留上一次的导出）"""
+        self.timed_out_links.append({'url': url, 'stage': error.stage, 'scope': error.scope})
+        if self.restore_held_outputs(url, f"超时: {error}"):
+            return
+        self.monitor.update_progress(url, False, f"超时: {error}")
+        self.failed_links.append(url)
+        self.end_attempt(url, 'timeout', kind='timeout', error_msg=str(error), stage=error.stage)
+    
+    def document_cancelled(self, url):
+        """看门狗在每个阶段开始前调用：文档在共享队列中的租约已丢失时返回取消原因"""
+        if self.lease_queue and self.lease_queue.is_lost(url):
+            return "租约已丢失，文档已分配给其他工作进程"
+        return None
+    
+    def record_cancelled(self, url, error):
+        """记录已取消的文档：由其他工作进程导出，不计为失败，也不再计入本进程的总数"""
+        print(f"⏹️  {error.reason}，放弃处理: {url}")
+        self.discard_held_outputs(url)
+        self.monitor.add_documents(-1)
+        self.end_attempt(url, 'cancelled', kind='lease_lost', error_msg=error.reason)
+    
+    def should_requeue(self, url):
+        """浏览器已崩溃时，将正在处理的文档重新排队（每个文档有次数上限）"""
+        if self.is_driver_alive():
+            return False
+        
+        attempts = self.requeue_counts.get(url, 0)
+        if attempts >= self.max_requeues:
+            return False
+        
+        self.requeue_counts[url] = attempts + 1
+        self.end_attempt(url, 'requeued', kind='browser_crash', error_msg="浏览器失去响应")
+        print(f"⚠️  浏览器失去响应，文档将在重启后重新处理: {url}")
+        return True
     
     def click_export_button(self):
         """点击导出按钮"""
+        import pyautogui
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        
         try:
             # 方法1: 尝试通过快捷键触发导出
             # Ctrl+P 打印，然后选择保存为PDF
@@ -197,6 +933,8 @@ class FeishuBatchExporter:
     
     def handle_download_dialog(self):
         """处理下载对话框"""
+        import pyautogui
+        
         try:
             # 等待可能的下载对话框出现
             time.sleep(2)
@@ -213,34 +951,84 @@ class FeishuBatchExporter:
     
     def export_all_documents(self):
         """批量导出所有文档"""
-        links = self.load_document_links()
-        if not links:
+        # 使用共享工作队列时，链接文件是可选的（只需由一个节点加入队列）
+        links = self.load_document_links() if self.links_file else []
+        if not links and self.work_queue is None:
             print("❌ 没有找到可导出的文档链接")
             return
         
-        print(f"🚀 准备批量导出 {len(links)} 个文档")
+        if self.preflight and links:
+            links = self.preflight_links(links)
+            if not links and self.work_queue is None:
+                print("❌ 预检后没有可导出的文档链接")
+                return
+        
+        # 最长优先：大文档先开始，避免最后只剩一两个大文档时其他进程/标签页空等
+        ordered_links = links
+        if self.scheduler and links:
+            ordered_links = self.scheduler.plan(links)
+            self.scheduler.print_plan()
+        
+        if self.work_queue is not None:
+            if links:
+                print(f"📋 新加入共享队列 {self.work_queue.enqueue(ordered_links)} 个链接")
+            queue_stats = self.work_queue.stats()
+            total_docs = queue_stats['pending'] + queue_stats['leased']
+            # 其他节点过期后重新分配给本节点的文档计入总数
+            self.lease_queue = LeasedLinkQueue(self.work_queue, self.worker_id,
+                                               on_reissued=lambda url: self.monitor.add_documents(1))
+            print(f"🔗 共享队列: 待处理 {queue_stats['pending']}，处理中 {queue_stats['leased']}，"
+                  f"已完成 {queue_stats['done']}（工作进程 {self.lease_queue.worker_id}）")
+        else:
+            total_docs = len(links)
+        
+        print(f"🚀 准备批量导出 {total_docs} 个文档")
         print(f"📁 下载目录: {self.download_dir}")
         
         # 初始化进度监控
-        self.monitor.start_export(len(links))
+        self.monitor.start_export(total_docs)
+        self.run_id = self.state.start_run(total_docs)
+        self.monitor.run_id = self.run_id
+        self.state.add_links(links)
         
         # 初始化Chrome驱动
         if not self.setup_chrome_driver():
             print("❌ 无法启动Chrome驱动，导出终止")
             return
         
+        if self.closure_enabled:
+            self.link_closure = LinkClosure(links, self.state, max_depth=self.closure_max_depth,
+                                            allowed_domains=self.closure_domains,
+                                            on_discovered=self.enqueue_discovered_links)
+        
+        # 边导出边合并：按链接文件中的顺序（而不是排程后的处理顺序）
+        if self.stream_merge:
+            self.streaming_merger = StreamingMerger(os.path.join(self.download_dir, self.merged_name),
+                                                    links, window=self.merge_window)
+        
+        self.watchdog.start()
+        if self.lease_queue:
+            self.lease_queue.start()
         try:
-            # 逐个处理文档
-            for i, link in enumerate(links, 1):
-                self.export_single_document(link, i, len(links))
-                
-                # 每处理10个文档后稍作休息
-                if i % 10 == 0:
-                    print(f"🔄 已处理 {i} 个文档，休息30秒...")
-                    time.sleep(30)
+            queue = self.export_queue = self.lease_queue if self.lease_queue else LocalLinkQueue(ordered_links)
+            export_started = time.time()
+            while True:
+                if self.concurrency_mode == "pipeline":
+                    self.export_with_pipeline(queue, total_docs)
+                elif self.concurrency_mode == "tabs":
+                    self.export_with_tabs(queue, total_docs)
                 else:
-                    # 正常间隔
-                    time.sleep(self.delay)
+                    self.export_sequentially(queue, total_docs)
+                
+                # 链接闭包：等待最后几个文档的链接扫描完，发现的新文档继续导出
+                if self.link_closure and self.link_closure.wait_idle() and queue.has_work():
+                    continue
+                
+                # 共享队列：等待其他节点的租约完成，过期的租约会重新分配给本节点
+                if not (self.lease_queue and self.lease_queue.wait_for_outstanding()):
+                    break
+            self.export_elapsed = time.time() - export_started
+            self.finish_streaming_merge()
             
             # 完成导出
             self.monitor.finish_export()
@@ -255,10 +1043,386 @@ class FeishuBatchExporter:
             print(f"\n❌ 导出过程中发生严重错误: {e}")
             self.monitor.finish_export()
         finally:
+            # 中断时还没来得及重新导出的文档：恢复暂存的导出
+            for url in list(self.held_outputs):
+                self.restore_held_outputs(url, "导出已中断")
+            
+            self.watchdog.stop()
+            if self.lease_queue:
+                self.lease_queue.stop()
+            if self.link_closure:
+                self.link_closure.close()
+            
+            # 中断时也写出已完成部分的合并文件
+            self.finish_streaming_merge()
+            
             # 关闭浏览器
             if self.driver:
-                self.driver.quit()
+                self.quit_chrome_driver()
                 print("🔒 Chrome浏览器已关闭")
+            if self.browser_cache:
+                self.browser_cache.release()
+            if self.progress_publisher:
+                self.progress_publisher.close()
+    
+    def enqueue_discovered_links(self, urls, depth):
+        """
+        链接闭包发现的新文档加入导出队列（在扫描线程中调用；共享队列时连同深度加入共享队列，任意进程都可领取）
+        
+        Args:
+            urls (list): 新发现的链接
+            depth (int): 这些文档在链接闭包中的深度
+        """
+        if self.preflight:
+            urls = self.preflight_discovered_links(urls)
+            # 跳转的链接替换为最终URL，深度保持不变
+            self.link_closure.record_depth(urls, depth)
+            if not urls:
+                return
+        if self.work_queue is not None:
+            # 其他进程可能已经加入了同一文档
+            added = self.work_queue.enqueue(urls, depth=depth)
+        else:
+            self.export_queue.extend(urls)
+            added = len(urls)
+        if added:
+            self.monitor.add_documents(added)
+    
+    def finish_streaming_merge(self):
+        """写出边导出边合并的合并文件（只执行一次）"""
+        merger = self.streaming_merger
+        if not merger or merger.finish_seconds is not None:
+            return
+        try:
+            print("📚 正在写出合并文件...")
+            if merger.finish():
+                merger.print_summary()
+            else:
+                print("⚠️  没有可合并的PDF文件")
+        except Exception as e:
+            print(f"❌ 写出合并文件失败: {e}")
+            self.streaming_merger = None
+    
+    def export_sequentially(self, queue, total_docs):
+        """逐个处理文档（浏览器崩溃时，正在处理的文档会被放回队首）"""
+        i = 0
+        while True:
+            link = queue.claim_next()
+            if link is None:
+                break
+            result = self.export_single_document(link, i + 1, total_docs)
+            
+            if result == 'requeue':
+                queue.appendleft(link)
+                if not self.restart_chrome_driver("浏览器崩溃或失去响应"):
+                    print("❌ 无法重启Chrome驱动，导出终止")
+                    return
+                continue
+            
+            # 看门狗超时后浏览器已被重置，需要重新启动
+            if result == 'timeout' and queue.has_work() and not self.is_driver_alive():
+                if not self.restart_chrome_driver("文档处理超时"):
+                    print("❌ 无法重启Chrome驱动，导出终止")
+                    return
+            
+            # 导出结果疑似不完整：排到队尾，稍后以更长的渲染时间重新导出
+            if result == 'retry':
+                queue.append(link)
+            
+            i += 1
+            self.docs_since_restart += 1
+            self.process_performance_log(link)
+            
+            # 按文档数量或内存阈值回收浏览器
+            recycle_reason = self.should_recycle_browser()
+            if recycle_reason and queue.has_work():
+                if not self.restart_chrome_driver(recycle_reason):
+                    print("❌ 无法重启Chrome驱动，导出终止")
+                    return
+            
+            # 每处理10个文档后稍作休息
+            if i % 10 == 0:
+                print(f"🔄 已处理 {i} 个文档，休息30秒...")
+                time.sleep(30)
+            else:
+                # 正常间隔
+                time.sleep(self.delay)
+    
+    def open_tab_pool(self):
+        """在当前浏览器中打开标签页池"""
+        pool = TabPool(self.driver, self.tab_count, self.tab_load_timeout, self.delay,
+                       on_new_tab=self.apply_request_blocking)
+        pool.open()
+        return pool
+    
+    def export_with_tabs(self, queue, total_docs):
+        """
+        多标签页模式：在同一个浏览器中打开多个标签页，
+        一个标签页打印时其余标签页继续加载，打印操作始终串行进行
+        """
+        pool = self.open_tab_pool()
+        i = 0
+        
+        while queue.has_work() or pool.busy_tabs():
+            try:
+                # 给空闲标签页分配新文档
+                for tab in pool.idle_tabs():
+                    url = queue.claim_next()
+                    if url is None:
+                        break
+                    self.monitor.set_current(url, f"标签页 {tab.tab_id} 开始加载")
+                    self.begin_attempt(url)
+                    try:
+                        pool.assign(tab, url, settle_delay=self.delay * self.render_budget(url))
+                    except Exception as e:
+                        if not self.is_driver_alive():
+                            raise
+                        pool.replace(tab)
+                        self.record_failure(url, f"标签页打开文档失败: {e}", kind='tab_error')
+                        continue
+                    self.monitor.update_tab_status(tab.tab_id, "加载中", url)
+                
+                # 关闭并替换卡死的标签页，不影响其他标签页
+                for tab in pool.poll():
+                    url = tab.url
+                    self.monitor.update_tab_status(tab.tab_id, "已替换", url)
+                    pool.replace(tab)
+                    self.record_failure(url, f"标签页加载超时（{self.tab_load_timeout}秒）", kind='load_timeout')
+                
+                tab = pool.next_printable()
+                if not tab:
+                    time.sleep(0.5)
+                    continue
+                
+                url = tab.url
+                self.monitor.update_tab_status(tab.tab_id, "提取中" if self.structured_exporter else "打印中", url)
+                pool.activate(tab)
+                # 文档总时长从标签页开始加载时计算
+                self.watchdog.start_document(url, scale=self.render_budget(url), started_at=tab.started_at)
+                try:
+                    if self.export_loaded_document(url) == 'retry':
+                        queue.append(url)
+                except StageTimeoutError as e:
+                    # 看门狗已重置浏览器时走下面的崩溃恢复流程，其他标签页的文档重新排队；
+                    # 浏览器仍可响应时只替换该标签页
+                    self.monitor.update_tab_status(tab.tab_id, "超时", url)
+                    self.record_timeout(url, e)
+                    if not self.replace_timed_out_tab(pool, tab):
+                        raise
+                except DocumentCancelledError as e:
+                    self.record_cancelled(url, e)
+                except Exception as e:
+                    if not self.is_driver_alive():
+                        raise
+                    self.record_failure(url, f"处理出错: {str(e)}")
+                finally:
+                    self.watchdog.finish_document()
+                pool.release(tab)
+                self.monitor.update_tab_status(tab.tab_id, "空闲")
+                
+                i += 1
+                self.docs_since_restart += 1
+                self.process_performance_log(url)
+                if i % 10 == 0:
+                    print(f"🔄 已处理 {i} 个文档，休息30秒...")
+                    time.sleep(30)
+                
+                # 按文档数量或内存阈值回收浏览器，仍在加载中的文档重新排队
+                recycle_reason = self.should_recycle_browser()
+                if recycle_reason and (queue.has_work() or pool.busy_tabs()):
+                    for url in reversed(pool.in_flight_urls()):
+                        self.end_attempt(url, 'requeued')
+                        queue.appendleft(url)
+                    if not self.restart_chrome_driver(recycle_reason):
+                        print("❌ 无法重启Chrome驱动，导出终止")
+                        return
+                    pool = self.open_tab_pool()
+                    
+            except Exception as e:
+                if self.is_driver_alive() and not isinstance(e, StageTimeoutError):
+                    raise
+                
+                # 浏览器崩溃（或超时后无法替换标签页）：所有标签页中未完成的文档重新排队
+                for url in reversed(pool.in_flight_urls()):
+                    if self.should_requeue(url):
+                        queue.appendleft(url)
+                    else:
+                        self.record_failure(url, f"浏览器崩溃: {str(e)}", kind='browser_crash')
+                if not self.restart_chrome_driver("浏览器崩溃或失去响应"):
+                    print("❌ 无法重启Chrome驱动，导出终止")
+                    return
+                pool = self.open_tab_pool()
+    
+    def export_with_pipeline(self, queue, total_docs):
+        """
+        流水线模式：多个标签页并行渲染，主线程依次展开并通过CDP打印已就绪的标签页，
+        打印结果经有界队列交给写入/校验和后处理线程池，浏览器不必等待磁盘和状态库
+        """
+        self.pdf_writer = self.pdf_writer or PdfWriterStage(self.download_dir, verifier=self.verifier)
+        pipeline = self.pipeline = ExportPipeline(self.pdf_writer, self.finish_pipeline_job,
+                                                  self.on_pipeline_error,
+                                                  stage_workers=self.pipeline_workers,
+                                                  queue_size=self.pipeline_queue_size,
+                                                  render_workers=self.tab_count).start()
+        pool = self.open_tab_pool()
+        i = 0
+        
+        try:
+            # 写入阶段发现的疑似不完整的文档会重新排队，所以要等所有已打印的文档完成后处理
+            while queue.has_work() or pool.busy_tabs() or pipeline.in_flight() or self.has_retry_links():
+                try:
+                    for url in self.take_retry_links():
+                        queue.append(url)
+                    
+                    # 渲染：给空闲标签页分配新文档
+                    for tab in pool.idle_tabs():
+                        url = queue.claim_next()
+                        if url is None:
+                            break
+                        self.begin_attempt(url)
+                        try:
+                            pool.assign(tab, url, settle_delay=self.delay * self.render_budget(url))
+                        except Exception as e:
+                            if not self.is_driver_alive():
+                                raise
+                            pool.replace(tab)
+                            pipeline.post.put({'url': url, 'error': f"标签页打开文档失败: {e}", 'kind': 'tab_error'})
+                            continue
+                        self.monitor.update_tab_status(tab.tab_id, "渲染中", url)
+                    
+                    for tab in pool.poll():
+                        url = tab.url
+                        pipeline.render.record(time.time() - tab.started_at, ok=False)
+                        self.monitor.update_tab_status(tab.tab_id, "已替换", url)
+                        pool.replace(tab)
+                        pipeline.post.put({'url': url, 'error': f"标签页加载超时（{self.tab_load_timeout}秒）",
+                                           'kind': 'load_timeout'})
+                    
+                    pipeline.render.busy = sum(1 for tab in pool.tabs if tab.state == 'loading')
+                    ready_tabs = sum(1 for tab in pool.tabs if tab.state == 'ready')
+                    self.monitor.update_pipeline_status(pipeline.snapshot(render_queued=ready_tabs))
+                    
+                    tab = pool.next_printable()
+                    if not tab:
+                        time.sleep(0.2)
+                        continue
+                    
+                    url = tab.url
+                    pipeline.render.record(tab.ready_at - tab.started_at)
+                    pool.activate(tab)
+                    try:
+                        job = self.print_pipeline_tab(tab)
+                    except StageTimeoutError as e:
+                        # 看门狗已重置浏览器时走下面的崩溃恢复流程；浏览器仍可响应时只替换该标签页
+                        self.monitor.update_tab_status(tab.tab_id, "超时", url)
+                        pipeline.post.put({'url': url, 'timeout': e})
+                        if not self.replace_timed_out_tab(pool, tab):
+                            raise
+                        job = None
+                    except Exception as e:
+                        if not self.is_driver_alive():
+                            raise
+                        pipeline.post.put({'url': url, 'error': f"处理出错: {str(e)}"})
+                        job = None
+                    pool.release(tab)
+                    self.monitor.update_tab_status(tab.tab_id, "空闲")
+                    
+                    # 写入队列已满时在这里等待（背压），其他标签页在浏览器中继续加载
+                    if job:
+                        pipeline.submit(job)
+                    
+                    i += 1
+                    self.docs_since_restart += 1
+                    self.process_performance_log(url)
+                    
+                    # 按文档数量或内存阈值回收浏览器，仍在加载中的文档重新排队
+                    recycle_reason = self.should_recycle_browser()
+                    if recycle_reason and (queue.has_work() or pool.busy_tabs()):
+                        for url in reversed(pool.in_flight_urls()):
+                            self.end_attempt(url, 'requeued')
+                            queue.appendleft(url)
+                        if not self.restart_chrome_driver(recycle_reason):
+                            print("❌ 无法重启Chrome驱动，导出终止")
+                            return
+                        pool = self.open_tab_pool()
+                
+                except Exception as e:
+                    if self.is_driver_alive() and not isinstance(e, StageTimeoutError):
+                        raise
+                    
+                    # 浏览器崩溃（或超时后无法替换标签页）：所有标签页中未完成的文档重新排队（已打印的文档继续写入）
+                    for url in reversed(pool.in_flight_urls()):
+                        if self.should_requeue(url):
+                            queue.appendleft(url)
+                        else:
+                            pipeline.post.put({'url': url, 'error': f"浏览器崩溃: {str(e)}", 'kind': 'browser_crash'})
+                    if not self.restart_chrome_driver("浏览器崩溃或失去响应"):
+                        print("❌ 无法重启Chrome驱动，导出终止")
+                        return
+                    pool = self.open_tab_pool()
+        finally:
+            # 等待已打印的文档写入并完成后处理
+            pipeline.close()
+            self.monitor.update_pipeline_status(pipeline.snapshot())
+    
+    def print_pipeline_tab(self, tab):
+        """
+        展开并打印当前标签页中已渲染的文档
+        
+        Returns:
+            dict: 交给写入阶段的任务（url、标题、base64编码的PDF、开始时间、页面信号、疑似不完整时能否重新导出）
+        """
+        pipeline = self.pipeline
+        
+        self.monitor.update_tab_status(tab.tab_id, "展开中", tab.url)
+        # 重新导出的文档滚动和等待图片的间隔按倍数放大，脚本和阶段的时长上限也相应放宽
+        budget = self.render_budget(tab.url)
+        self.driver.set_script_timeout(self.watchdog.stage_timeouts['materialize'] * budget)
+        with self.watchdog.stage('materialize', scale=budget):
+            started = pipeline.materialize.begin()
+            try:
+                signals = self.driver.execute_async_script(MATERIALIZE_SCRIPT, self.materialize_max_scrolls, budget)
+            finally:
+                pipeline.materialize.end(started)
+        
+        self.monitor.update_tab_status(tab.tab_id, "打印中", tab.url)
+        with self.watchdog.stage('print'):
+            started = pipeline.print.begin()
+            try:
+                result = self.driver.execute_cdp_cmd('Page.printToPDF', PRINT_OPTIONS)
+                title = self.driver.title
+            finally:
+                pipeline.print.end(started)
+        
+        return {'url': tab.url, 'title': title, 'pdf_base64': result['data'], 'started_at': tab.started_at,
+                'page_signals': signals if isinstance(signals, dict) else None,
+                'retry_suspect': self.can_retry_suspect(tab.url)}
+    
+    def finish_pipeline_job(self, job):
+        """后处理阶段：记录导出结果（所有结果都由后处理阶段唯一的线程在这里记录，合并文件和进度不会被同时写入）"""
+        url = job['url']
+        if 'timeout' in job:
+            self.record_timeout(url, job['timeout'])
+        elif 'error' in job:
+            self.record_failure(url, job['error'], kind=job.get('kind', 'error'))
+        elif job.get('suspect'):
+            # 写入阶段发现疑似不完整：暂存文件，交给主线程重新排队
+            self.requeue_suspect(url, job['verification'], [job['path']])
+            self.queue_retry(url)
+        else:
+            if job.get('verification') and job['verification']['reasons']:
+                self.warn_suspect(url, job['verification'])
+            self.monitor.update_progress(url, True)
+            self.processed_links.append(url)
+            self.end_attempt(url, 'success', outputs=[job['path']])
+            self.watchdog.record_duration(time.time() - job['started_at'])
+    
+    def on_pipeline_error(self, stage, job, error):
+        """写入/校验失败的文档交给后处理阶段记为失败；后处理本身出错时只打印警告"""
+        if stage == 'write':
+            self.pipeline.post.put({'url': job['url'], 'error': f"写入PDF失败: {error}", 'kind': 'write_error'})
+        else:
+            print(f"⚠️  后处理出错: {job.get('url')} {error}")
     
     def print_export_summary(self):
         """打印导出结果统计"""
@@ -267,6 +1431,36 @@ class FeishuBatchExporter:
         print("="*50)
         print(f"✅ 成功导出: {len(self.processed_links)} 个文档")
         print(f"❌ 导出失败: {len(self.failed_links)} 个文档")
+        print(f"♻️  浏览器重启: {self.browser_restarts} 次（内存峰值 {self.peak_browser_rss_mb:.0f}MB）")
+        if self.request_blocker and self.profiler:
+            self.request_blocker.print_summary()
+        if self.browser_cache:
+            self.browser_cache.print_summary()
+        if self.structured_exporter:
+            structured_stats = self.structured_exporter.get_stats()
+            print(f"📝 {structured_stats['format']}: {structured_stats['documents']} 个文档，"
+                  f"图片 {structured_stats['images_saved']} 张（失败 {structured_stats['image_failures']}），"
+                  f"共 {structured_stats['bytes_written'] / 1024 / 1024:.1f}MB")
+            self.asset_store.print_summary()
+        if self.pipeline:
+            pipeline_stats = self.pipeline.get_stats()
+            print("🏭 流水线利用率: " + "，".join(f"{STAGE_LABELS[stage['stage']]} {stage['utilization']:.0%}"
+                                              for stage in pipeline_stats['stages'])
+                  + f"（瓶颈: {STAGE_LABELS[pipeline_stats['bottleneck']]}）")
+        if self.verifier:
+            verify_stats = self.verifier.get_stats()
+            print(f"🔍 导出校验: 检查 {verify_stats['checked']} 次，疑似不完整 {verify_stats['suspects']} 次，"
+                  f"重新导出 {len(self.verify_attempts)} 个文档，仍疑似不完整 {len(self.suspect_exports)} 个")
+        if self.link_closure:
+            self.link_closure.print_summary()
+        if self.scheduler and self.scheduler.plan_stats:
+            schedule_stats = self.scheduler.report(self.export_elapsed)
+            print(f"🗓️  总用时: 实际 {schedule_stats['actual_makespan_s'] / 60:.1f} 分钟，"
+                  f"预计 {schedule_stats['estimated_makespan_s'] / 60:.1f} 分钟，"
+                  f"理论下限 {schedule_stats['lower_bound_s'] / 60:.1f} 分钟")
+        watchdog_stats = self.watchdog.get_stats()
+        print(f"⏱️  单文档耗时: p50 {watchdog_stats['duration_p50']}秒  p99 {watchdog_stats['duration_p99']}秒"
+              f"  超时 {watchdog_stats['timeouts']} 个")
         
         # 显示错误摘要
         self.monitor.print_error_summary()
@@ -276,11 +1470,9 @@ class FeishuBatchExporter:
             for i, link in enumerate(self.failed_links, 1):
                 print(f"  {i}. {link}")
             
-            # 保存失败链接到文件
+            # 从状态库导出失败链接文件
             failed_file = os.path.join(self.download_dir, "failed_links.txt")
-            with open(failed_file, 'w', encoding='utf-8') as f:
-                for link in self.failed_links:
-                    f.write(link + '\n')
+            self.state.export_failed_links(failed_file, self.run_id)
             print(f"\n💾 失败链接已保存到: {failed_file}")
         
         # 创建导出报告
@@ -290,27 +1482,43 @@ class FeishuBatchExporter:
         print("="*50)
     
     def create_export_report(self):
-        """创建导出报告"""
-        report = {
-            'export_time': datetime.now().isoformat(),
-            'total_docs': len(self.processed_links) + len(self.failed_links),
-            'successful': len(self.processed_links),
-            'failed': len(self.failed_links),
-            'download_directory': self.download_dir,
-            'processed_links': self.processed_links,
-            'failed_links': self.failed_links
+        """创建导出报告（记录到状态库，并导出为 export_report.json）"""
+        stats = {
+            'browser_restarts': self.browser_restarts,
+            'peak_browser_rss_mb': round(self.peak_browser_rss_mb, 1),
+            'request_blocking': self.request_blocker.get_stats() if self.request_blocker and self.profiler else None,
+            'timing': self.watchdog.get_stats(),
+            'structured_export': self.structured_exporter.get_stats() if self.structured_exporter else None,
+            'assets': self.asset_store.get_stats() if self.asset_store else None,
+            'browser_cache': self.browser_cache.get_stats() if self.browser_cache else None,
+            'schedule': self.scheduler.report(self.export_elapsed) if self.scheduler else None,
+            'streaming_merge': self.streaming_merger.get_stats() if self.streaming_merger else None,
+            'pipeline': self.pipeline.get_stats() if self.pipeline else None,
+            'verification': dict(self.verifier.get_stats(), retried=len(self.verify_attempts),
+                                 suspect_exports=self.suspect_exports) if self.verifier else None,
+            'link_closure': self.link_closure.get_stats() if self.link_closure else None,
+            'timed_out_links': self.timed_out_links,
+            'skipped_links': [{'url': r['url'], 'status': r['status']} for r in self.skipped_links],
+            'unverified_links': [{'url': r['url'], 'error': r['error'] or r['http_status']}
+                                 for r in self.unverified_links],
         }
         
         report_file = os.path.join(self.download_dir, "export_report.json")
         try:
-            with open(report_file, 'w', encoding='utf-8') as f:
-                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.state.finish_run(self.run_id, stats)
+            self.state.export_report(report_file, self.run_id, self.download_dir, extra=stats)
             print(f"📋 导出报告已保存到: {report_file}")
         except Exception as e:
             print(f"❌ 保存导出报告失败: {e}")
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="飞书文档批量导出工具")
+    add_profile_arguments(parser)
+    parser.add_argument("--trace-url", action="append", default=[],
+                        help="为该文档保存Chrome性能追踪（可重复；\"*\" 表示全部文档，需配合 --profile）")
+    args = parser.parse_args()
+    
     print("🚀 飞书文档批量导出工具")
     print("="*30)
     
@@ -318,6 +1526,14 @@ def main():
     links_file = "feishu_links.txt"  # 包含文档链接的文件
     download_dir = "./feishu_exports"  # 下载目录
     delay = 3  # 操作间隔时间（秒）
+    recycle_after_docs = 50  # 每处理多少个文档重启一次浏览器
+    max_browser_rss_mb = 2048  # 浏览器内存上限（MB），超过后重启
+    concurrency_mode = "single"  # "single" 逐个处理；"tabs" 单浏览器多标签页并行加载；"pipeline" 分阶段流水线
+    tab_count = 3  # tabs模式下的标签页数量
+    preflight = False  # 启动浏览器前先预检链接（默认关闭，与构造参数一致）
+    export_format = "pdf"  # "pdf" 打印导出；"markdown"/"html" 直接导出文档内容（更快、更小，适合检索归档）
+    work_queue_url = None  # 共享工作队列协调服务地址（多机分片导出），如 "http://10.0.0.5:8765"
+    progress_hub = None  # 进度汇总服务地址（多进程统一查看进度），如 "10.0.0.5:8766"
     
     # 检查链接文件是否存在
     if not os.path.exists(links_file):
@@ -325,11 +1541,21 @@ def main():
         print("请先创建该文件，并在其中填入飞书文档链接（每行一个）")
         return
     
-    # 创建导出器实例
-    exporter = FeishuBatchExporter(links_file, download_dir, delay)
-    
-    # 开始批量导出
-    exporter.export_all_documents()
+    with profile_run("export", args.profile, args.profile_dir, args.trace_url) as profiler:
+        # 创建导出器实例
+        exporter = FeishuBatchExporter(links_file, download_dir, delay,
+                                       recycle_after_docs=recycle_after_docs,
+                                       max_browser_rss_mb=max_browser_rss_mb,
+                                       concurrency_mode=concurrency_mode,
+                                       tab_count=tab_count,
+                                       preflight=preflight,
+                                       work_queue=HTTPWorkQueue(work_queue_url) if work_queue_url else None,
+                                       profiler=profiler,
+                                       export_format=export_format,
+                                       progress_hub=progress_hub)
+        
+        # 开始批量导出
+        exporter.export_all_documents()
     
     print("\n🎉 批量导出完成！")
 
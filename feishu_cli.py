@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+飞书文档导出统一命令行
+把链接收集、PDF链接提取、链接预检、批量导出、PDF合并、全文检索和状态报告合并为一个入口。
+selenium、pyautogui、aiohttp、PyPDF2 等较重的依赖只在对应子命令真正执行时才导入，
+运行 --help 或轻量子命令时无需图形界面，启动只需几十毫秒。
+
+配置可以通过命令行参数或 --config 指定的JSON文件提供（命令行参数优先）：
+    {
+        "links_file": "feishu_links.txt",
+        "download_dir": "./feishu_exports",
+        "export": {"concurrency_mode": "tabs", "tab_count": 4, "preflight": true}
+    }
+顶层的键对所有子命令生效，与子命令同名的对象只对该子命令生效。
+
+用法：
+    python3 feishu_cli.py collect
+    python3 feishu_cli.py extract 选调面试.pdf
+    python3 feishu_cli.py preflight
+    python3 feishu_cli.py export --config feishu_config.json --concurrency-mode tabs
+    python3 feishu_cli.py merge ./feishu_exports
+    python3 feishu_cli.py index && python3 feishu_cli.py search "面试 准备"
+    python3 feishu_cli.py report failed --days 7 --kind timeout
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+# 各子命令的默认配置（未在配置文件和命令行中给出时使用）
+DEFAULTS = {
+    'links_file': "feishu_links.txt",
+    'download_dir': "./feishu_exports",
+}
+
+# 只能通过配置文件设置的导出参数（结构较复杂，不提供命令行参数）
+EXPORT_CONFIG_ONLY = ("stage_timeouts", "max_requeues", "tab_load_timeout", "worker_id")
+
+
+def load_config(path):
+    """读取JSON配置文件，未指定时返回空配置"""
+    if not path:
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except Exception as e:
+        print(f"❌ 读取配置文件失败: {e}")
+        sys.exit(1)
+    if not isinstance(config, dict):
+        print(f"❌ 配置文件格式错误: {path} 应为JSON对象")
+        sys.exit(1)
+    return config
+
+
+def resolve_options(args, config):
+    """
+    合并默认值、配置文件和命令行参数（后者优先）
+
+    Returns:
+        dict: 子命令的最终配置
+    """
+    options = dict(DEFAULTS)
+    options.update({key: value for key, value in config.items() if key not in COMMANDS})
+    options.update(config.get(args.command, {}))
+    for key, value in vars(args).items():
+        if key in ('command', 'config') or value is None:
+            continue
+        options[key] = value
+    return options
+
+
+@contextlib.contextmanager
+def profiled(name, options):
+    """按需开启性能剖析（未开启时不导入剖析模块）"""
+    if not options.get('profile'):
+        yield None
+        return
+    from export_profiler import RunProfiler
+    with RunProfiler(name, options.get('profile_dir') or "profiles",
+                     trace_urls=options.get('trace_url')) as profiler:
+        yield profiler
+
+
+# ---------- 子命令 ----------
+
+def cmd_collect(options):
+    """交互式收集文档链接"""
+    from link_collector import FeishuLinkCollector
+
+    collector = FeishuLinkCollector(options['links_file'])
+    collector.interactive_collect()
+
+
+def cmd_extract(options):
+    """从PDF中提取飞书链接"""
+    from pdf_link_extractor import extract_feishu_links_from_pdf
+
+    with profiled("extract", options):
+        extract_feishu_links_from_pdf(options['pdf_path'], output_file=options['links_file'])
+
+
+def cmd_preflight(options):
+    """并发预检链接"""
+    from link_preflight import LinkPreflightChecker, load_links
+
+    try:
+        links = load_links(options['links_file'])
+    except Exception as e:
+        print(f"❌ 加载链接文件失败: {e}")
+        return 1
+
+    checker = LinkPreflightChecker(concurrency=options.get('concurrency', 20),
+                                   timeout=options.get('timeout', 10),
+                                   report_file=options.get('report_file', "preflight_report.json"))
+    results = checker.check_links(links)
+    checker.print_summary(results)
+    checker.save_report(results)
+
+
+def cmd_export(options):
+    """批量导出文档为PDF"""
+    from feishu_batch_export import FeishuBatchExporter
+    from work_queue import HTTPWorkQueue
+
+    if not options.get('work_queue_url') and not os.path.exists(options['links_file']):
+        print(f"❌ 链接文件 '{options['links_file']}' 不存在")
+        print("请先运行 collect 或 extract 子命令生成链接文件")
+        return 1
+
+    exporter_options = {key: options[key] for key in (
+        "delay", "recycle_after_docs", "max_browser_rss_mb", "concurrency_mode", "tab_count",
+        "block_requests", "block_list_file", "preflight", "document_timeout", "state_db", "export_format",
+        "asset_cache_mb", "browser_cache", "browser_cache_mb",
+        "schedule", "planned_workers", "stream_merge", "merged_name", "merge_window", "progress_hub",
+        "pipeline_workers", "pipeline_queue_size", "pipeline_headless",
+        "verify_exports", "verify_retries", "retry_budget_factor",
+        "link_closure", "closure_max_depth", "closure_domains",
+    ) + EXPORT_CONFIG_ONLY if key in options}
+    if options.get('write_workers'):
+        exporter_options['pipeline_workers'] = dict(exporter_options.get('pipeline_workers') or {},
+                                                    write=options['write_workers'])
+    if options.get('work_queue_url'):
+        exporter_options['work_queue'] = HTTPWorkQueue(options['work_queue_url'],
+                                                       token=options.get('work_queue_token'))
+
+    with profiled("export", options) as profiler:
+        exporter = FeishuBatchExporter(options['links_file'], options['download_dir'],
+                                       profiler=profiler, **exporter_options)
+        exporter.export_all_documents()
+
+
+def cmd_merge(options):
+    """合并目录下的PDF"""
+    from merge_pdfs import merge_pdfs
+
+    with profiled("merge", options):
+        merge_pdfs(options.get('folder') or options['download_dir'],
+                   dedupe_images=not options.get('no_dedupe_images'), full=bool(options.get('full')))
+
+
+def cmd_index(options):
+    """建立或增量更新导出PDF的全文索引"""
+    from pdf_search_index import INDEX_NAME, PdfSearchIndex
+
+    folder = options.get('folder') or options['download_dir']
+    index = PdfSearchIndex(options.get('index_db') or os.path.join(folder, INDEX_NAME))
+    with profiled("index", options):
+        stats = index.update(folder, workers=options.get('workers'))
+    index.close()
+    print(f"✅ 索引已更新: 新增 {stats['added']}，更新 {stats['updated']}，删除 {stats['removed']}，"
+          f"未变化 {stats['unchanged']}（共 {stats['documents']} 个文档，用时 {stats['seconds']} 秒）")
+
+
+def cmd_search(options):
+    """在导出PDF的全文索引中检索"""
+    from pdf_search_index import INDEX_NAME, PdfSearchIndex
+
+    db_path = options.get('index_db') or os.path.join(options['download_dir'], INDEX_NAME)
+    if not os.path.exists(db_path):
+        print(f"❌ 索引不存在: {db_path}，请先运行 index 子命令")
+        return 1
+    index = PdfSearchIndex(db_path)
+    results = index.search(options['query'], limit=options.get('limit') or 20)
+    index.close()
+    for i, result in enumerate(results, 1):
+        print(f"{i:2d}. {result['title']}  第{result['page']}页")
+        print(f"    {result['snippet']}")
+    print(f"🔍 找到 {len(results)} 个结果")
+
+
+def cmd_report(options):
+    """查询导出状态库"""
+    from export_state import run_report
+
+    # 未给出的可选参数（如 --run、--kind）不会出现在合并后的配置中
+    run_report(argparse.Namespace(**{'run': None, 'kind': None, **options}))
+
+
+COMMANDS = {
+    'collect': cmd_collect,
+    'extract': cmd_extract,
+    'preflight': cmd_preflight,
+    'export': cmd_export,
+    'merge': cmd_merge,
+    'index': cmd_index,
+    'search': cmd_search,
+    'report': cmd_report,
+}
+
+
+def add_profile_arguments(parser):
+    # 与 export_profiler.add_profile_arguments 相同，这里不导入剖析模块以保持启动速度
+    parser.add_argument("--profile", action="store_true", default=None, help="收集cProfile剖析数据")
+    parser.add_argument("--profile-dir", help="剖析结果根目录（默认: profiles）")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="飞书文档批量导出工具")
+    parser.add_argument("--config", help="JSON配置文件路径")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    collect = subparsers.add_parser("collect", help="交互式收集文档链接")
+    collect.add_argument("--links-file", help="链接文件（默认: feishu_links.txt）")
+
+    extract = subparsers.add_parser("extract", help="从PDF中提取飞书链接")
+    extract.add_argument("pdf_path", help="包含飞书链接的PDF文件")
+    extract.add_argument("--links-file", help="输出的链接文件（默认: feishu_links.txt）")
+    add_profile_arguments(extract)
+
+    preflight = subparsers.add_parser("preflight", help="并发预检链接（可访问/跳转/需登录/不存在）")
+    preflight.add_argument("links_file", nargs="?", help="链接文件（默认: feishu_links.txt）")
+    preflight.add_argument("--concurrency", type=int, help="最大并发请求数（默认: 20）")
+    preflight.add_argument("--timeout", type=float, help="单个链接超时时间（秒，默认: 10）")
+    preflight.add_argument("--report-file", help="预检结果文件（默认: preflight_report.json）")
+
+    export = subparsers.add_parser("export", help="批量导出文档为PDF")
+    export.add_argument("--links-file", help="链接文件（默认: feishu_links.txt）")
+    export.add_argument("--download-dir", help="下载目录（默认: ./feishu_exports）")
+    export.add_argument("--delay", type=float, help="操作间隔时间（秒）")
+    export.add_argument("--recycle-after-docs", type=int, help="每处理多少个文档重启一次浏览器（0表示不按数量重启）")
+    export.add_argument("--max-browser-rss-mb", type=int, help="浏览器内存上限（MB，0表示不限制）")
+    export.add_argument("--concurrency-mode", choices=["single", "tabs", "pipeline"],
+                        help="single 逐个处理；tabs 多标签页并行加载；pipeline 分阶段流水线（无头浏览器直接打印）")
+    export.add_argument("--tab-count", type=int, help="tabs/pipeline模式下的标签页数量")
+    export.add_argument("--pipeline-queue-size", type=int, help="pipeline模式下阶段之间队列的容量")
+    export.add_argument("--write-workers", type=int, help="pipeline模式下写入/校验阶段的线程数")
+    export.add_argument("--pipeline-headless", action=argparse.BooleanOptionalAction, default=None,
+                        help="pipeline模式下使用无头浏览器")
+    export.add_argument("--block-requests", action=argparse.BooleanOptionalAction, default=None,
+                        help="屏蔽埋点、音视频等与PDF内容无关的请求")
+    export.add_argument("--block-list-file", help="屏蔽规则JSON文件")
+    export.add_argument("--preflight", action=argparse.BooleanOptionalAction, default=None,
+                        help="启动浏览器前先预检链接")
+    export.add_argument("--document-timeout", type=float, help="单个文档的总时长上限（秒）")
+    export.add_argument("--state-db", help="导出状态库路径（默认: 下载目录/export_state.db）")
+    export.add_argument("--format", dest="export_format", choices=["pdf", "markdown", "html"],
+                        help="pdf 打印导出；markdown/html 直接导出文档内容（默认: pdf）")
+    export.add_argument("--browser-cache", action=argparse.BooleanOptionalAction, default=None,
+                        help="为浏览器分配持久化的磁盘缓存，重启和再次运行时复用JS/CSS/字体")
+    export.add_argument("--browser-cache-mb", type=int, help="浏览器磁盘缓存的大小上限（MB）")
+    export.add_argument("--asset-cache-mb", type=int, help="markdown/html模式下图片资源库的大小上限（MB）")
+    export.add_argument("--schedule", choices=["longest_first", "file"],
+                        help="file 按文件顺序（默认）；longest_first 并行时按历史耗时从长到短处理")
+    export.add_argument("--planned-workers", type=int, help="估计总用时时的并行数（共享队列时为导出进程总数）")
+    export.add_argument("--stream-merge", action=argparse.BooleanOptionalAction, default=None,
+                        help="每个文档导出后立即并入合并文件（按链接文件顺序，带目录）")
+    export.add_argument("--merged-name", help="合并文件名（默认: 飞书文档_合并.pdf）")
+    export.add_argument("--merge-window", type=int, help="合并重排缓冲区最多暂存的文档数")
+    export.add_argument("--verify-exports", action=argparse.BooleanOptionalAction, default=None,
+                        help="比较导出的PDF与页面信号，疑似截断或空白的文档以更长的渲染时间重新导出")
+    export.add_argument("--verify-retries", type=int, help="疑似不完整的文档最多重新导出的次数（默认: 1）")
+    export.add_argument("--retry-budget-factor", type=float, help="每次重新导出时渲染等待时间放大的倍数（默认: 3）")
+    export.add_argument("--link-closure", action=argparse.BooleanOptionalAction, default=None,
+                        help="扫描导出的PDF中的链接，把引用的新飞书文档加入导出队列")
+    export.add_argument("--closure-max-depth", type=int, help="链接闭包的最大深度（链接文件中的文档为第0层，默认: 2）")
+    export.add_argument("--closure-domain", dest="closure_domains", action="append",
+                        help="链接闭包跟随的域名（可重复，默认为链接文件中出现的域名）")
+    export.add_argument("--work-queue-url", help="共享工作队列协调服务地址（多机分片导出）")
+    export.add_argument("--work-queue-token",
+                        help="协调服务的共享令牌（默认取环境变量 FEISHU_WORK_QUEUE_TOKEN）")
+    export.add_argument("--progress-hub", help="进度汇总服务地址 host:port（progress_hub.py serve）")
+    add_profile_arguments(export)
+    export.add_argument("--trace-url", action="append", help="为该文档保存Chrome性能追踪（可重复；\"*\" 表示全部）")
+
+    merge = subparsers.add_parser("merge", help="合并目录下的PDF")
+    merge.add_argument("folder", nargs="?", help="PDF所在目录（默认: 下载目录）")
+    merge.add_argument("--no-dedupe-images", action="store_true", default=None, help="不合并内容相同的图片对象")
+    merge.add_argument("--full", action="store_true", default=None, help="忽略缓存，重新解析所有文件")
+    add_profile_arguments(merge)
+
+    index = subparsers.add_parser("index", help="建立或增量更新导出PDF的全文索引")
+    index.add_argument("folder", nargs="?", help="PDF所在目录（默认: 下载目录）")
+    index.add_argument("--index-db", help="索引路径（默认: PDF目录/search_index.db）")
+    index.add_argument("--workers", type=int, help="并行提取文本的进程数（默认: CPU核数）")
+    add_profile_arguments(index)
+
+    search = subparsers.add_parser("search", help="在导出PDF中检索关键词")
+    search.add_argument("query", help="查询内容（多个词之间用空格分隔）")
+    search.add_argument("--index-db", help="索引路径（默认: 下载目录/search_index.db）")
+    search.add_argument("--limit", type=int, help="最多返回的结果数（默认: 20）")
+
+    report = subparsers.add_parser("report", help="查询导出状态库")
+    # report 的参数与 export_state.py 的命令行一致，但在这里声明以免为 --help 导入状态库模块
+    report.add_argument("--db", help="状态库路径（默认: 下载目录/export_state.db）")
+    report_commands = report.add_subparsers(dest="report_command", required=True)
+    failed = report_commands.add_parser("failed", help="最近失败的文档")
+    failed.add_argument("--days", type=float, default=7)
+    failed.add_argument("--kind", help="错误类型，如 timeout")
+    slow = report_commands.add_parser("slow", help="耗时较长的文档")
+    slow.add_argument("--seconds", type=float, default=30)
+    export_files = report_commands.add_parser("export", help="导出旧格式的日志和报告文件")
+    export_files.add_argument("--run", type=int, help="运行id（默认最近一次）")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    options = resolve_options(args, load_config(args.config))
+    if args.command == "report" and not options.get('db'):
+        options['db'] = os.path.join(options['download_dir'], "export_state.db")
+    return COMMANDS[args.command](options)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
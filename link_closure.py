@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链接闭包发现
+飞书文档之间互相引用，链接文件经常漏掉被引用的文档。以前只能手动对单个PDF运行 pdf_link_extractor.py。
+
+开启后，每个导出成功的PDF都在后台线程中扫描链接注释：指向飞书文档的新链接（规范化后）
+加入导出队列，一次运行即可导出从链接文件出发可到达的全部文档。
+- 深度：链接文件中的文档为第0层，从第n层文档中发现的文档为第n+1层，可设置最大深度
+  （使用共享队列时深度随队列项保存，其他进程领取后接着计算）；
+- 域名白名单：只跟随指定域名（及其子域名）下的链接，默认为链接文件中出现的域名；
+- 扫描过的文件按内容哈希记录在状态库中，内容相同的文件（包括以前运行导出的）不再重新解析。
+"""
+
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+from export_state import file_sha256
+from link_collector import FeishuLinkCollector, canonical_feishu_url
+
+# 没有链接文件（如只从共享队列领取文档）时默认跟随的域名
+DEFAULT_DOMAINS = ("feishu.cn", "larksuite.com")
+
+_STOP = object()
+
+
+def domain_allowed(url, domains):
+    """链接的域名是否在白名单中（包括子域名）"""
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class LinkClosure:
+    def __init__(self, seeds, state, max_depth=None, allowed_domains=None, include_text=False, on_discovered=None):
+        """
+        初始化链接闭包发现
+
+        Args:
+            seeds (list): 链接文件中的文档链接（第0层）
+            state (ExportStateStore): 导出状态库，用于记录已扫描文件的哈希和其中的链接
+            max_depth (int): 最大深度（None表示不限制）
+            allowed_domains (list): 跟随的域名白名单，默认为 seeds 中出现的域名（包括其子域名）
+            include_text (bool): 是否同时扫描正文中的裸URL（需要提取文本，较慢）
+            on_discovered (callable): 发现新文档时的回调（在后台线程中调用），参数为规范化后的链接列表和它们的深度
+        """
+        self.state = state
+        self.max_depth = max_depth
+        self.include_text = include_text
+        self.on_discovered = on_discovered
+        self.validator = FeishuLinkCollector(output_file=None)
+
+        self.depth = {}
+        for url in seeds:
+            self.depth.setdefault(canonical_feishu_url(url), 0)
+        if allowed_domains:
+            self.allowed_domains = [domain.lower() for domain in allowed_domains]
+        else:
+            self.allowed_domains = sorted({urlparse(url).hostname for url in self.depth if urlparse(url).hostname})
+            self.allowed_domains = self.allowed_domains or list(DEFAULT_DOMAINS)
+
+        self.discovered = []      # [{'url', 'depth', 'found_in'}]
+        self.files_scanned = 0
+        self.files_reused = 0     # 内容哈希已扫描过，直接使用记录的链接
+        self.scan_errors = 0
+        self.beyond_depth = set()
+        self.scan_seconds = 0.0
+
+        self._queue = queue.Queue()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._thread = threading.Thread(target=self._work, name="link-closure", daemon=True)
+        self._thread.start()
+
+    def submit(self, url, paths, depth=None):
+        """
+        一个文档导出成功：在后台扫描其输出文件中的链接（不阻塞导出）
+
+        Args:
+            url (str): 文档链接
+            paths (list): 输出文件
+            depth (int): 该文档的深度（如共享队列中记录的深度），None 表示使用本进程记录的深度
+        """
+        paths = [path for path in paths if path.lower().endswith('.pdf')]
+        if not paths:
+            return
+        with self._idle:
+            self._pending += 1
+        self._queue.put((url, paths, depth))
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            url, paths, depth = item
+            started = time.time()
+            try:
+                self.scan(url, paths, depth)
+            except Exception as e:
+                self.scan_errors += 1
+                print(f"⚠️  扫描文档链接失败: {url} {e}")
+            finally:
+                self.scan_seconds += time.time() - started
+                with self._idle:
+                    self._pending -= 1
+                    self._idle.notify_all()
+
+    def links_in(self, path):
+        """文件中的链接：内容哈希已扫描过时使用记录的结果，否则解析PDF并记录"""
+        from pdf_link_extractor import iter_pdf_links
+
+        sha256 = file_sha256(path)
+        links = self.state.scanned_links(sha256)
+        if links is not None:
+            self.files_reused += 1
+            return links
+
+        links = list(dict.fromkeys(link for _, link, _ in iter_pdf_links(path, include_text=self.include_text)))
+        self.state.record_link_scan(sha256, path, links)
+        self.files_scanned += 1
+        return links
+
+    def record_depth(self, urls, depth):
+        """记录本进程之外得知的文档深度（如预检后替换为跳转目标的链接）"""
+        for url in urls:
+            self.depth.setdefault(canonical_feishu_url(url), depth)
+
+    def scan(self, url, paths, depth=None):
+        """
+        扫描一个文档的输出文件，把新发现的文档交给 on_discovered
+
+        Args:
+            url (str): 文档链接
+            paths (list): 输出文件
+            depth (int): 该文档的深度，None 表示使用本进程记录的深度（未记录的为第0层）
+
+        Returns:
+            list: 新发现的规范化链接
+        """
+        canonical_url = canonical_feishu_url(url)
+        if depth is not None:
+            self.depth[canonical_url] = depth
+        depth = self.depth.setdefault(canonical_url, 0) + 1
+        found = []
+        for path in paths:
+            for link in self.links_in(path):
+                if not self.validator.is_valid_feishu_url(link) or not domain_allowed(link, self.allowed_domains):
+                    continue
+                canonical = canonical_feishu_url(link)
+                if canonical in self.depth:
+                    continue
+                if self.max_depth is not None and depth > self.max_depth:
+                    self.beyond_depth.add(canonical)
+                    continue
+                self.depth[canonical] = depth
+                self.discovered.append({'url': canonical, 'depth': depth, 'found_in': url})
+                found.append(canonical)
+
+        if found:
+            print(f"🔗 从 {url} 中发现 {len(found)} 个新文档（第{depth}层），已加入导出队列")
+            if self.on_discovered:
+                self.on_discovered(found, depth)
+        return found
+
+    def wait_idle(self, timeout=None):
+        """等待所有已提交的文件扫描完成"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+
+    def get_stats(self):
+        return {
+            'allowed_domains': self.allowed_domains,
+            'max_depth': self.max_depth,
+            'discovered': self.discovered,
+            'files_scanned': self.files_scanned,
+            'files_reused': self.files_reused,
+            'scan_errors': self.scan_errors,
+            'beyond_depth': len(self.beyond_depth),
+            'scan_seconds': round(self.scan_seconds, 2),
+        }
+
+    def print_summary(self):
+        stats = self.get_stats()
+        print(f"🔗 链接闭包: 新发现 {len(stats['discovered'])} 个文档，扫描 {stats['files_scanned']} 个文件"
+              f"（内容未变化直接复用 {stats['files_reused']} 个），超出深度未跟随 {stats['beyond_depth']} 个")
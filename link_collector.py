@@ -11,7 +11,16 @@
 
 import os
 import re
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlunparse
+
+def canonical_feishu_url(url):
+    """
+    规范化飞书文档URL：统一小写协议和域名，去掉查询参数、锚点和末尾斜杠，
+    便于对同一文档的不同链接写法去重
+    """
+    parsed = urlparse(url.strip())
+    path = parsed.path.rstrip('/') or '/'
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path, '', '', ''))
 
 class FeishuLinkCollector:
     def __init__(self, output_file="feishu_links.txt"):
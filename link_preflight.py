@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+飞书链接预检工具
+在启动浏览器之前，用带连接池的异步HTTP客户端并发检查所有链接，
+将每个链接归类为：可访问 / 已跳转（解析出最终URL）/ 需要登录 / 不存在，
+失效链接在几秒内即可剔除，无需为每个链接完整加载一次浏览器页面。
+检查出错（超时、连接错误、5xx）的链接可能只是网络波动，标记为未验证，仍然导出。
+
+需要安装：
+pip install aiohttp
+
+用法：
+    python3 link_preflight.py
+或：
+    python3 link_preflight.py /path/to/feishu_links.txt
+"""
+
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+
+import aiohttp
+
+from link_collector import canonical_feishu_url
+
+STATUS_REACHABLE = "reachable"
+STATUS_REDIRECT = "redirect"
+STATUS_LOGIN_REQUIRED = "login_required"
+STATUS_NOT_FOUND = "not_found"
+STATUS_ERROR = "error"
+
+STATUS_LABELS = {
+    STATUS_REACHABLE: "✅ 可访问",
+    STATUS_REDIRECT: "↪️  已跳转",
+    STATUS_LOGIN_REQUIRED: "🔒 需要登录",
+    STATUS_NOT_FOUND: "❌ 不存在",
+    STATUS_ERROR: "⚠️  未验证（检查出错）",
+}
+
+# 确定无法导出的结果，只有这些链接会被剔除
+SKIP_STATUSES = (STATUS_LOGIN_REQUIRED, STATUS_NOT_FOUND)
+
+# 跳转到这些路径说明文档需要登录或没有权限
+LOGIN_MARKERS = ("/accounts/", "/passport/", "/login", "/suite/passport")
+
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+
+def classify_response(url, status, final_url):
+    """
+    根据HTTP状态码和最终URL对链接归类
+
+    Args:
+        url (str): 原始链接
+        status (int): 最终响应的状态码
+        final_url (str): 跟随跳转后的最终URL
+    """
+    if status in (401, 403) or any(marker in final_url for marker in LOGIN_MARKERS):
+        return STATUS_LOGIN_REQUIRED
+    if status in (404, 410):
+        return STATUS_NOT_FOUND
+    if status >= 400:
+        return STATUS_ERROR
+    if canonical_feishu_url(final_url) != canonical_feishu_url(url):
+        return STATUS_REDIRECT
+    return STATUS_REACHABLE
+
+
+class LinkPreflightChecker:
+    def __init__(self, concurrency=20, per_host_limit=10, timeout=10, report_file="preflight_report.json"):
+        """
+        初始化链接预检器
+
+        Args:
+            concurrency (int): 同时进行的最大请求数（连接池大小）
+            per_host_limit (int): 对同一域名的最大并发连接数
+            timeout (int): 单个链接的超时时间（秒）
+            report_file (str): 预检结果文件路径
+        """
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.report_file = report_file
+
+    async def _check_one(self, session, url):
+        """检查单个链接"""
+        result = {
+            'url': url,
+            'status': STATUS_ERROR,
+            'http_status': None,
+            'final_url': url,
+            'canonical_url': canonical_feishu_url(url),
+            'elapsed_ms': 0,
+            'error': '',
+        }
+        started = time.perf_counter()
+        try:
+            async with session.get(url, allow_redirects=True) as response:
+                final_url = str(response.url)
+                result['http_status'] = response.status
+                result['final_url'] = final_url
+                result['canonical_url'] = canonical_feishu_url(final_url)
+                result['status'] = classify_response(url, response.status, final_url)
+        except asyncio.TimeoutError:
+            result['error'] = f"请求超时（{self.timeout}秒）"
+        except aiohttp.ClientError as e:
+            result['error'] = str(e) or e.__class__.__name__
+        result['elapsed_ms'] = int((time.perf_counter() - started) * 1000)
+        return result
+
+    async def _check_all(self, urls):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host_limit,
+                                         ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={'User-Agent': USER_AGENT}) as session:
+            return await asyncio.gather(*(self._check_one(session, url) for url in urls))
+
+    def check_links(self, urls):
+        """
+        并发检查所有链接
+
+        Returns:
+            list: 每个链接的检查结果（与输入顺序一致）
+        """
+        if not urls:
+            return []
+        started = time.time()
+        results = asyncio.run(self._check_all(urls))
+        print(f"🔍 已预检 {len(results)} 个链接，用时 {time.time() - started:.1f}秒")
+        return results
+
+    @staticmethod
+    def exportable_links(results):
+        """
+        可以导出的链接：已跳转的使用最终URL，其余保留原链接（同一文档只保留一次）；
+        只剔除不存在和需要登录的链接，检查出错的链接仍然导出
+        """
+        links = []
+        seen = set()
+        for result in results:
+            if result['status'] in SKIP_STATUSES:
+                continue
+            link = result['final_url'] if result['status'] == STATUS_REDIRECT else result['url']
+            if result['canonical_url'] in seen:
+                continue
+            seen.add(result['canonical_url'])
+            links.append(link)
+        return links
+
+    def save_report(self, results):
+        """保存预检结果"""
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+
+        report = {
+            'check_time': datetime.now().isoformat(),
+            'total_links': len(results),
+            'counts': counts,
+            'results': results,
+        }
+        try:
+            with open(self.report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"📋 预检结果已保存到: {self.report_file}")
+        except Exception as e:
+            print(f"❌ 保存预检结果失败: {e}")
+
+    def print_summary(self, results):
+        """打印预检统计和有问题的链接"""
+        print("=" * 60)
+        for status, label in STATUS_LABELS.items():
+            count = sum(1 for result in results if result['status'] == status)
+            if count:
+                print(f"{label}: {count}")
+
+        problems = [result for result in results if result['status'] != STATUS_REACHABLE]
+        for result in problems:
+            print(f"  {STATUS_LABELS[result['status']]} {result['url']}")
+            if result['status'] == STATUS_REDIRECT:
+                print(f"     → {result['final_url']}")
+            elif result['error']:
+                print(f"     {result['error']}")
+        print("=" * 60)
+
+
+def load_links(links_file):
+    """从文件加载链接（跳过空行和#注释）"""
+    with open(links_file, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def main():
+    print("🚀 飞书链接预检工具")
+    print("=" * 40)
+
+    links_file = sys.argv[1] if len(sys.argv) > 1 else "feishu_links.txt"
+    try:
+        links = load_links(links_file)
+    except Exception as e:
+        print(f"❌ 加载链接文件失败: {e}")
+        return
+
+    checker = LinkPreflightChecker()
+    results = checker.check_links(links)
+    checker.print_summary(results)
+    checker.save_report(results)
+
+
+if __name__ == "__main__":
+    main()
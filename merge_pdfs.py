@@ -4,36 +4,69 @@
 合并指定目录下的所有 PDF 文件，生成一个新的 PDF：
 - 以文件名为/以“选调面试”开头的 PDF 作为第一个文件
 - 其余 PDF 排序规则随意（这里按文件名排序）
+- 合并文件本身（以及边导出边合并生成的 *_合并.pdf）不作为输入
+- 每个文件在合并文件的目录（书签）中对应一项，原文件中的书签作为其子项
 
 默认目录：/Users/lszhyj/Documents/选调面试/飞书笔记
 默认输出文件名：选调面试_合并.pdf
 
+增量重建：每个输入文件只解析一次，其页面及引用的全部对象按合并文件中的对象编号序列化后
+缓存在 .merge_cache/ 中（内容相同的图片放入共享图片池，只保存一份）。清单（manifest.json）
+记录每个输入的哈希、缓存位置和在合并文件中的页码范围；再次合并时只解析新增或修改过的文件，
+其余部分直接按字节拼接，最后重新生成页面树、目录和交叉引用表。
+原文件目录对象中的命名目标在解析时解析为显式的页面引用（文档内链接合并后仍然有效），
+页码标签按各文件在合并文件中的起始页重新生成。
+重新导出少数文档后再次合并只需几秒。
+
 用法：
     python3 merge_pdfs.py
 或：
     python3 merge_pdfs.py /path/to/folder
+忽略缓存完整重建：
+    python3 merge_pdfs.py /path/to/folder --full
+剖析合并耗时：
+    python3 merge_pdfs.py /path/to/folder --profile
 """
 
+import argparse
+import fnmatch
+import io
+import json
 import os
-import sys
+import shutil
+import time
+from collections import Counter
 
-from PyPDF2 import PdfMerger
+from asset_store import image_content_key
+from export_profiler import add_profile_arguments, profile_run
+from export_state import file_sha256
 
 
 DEFAULT_FOLDER = "/Users/lszhyj/Documents/选调面试/飞书笔记"
 OUTPUT_NAME = "选调面试_合并.pdf"
 
+# 合并文件（本脚本及边导出边合并的输出）不作为输入
+MERGED_PATTERN = "*_合并.pdf"
 
-def merge_pdfs(folder: str) -> None:
-    if not os.path.isdir(folder):
-        print(f"❌ 目录不存在: {folder}")
-        return
+CACHE_DIR = ".merge_cache"
+MANIFEST_NAME = "manifest.json"
+IMAGE_POOL_NAME = "images.bin"
+MANIFEST_VERSION = 2
+
+# 合并文件中固定的对象编号：目录、页面树根、书签根
+CATALOG_NUMBER = 1
+PAGES_NUMBER = 2
+OUTLINES_NUMBER = 3
+
+# 失效的对象编号或图片池数据超过有效部分的该倍数时，完整重建以压缩编号和缓存
+COMPACT_RATIO = 2
+# 失效部分较少时不值得重建：对象编号和图片池数据各允许的额外余量
+COMPACT_SLACK_NUMBERS = 1000
+COMPACT_SLACK_BYTES = 16 * 1024 * 1024
 
-    pdf_files = [f for f in os.listdir(folder) if f.lower().endswith(".pdf")]
-    if not pdf_files:
-        print(f"❌ 目录下没有找到 PDF 文件: {folder}")
-        return
 
+def order_sources(pdf_files):
+    """合并顺序：以“选调面试”开头的文件在前，其余按文件名排序"""
     first_pdf = None
     for f in pdf_files:
         name, _ = os.path.splitext(f)
@@ -42,34 +75,598 @@ def merge_pdfs(folder: str) -> None:
             break
 
     others = sorted(f for f in pdf_files if f != first_pdf)
-    ordered = ([first_pdf] if first_pdf else []) + others
+    return ([first_pdf] if first_pdf else []) + others
+
+
+def collect_outline(reader, outline):
+    """原文件的书签 → [[标题, 页序号, 顶部位置, 子项], ...]（页序号相对于该文件）"""
+    items = []
+    for entry in outline:
+        if isinstance(entry, list):
+            if items:
+                items[-1][3] = collect_outline(reader, entry)
+            continue
+        try:
+            page = reader.get_destination_page_number(entry)
+        except Exception:
+            continue
+        if page < 0:
+            continue
+        top = entry.top if entry.typ == "/XYZ" and entry.top is not None else None
+        items.append([str(entry.title or ""), page, float(top) if top is not None else None, []])
+    return items
+
+
+def destination_key(value):
+    """命名目标的键：名称对象（/Dests 字典）和字符串（/Names 名称树）分别按原样区分"""
+    if isinstance(value, bytes):
+        return value.decode("latin-1")
+    return str(value)
+
+
+def collect_named_destinations(reader):
+    """原文件的命名目标 → 目标数组（来自目录的 /Dests 字典和 /Names 中的 /Dests 名称树）"""
+    from PyPDF2.generic import ArrayObject, DictionaryObject
+
+    root = reader.trailer["/Root"]
+    destinations = {}
+
+    def add(name, value):
+        value = value.get_object()
+        if isinstance(value, DictionaryObject):
+            value = value.get("/D")
+            value = value.get_object() if value is not None else None
+        if isinstance(value, ArrayObject) and value:
+            destinations[destination_key(name)] = value
+
+    def walk(node, depth=0):
+        node = node.get_object()
+        names = node.get("/Names")
+        if names is not None:
+            names = names.get_object()
+            for name, value in zip(names[::2], names[1::2]):
+                add(name, value)
+        if depth < 32:
+            for kid in node.get("/Kids", []):
+                walk(kid, depth + 1)
+
+    if "/Dests" in root:
+        for name, value in root["/Dests"].get_object().items():
+            add(name, value)
+    names = root.get("/Names")
+    if names is not None and "/Dests" in names.get_object():
+        walk(names.get_object()["/Dests"])
+    return destinations
+
+
+def collect_page_labels(reader):
+    """原文件的页码标签 → [[起始页序号, 样式, 前缀, 起始值], ...]（没有 /PageLabels 时为空列表）"""
+    root = reader.trailer["/Root"]
+    ranges = []
+
+    def walk(node, depth=0):
+        node = node.get_object()
+        nums = node.get("/Nums")
+        if nums is not None:
+            nums = nums.get_object()
+            for start, label in zip(nums[::2], nums[1::2]):
+                label = label.get_object()
+                style = label.get("/S")
+                prefix = label.get("/P")
+                ranges.append([int(start), str(style) if style is not None else None,
+                               str(prefix) if prefix is not None else None, int(label.get("/St", 1))])
+        if depth < 32:
+            for kid in node.get("/Kids", []):
+                walk(kid, depth + 1)
+
+    if "/PageLabels" in root:
+        walk(root["/PageLabels"])
+    return sorted(ranges)
+
+
+class IncrementalPdfMerger:
+    def __init__(self, folder, output_name=OUTPUT_NAME, dedupe_images=True):
+        """
+        初始化增量合并
+
+        Args:
+            folder (str): PDF所在目录（缓存保存在其中的 .merge_cache/）
+            output_name (str): 合并文件名
+            dedupe_images (bool): 是否把不同文件中内容相同的图片合并为一个对象
+        """
+        self.folder = folder
+        self.output_path = os.path.join(folder, output_name)
+        self.dedupe_images = dedupe_images
+        self.cache_dir = os.path.join(folder, CACHE_DIR)
+        self.manifest_path = os.path.join(self.cache_dir, MANIFEST_NAME)
+        self.pool_path = os.path.join(self.cache_dir, IMAGE_POOL_NAME)
+        self.manifest = None
+        self.stats = {'reused': 0, 'parsed': 0, 'removed': 0, 'full_rebuild': False}
+
+    def _empty_manifest(self):
+        return {
+            'version': MANIFEST_VERSION,
+            'dedupe_images': self.dedupe_images,
+            'next_number': OUTLINES_NUMBER + 1,
+            'segments': {},
+            'images': {},
+            'documents': [],
+        }
+
+    def _load_manifest(self):
+        """读取清单；清单与上次生成的合并文件不一致时返回 None（需要完整重建）"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            output = os.stat(self.output_path)
+        except (OSError, ValueError):
+            return None
+        if (manifest.get('version') != MANIFEST_VERSION
+                or manifest.get('dedupe_images') != self.dedupe_images
+                or manifest.get('output_size') != output.st_size
+                or manifest.get('output_mtime_ns') != output.st_mtime_ns):
+            return None
+        return manifest
+
+    def _allocate(self):
+        number = self.manifest['next_number']
+        self.manifest['next_number'] += 1
+        return number
+
+    def _is_unchanged(self, entry, path):
+        """大小和修改时间相同时视为未修改；修改时间变化但内容哈希相同时也复用"""
+        stat = os.stat(path)
+        if entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return True
+        if entry['size'] == stat.st_size and entry['sha256'] == file_sha256(path):
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return True
+        return False
+
+    def _build_segment(self, path):
+        """
+        解析一个输入文件，把页面及其引用的全部对象按新的对象编号序列化到缓存文件
+
+        Returns:
+            dict: 清单中该文件的记录
+        """
+        from PyPDF2 import PdfReader
+        from PyPDF2.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject, NullObject,
+                                    NumberObject, StreamObject)
+
+        reader = PdfReader(path)
+        if reader.is_encrypted:
+            reader.decrypt("")
+        pages = list(reader.pages)
+
+        # 收集页面可达的全部间接对象（不经过 /Parent 回到原文件的页面树）
+        objects = {}
+        excluded = set()
+        queue = []
+        for page in pages:
+            ref = page.indirect_reference
+            objects[(ref.idnum, ref.generation)] = page
+            queue.append(page)
+        while queue:
+            obj = queue.pop()
+            for ref in self._references(obj, obj in pages):
+                key = (ref.idnum, ref.generation)
+                if key in objects or key in excluded:
+                    continue
+                target = ref.get_object()
+                if isinstance(target, DictionaryObject) and target.get("/Type") in ("/Pages", "/Catalog"):
+                    excluded.add(key)
+                    continue
+                objects[key] = target
+                queue.append(target)
+
+        # 分配对象编号：可共享的图片使用图片池中的编号，其余对象在本文件的缓存中
+        key_cache = {}
+        poolable = {}
+        mapping = {}
+        new_images = []
+        image_keys = []
+        for key, obj in objects.items():
+            if self.dedupe_images and self._is_poolable(key, obj, objects, poolable):
+                content_key = image_content_key(obj, key_cache)
+                if content_key not in self.manifest['images']:
+                    self.manifest['images'][content_key] = [self._allocate(), None, None]
+                    new_images.append((content_key, key))
+                mapping[key] = self.manifest['images'][content_key][0]
+                image_keys.append(content_key)
+            else:
+                mapping[key] = self._allocate()
+        pages_node = self._allocate()
+
+        # 链接中的命名目标指向原文件目录对象中的名称，而目录对象不会被复制，改为显式的目标数组
+        try:
+            destinations = collect_named_destinations(reader)
+        except Exception:
+            destinations = {}
+
+        def resolve(value):
+            if isinstance(value, (str, bytes)):
+                return destinations.get(destination_key(value), value)
+            return value
+
+        def remap(obj):
+            if isinstance(obj, IndirectObject):
+                number = mapping.get((obj.idnum, obj.generation))
+                return IndirectObject(number, 0, None) if number else None
+            if isinstance(obj, StreamObject):
+                copy = obj.__class__()
+                copy._data = obj._data
+                for name, value in obj.items():
+                    value = remap(value)
+                    if name != "/Length" and value is not None:
+                        copy[name] = value
+                return copy
+            if isinstance(obj, DictionaryObject):
+                copy = DictionaryObject()
+                for name, value in obj.items():
+                    if name == "/Dest" or (name == "/D" and obj.get("/S") == "/GoTo"):
+                        value = resolve(value)
+                    value = remap(value)
+                    if value is not None:
+                        copy[name] = value
+                return copy
+            if isinstance(obj, ArrayObject):
+                return ArrayObject(NullObject() if value is None else value for value in map(remap, obj))
+            return obj
+
+        page_keys = {(page.indirect_reference.idnum, page.indirect_reference.generation) for page in pages}
+        buffer = io.BytesIO()
+        offsets = []
+        for key, obj in objects.items():
+            if poolable.get(key):
+                continue
+            copy = remap(obj)
+            if key in page_keys:
+                copy[NameObject("/Parent")] = IndirectObject(pages_node, 0, None)
+            offsets.append([mapping[key], buffer.tell()])
+            self._write_object(buffer, mapping[key], copy)
+
+        page_numbers = [mapping[(page.indirect_reference.idnum, page.indirect_reference.generation)]
+                        for page in pages]
+        node = DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Parent"): IndirectObject(PAGES_NUMBER, 0, None),
+            NameObject("/Kids"): ArrayObject(IndirectObject(number, 0, None) for number in page_numbers),
+            NameObject("/Count"): NumberObject(len(page_numbers)),
+        })
+        offsets.append([pages_node, buffer.tell()])
+        self._write_object(buffer, pages_node, node)
+
+        # 新出现的图片追加到图片池
+        if new_images:
+            with open(self.pool_path, 'ab') as pool:
+                for content_key, key in new_images:
+                    entry = self.manifest['images'][content_key]
+                    data = io.BytesIO()
+                    self._write_object(data, entry[0], remap(objects[key]))
+                    entry[1], entry[2] = pool.tell(), len(data.getvalue())
+                    pool.write(data.getvalue())
+
+        segment_file = f"segment-{pages_node}.bin"
+        with open(os.path.join(self.cache_dir, segment_file), 'wb') as f:
+            f.write(buffer.getvalue())
+
+        try:
+            outline = collect_outline(reader, reader.outline)
+        except Exception:
+            outline = []
+        try:
+            page_labels = collect_page_labels(reader)
+        except Exception:
+            page_labels = []
+
+        stat = os.stat(path)
+        return {
+            'sha256': file_sha256(path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'file': segment_file,
+            'objects': offsets,
+            'pages_node': pages_node,
+            'page_numbers': page_numbers,
+            'images': sorted(set(image_keys)),
+            'outline': outline,
+            'page_labels': page_labels,
+        }
+
+    @staticmethod
+    def _references(obj, is_page):
+        """对象中直接出现的间接引用（不进入被引用的对象）"""
+        from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+        stack = [obj]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, IndirectObject):
+                yield value
+            elif isinstance(value, DictionaryObject):
+                for name, item in value.items():
+                    if (name == "/Parent" and is_page) or (name == "/Length" and isinstance(value, StreamObject)):
+                        continue
+                    stack.append(item)
+            elif isinstance(value, ArrayObject):
+                stack.extend(value)
+
+    def _is_poolable(self, key, obj, objects, poolable):
+        """图片对象，且只引用其他可共享的图片（如软蒙版）时放入图片池"""
+        from PyPDF2.generic import StreamObject
+
+        if key in poolable:
+            return poolable[key]
+        poolable[key] = False
+        if not isinstance(obj, StreamObject) or obj.get("/Subtype") != "/Image":
+            return False
+        for ref in self._references(obj, False):
+            ref_key = (ref.idnum, ref.generation)
+            if ref_key not in objects or not self._is_poolable(ref_key, objects[ref_key], objects, poolable):
+                return False
+        poolable[key] = True
+        return True
+
+    @staticmethod
+    def _write_object(stream, number, obj):
+        stream.write(f"{number} 0 obj\n".encode())
+        obj.write_to_stream(stream, None)
+        stream.write(b"\nendobj\n")
+
+    def _outline_objects(self, documents, first_number):
+        """生成书签对象：每个文件一项，原文件中的书签作为其子项（折叠）"""
+        from PyPDF2.generic import (ArrayObject, DictionaryObject, FloatObject, IndirectObject, NameObject,
+                                    NullObject, NumberObject, create_string_object)
+
+        objects = {}
+        counter = [first_number]
+
+        def build(items, parent, page_numbers):
+            numbers = []
+            for title, page, top, children in items:
+                number = counter[0]
+                counter[0] += 1
+                numbers.append(number)
+                page_ref = IndirectObject(page_numbers[page], 0, None)
+                dest = ArrayObject([page_ref, NameObject("/Fit")]) if top is None else ArrayObject(
+                    [page_ref, NameObject("/XYZ"), NullObject(), FloatObject(top), NullObject()])
+                item = DictionaryObject({
+                    NameObject("/Title"): create_string_object(title),
+                    NameObject("/Parent"): IndirectObject(parent, 0, None),
+                    NameObject("/Dest"): dest,
+                })
+                objects[number] = item
+                child_numbers = build(children, number, page_numbers)
+                if child_numbers:
+                    item[NameObject("/First")] = IndirectObject(child_numbers[0], 0, None)
+                    item[NameObject("/Last")] = IndirectObject(child_numbers[-1], 0, None)
+                    item[NameObject("/Count")] = NumberObject(-len(child_numbers))
+            for previous, following in zip(numbers, numbers[1:]):
+                objects[previous][NameObject("/Next")] = IndirectObject(following, 0, None)
+                objects[following][NameObject("/Prev")] = IndirectObject(previous, 0, None)
+            return numbers
+
+        top_numbers = []
+        for title, entry in documents:
+            if entry['page_numbers']:
+                top_numbers += build([[title, 0, None, entry['outline']]], OUTLINES_NUMBER, entry['page_numbers'])
+        for previous, following in zip(top_numbers, top_numbers[1:]):
+            objects[previous][NameObject("/Next")] = IndirectObject(following, 0, None)
+            objects[following][NameObject("/Prev")] = IndirectObject(previous, 0, None)
+
+        root = DictionaryObject({NameObject("/Type"): NameObject("/Outlines"),
+                                 NameObject("/Count"): NumberObject(len(top_numbers))})
+        if top_numbers:
+            root[NameObject("/First")] = IndirectObject(top_numbers[0], 0, None)
+            root[NameObject("/Last")] = IndirectObject(top_numbers[-1], 0, None)
+        objects[OUTLINES_NUMBER] = root
+        return objects
+
+    def _assemble(self, ordered):
+        """按顺序拼接各文件的缓存和用到的图片，生成页面树、书签和交叉引用表，写出合并文件"""
+        from PyPDF2.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject,
+                                    create_string_object)
+
+        segments = self.manifest['segments']
+        offsets = {}
+        temp_path = f"{self.output_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as out:
+            out.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+            documents = []
+            page_labels = []
+            page_start = 0
+            for name in ordered:
+                entry = segments[name]
+                base = out.tell()
+                with open(os.path.join(self.cache_dir, entry['file']), 'rb') as f:
+                    shutil.copyfileobj(f, out)
+                for number, offset in entry['objects']:
+                    offsets[number] = base + offset
+                documents.append({'source': name, 'sha256': entry['sha256'], 'first_page': page_start,
+                                  'pages': len(entry['page_numbers'])})
+                # 没有页码标签的文件沿用合并文件中的物理页码
+                for start, style, prefix, first in entry['page_labels'] or [[0, "/D", None, page_start + 1]]:
+                    label = DictionaryObject()
+                    if style:
+                        label[NameObject("/S")] = NameObject(style)
+                    if prefix:
+                        label[NameObject("/P")] = create_string_object(prefix)
+                    if first != 1:
+                        label[NameObject("/St")] = NumberObject(first)
+                    page_labels += [NumberObject(page_start + start), label]
+                page_start += len(entry['page_numbers'])
+
+            used = Counter(key for name in ordered for key in segments[name]['images'])
+            if used:
+                with open(self.pool_path, 'rb') as pool:
+                    for key in sorted(used, key=lambda k: self.manifest['images'][k][1]):
+                        number, offset, length = self.manifest['images'][key]
+                        pool.seek(offset)
+                        offsets[number] = out.tell()
+                        out.write(pool.read(length))
+
+            top_objects = self._outline_objects(
+                [(os.path.splitext(name)[0], segments[name]) for name in ordered], self.manifest['next_number'])
+            top_objects[PAGES_NUMBER] = DictionaryObject({
+                NameObject("/Type"): NameObject("/Pages"),
+                NameObject("/Kids"): ArrayObject(IndirectObject(segments[name]['pages_node'], 0, None)
+                                                 for name in ordered),
+                NameObject("/Count"): NumberObject(page_start),
+            })
+            top_objects[CATALOG_NUMBER] = DictionaryObject({
+                NameObject("/Type"): NameObject("/Catalog"),
+                NameObject("/Pages"): IndirectObject(PAGES_NUMBER, 0, None),
+                NameObject("/Outlines"): IndirectObject(OUTLINES_NUMBER, 0, None),
+                NameObject("/PageMode"): NameObject("/UseOutlines"),
+            })
+            if any(segments[name]['page_labels'] for name in ordered):
+                top_objects[CATALOG_NUMBER][NameObject("/PageLabels")] = DictionaryObject(
+                    {NameObject("/Nums"): ArrayObject(page_labels)})
+            for number, obj in sorted(top_objects.items()):
+                offsets[number] = out.tell()
+                self._write_object(out, number, obj)
+
+            self._write_xref(out, offsets)
+
+        os.replace(temp_path, self.output_path)
+        output = os.stat(self.output_path)
+        self.manifest.update(output_size=output.st_size, output_mtime_ns=output.st_mtime_ns, documents=documents)
+        self.stats.update(images=sum(used.values()), unique_images=len(used),
+                          bytes_saved=sum((count - 1) * self.manifest['images'][key][2]
+                                          for key, count in used.items()))
+
+    @staticmethod
+    def _write_xref(out, offsets):
+        """交叉引用表：未使用的编号（之前重建时释放的）串成空闲链表"""
+        size = max(offsets) + 1
+        free = [number for number in range(1, size) if number not in offsets]
+        next_free = dict(zip([0] + free, free + [0]))
+        xref_offset = out.tell()
+        lines = [f"xref\n0 {size}\n", f"{next_free[0]:010d} 65535 f \n"]
+        for number in range(1, size):
+            if number in offsets:
+                lines.append(f"{offsets[number]:010d} 00000 n \n")
+            else:
+                lines.append(f"{next_free[number]:010d} 00001 f \n")
+        out.write("".join(lines).encode())
+        out.write(f"trailer\n<< /Size {size} /Root {CATALOG_NUMBER} 0 R >>\n"
+                  f"startxref\n{xref_offset}\n%%EOF\n".encode())
+
+    def _needs_compaction(self, ordered):
+        """失效的对象编号或图片池数据过多时完整重建"""
+        segments = self.manifest['segments']
+        live_numbers = sum(len(segments[name]['objects']) for name in ordered)
+        used = {key for name in ordered for key in segments[name]['images']}
+        live_numbers += len(used)
+        pool_bytes = os.path.getsize(self.pool_path) if os.path.exists(self.pool_path) else 0
+        live_bytes = sum(self.manifest['images'][key][2] for key in used)
+        return (self.manifest['next_number'] > COMPACT_RATIO * live_numbers + COMPACT_SLACK_NUMBERS
+                or pool_bytes > COMPACT_RATIO * live_bytes + COMPACT_SLACK_BYTES)
+
+    def merge(self, ordered, full=False):
+        """
+        按顺序合并，只解析新增或修改过的文件
+
+        Args:
+            ordered (list): 输入文件名（相对于目录），按合并顺序
+            full (bool): 忽略缓存完整重建
+
+        Returns:
+            dict: {'reused', 'parsed', 'removed', 'full_rebuild', 'images', 'unique_images', 'bytes_saved', 'seconds'}
+        """
+        started = time.time()
+        self.manifest = None if full else self._load_manifest()
+        if self.manifest is None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.manifest = self._empty_manifest()
+            self.stats['full_rebuild'] = True
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        segments = self.manifest['segments']
+        for name in list(segments):
+            path = os.path.join(self.folder, name)
+            if name not in ordered or not os.path.exists(path) or not self._is_unchanged(segments[name], path):
+                self._remove_segment(name)
+                if name not in ordered:
+                    self.stats['removed'] += 1
+
+        for name in ordered:
+            if name in segments:
+                print(f"♻️  复用: {name}")
+                self.stats['reused'] += 1
+                continue
+            print(f"➕ 解析: {name}")
+            segments[name] = self._build_segment(os.path.join(self.folder, name))
+            self.stats['parsed'] += 1
+
+        if not self.stats['full_rebuild'] and self._needs_compaction(ordered):
+            print("🧹 缓存中失效的部分过多，完整重建")
+            self.stats = {'reused': 0, 'parsed': 0, 'removed': 0, 'full_rebuild': False}
+            return self.merge(ordered, full=True)
+
+        self._assemble(ordered)
+        temp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False)
+        os.replace(temp_path, self.manifest_path)
+
+        self.stats['seconds'] = round(time.time() - started, 2)
+        return dict(self.stats)
+
+    def _remove_segment(self, name):
+        entry = self.manifest['segments'].pop(name)
+        try:
+            os.remove(os.path.join(self.cache_dir, entry['file']))
+        except OSError:
+            pass
+
+
+def merge_pdfs(folder: str, dedupe_images: bool = True, full: bool = False) -> None:
+    if not os.path.isdir(folder):
+        print(f"❌ 目录不存在: {folder}")
+        return
+
+    pdf_files = [f for f in os.listdir(folder)
+                 if f.lower().endswith(".pdf") and f != OUTPUT_NAME and not fnmatch.fnmatch(f, MERGED_PATTERN)]
+    if not pdf_files:
+        print(f"❌ 目录下没有找到 PDF 文件: {folder}")
+        return
+
+    ordered = order_sources(pdf_files)
 
     print("📋 即将按以下顺序合并：")
     for idx, f in enumerate(ordered, 1):
         print(f"  {idx:2d}. {f}")
 
     output_path = os.path.join(folder, OUTPUT_NAME)
+    merger = IncrementalPdfMerger(folder, OUTPUT_NAME, dedupe_images=dedupe_images)
+    stats = merger.merge(ordered, full=full)
 
-    merger = PdfMerger()
-    try:
-        for f in ordered:
-            path = os.path.join(folder, f)
-            print(f"➕ 合并: {path}")
-            merger.append(path)
-
-        merger.write(output_path)
-        print(f"✅ 已生成合并文件: {output_path}")
-    finally:
-        merger.close()
+    if stats["images"] and stats["unique_images"] < stats["images"]:
+        # 不同文档中相同的图标、示意图只保存一份
+        print(f"🧩 图片去重: {stats['images']} 个图片对象 → {stats['unique_images']} 个，"
+              f"节省 {stats['bytes_saved'] / 1024 / 1024:.1f}MB")
+    mode = "完整重建" if stats["full_rebuild"] else "增量重建"
+    print(f"✅ 已生成合并文件: {output_path}（{mode}：解析 {stats['parsed']} 个，复用 {stats['reused']} 个，"
+          f"移除 {stats['removed']} 个，用时 {stats['seconds']} 秒）")
 
 
 def main() -> None:
-    if len(sys.argv) > 1:
-        folder = sys.argv[1]
+    parser = argparse.ArgumentParser(description="合并目录下的 PDF 文件")
+    parser.add_argument("folder", nargs="?", help="要合并 PDF 的目录")
+    parser.add_argument("--no-dedupe-images", action="store_true", help="不合并内容相同的图片对象")
+    parser.add_argument("--full", action="store_true", help="忽略缓存，重新解析所有文件")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.folder:
+        folder = args.folder
     else:
         folder = input(f"请输入要合并 PDF 的目录（默认: {DEFAULT_FOLDER}）: ").strip() or DEFAULT_FOLDER
 
-    merge_pdfs(folder)
+    with profile_run("merge", args.profile, args.profile_dir):
+        merge_pdfs(folder, dedupe_images=not args.no_dedupe_images, full=args.full)
 
 
 if __name__ == "__main__":
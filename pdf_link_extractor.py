@@ -8,32 +8,31 @@
 若不传参数，会提示输入路径，默认尝试 ../选调面试.pdf。
 """
 
+import argparse
 import os
-import sys
+import re
 
 from PyPDF2 import PdfReader
 
+from export_profiler import add_profile_arguments, profile_run
 from link_collector import FeishuLinkCollector
 
 
-def extract_feishu_links_from_pdf(pdf_path, output_file="feishu_links.txt"):
-    if not os.path.exists(pdf_path):
-        print(f"❌ PDF文件不存在: {pdf_path}")
-        return
+URL_PATTERN = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
 
-    print(f"📄 正在解析 PDF: {pdf_path}")
 
-    collector = FeishuLinkCollector(output_file=output_file)
-    collector.load_existing_links()
+def iter_pdf_links(source, include_text=True):
+    """
+    逐页提取PDF中的链接
 
-    try:
-        reader = PdfReader(pdf_path)
-    except Exception as e:
-        print(f"❌ 无法读取 PDF 文件: {e}")
-        return
+    Args:
+        source: PDF路径或已打开的 PdfReader
+        include_text (bool): 是否同时提取正文中的裸URL（需要提取文本，较慢）
 
-    added_from_annots = 0
-    added_from_text = 0
+    Yields:
+        tuple: (页码, 链接, 来源 'annotation' 或 'text')
+    """
+    reader = source if isinstance(source, PdfReader) else PdfReader(source)
 
     for page_index, page in enumerate(reader.pages):
         # 1）注释中的链接（常见的可点击链接）
@@ -41,45 +40,69 @@ def extract_feishu_links_from_pdf(pdf_path, output_file="feishu_links.txt"):
         if annots:
             for annot in annots:
                 try:
-                    obj = annot.get_object()
-                    action = obj.get("/A")
-                    if not action:
-                        continue
-                    uri = action.get("/URI")
-                    if not uri:
-                        continue
-                    if collector.add_link(uri):
-                        added_from_annots += 1
+                    action = annot.get_object().get("/A")
+                    uri = action.get("/URI") if action else None
                 except Exception:
                     continue
+                if uri:
+                    yield page_index, str(uri), 'annotation'
 
         # 2）文本中的裸 URL（作为补充）
+        if not include_text:
+            continue
         try:
             text = page.extract_text() or ""
         except Exception:
             text = ""
+        for url in URL_PATTERN.findall(text):
+            yield page_index, url, 'text'
+
+
+def extract_feishu_links_from_pdf(pdf_path, output_file="feishu_links.txt"):
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF文件不存在: {pdf_path}")
+        return
+
+    print(f"📄 正在解析 PDF: {pdf_path}")
+
+    collector = FeishuLinkCollector(output_file=output_file)
+    collector.load_existing_links()
 
-        if text.strip():
-            added_from_text += collector.add_links_from_text(text)
+    try:
+        links = list(iter_pdf_links(pdf_path))
+    except Exception as e:
+        print(f"❌ 无法读取 PDF 文件: {e}")
+        return
+
+    added = {'annotation': 0, 'text': 0}
+    for _, url, origin in links:
+        if collector.add_link(url):
+            added[origin] += 1
 
     collector.remove_duplicates()
     collector.save_links()
 
-    print(f"✅ 从 PDF 注释中新增链接: {added_from_annots}")
-    print(f"✅ 从 PDF 文本中新增链接: {added_from_text}")
+    print(f"✅ 从 PDF 注释中新增链接: {added['annotation']}")
+    print(f"✅ 从 PDF 文本中新增链接: {added['text']}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="PDF 飞书链接提取工具")
+    parser.add_argument("pdf_path", nargs="?", help="包含飞书链接的 PDF 文件路径")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
     print("🚀 PDF 飞书链接提取工具")
     print("=" * 40)
 
-    if len(sys.argv) > 1:
-        pdf_path = sys.argv[1]
+    if args.pdf_path:
+        pdf_path = args.pdf_path
     else:
         default_path = "../选调面试.pdf"
         pdf_path = input(f"请输入包含飞书链接的 PDF 文件路径（默认: {default_path}）: ").strip() or default_path
 
-    extract_feishu_links_from_pdf(pdf_path, output_file="feishu_links.txt")
+    with profile_run("extract", args.profile, args.profile_dir):
+        extract_feishu_links_from_pdf(pdf_path, output_file="feishu_links.txt")
 
 
 if __name__ == "__main__":
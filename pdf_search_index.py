@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出PDF全文检索
+并行提取下载目录中所有PDF的文本（PyPDF2），建立倒排索引，按关键词返回文档、页码和摘要。
+
+分词：中文按相邻两个字切分（二元组，单独的一个汉字保留为一个词），英文和数字按单词切分并转为小写。
+查询时所有词都要出现在同一页中；整句完全匹配的页面排在前面。
+
+索引保存在SQLite中（默认为下载目录下的 search_index.db）：
+    docs       每个PDF的路径、修改时间、大小和页数（用于增量更新）
+    postings   词 -> 文档中出现该词的页码和次数（差值+变长整数编码的倒排列表，按词聚集存储）
+    page_text  每页的文本（zlib压缩，用于生成摘要）
+再次运行 build 时只重新索引新增或修改过的PDF，并删除已不存在的PDF。
+
+用法：
+    python3 pdf_search_index.py build ./feishu_exports
+    python3 pdf_search_index.py search "面试 准备"
+"""
+
+import argparse
+import fnmatch
+import heapq
+import itertools
+import math
+import os
+import re
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from export_profiler import add_profile_arguments, profile_run
+
+DEFAULT_FOLDER = "./feishu_exports"
+INDEX_NAME = "search_index.db"
+
+# 合并文件与单个文档内容重复，默认不建立索引
+DEFAULT_EXCLUDE = ("*_合并.pdf",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    pages INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id);
+
+CREATE TABLE IF NOT EXISTS page_text (
+    doc_id INTEGER NOT NULL,
+    page_no INTEGER NOT NULL,
+    text BLOB NOT NULL,
+    PRIMARY KEY (doc_id, page_no)
+) WITHOUT ROWID;
+"""
+
+TOKEN_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9]+(?:[._'-][a-z0-9]+)*")
+
+
+def tokenize(text):
+    """把文本切分为检索词：中文二元组，英文/数字单词（小写）"""
+    tokens = []
+    for match in TOKEN_RE.finditer(text.lower()):
+        word = match.group()
+        if word[0].isascii():
+            tokens.append(word)
+        elif len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def encode_postings(entries):
+    """把 [(页码, 次数), ...]（页码递增）编码为差值+变长整数"""
+    data = bytearray()
+    previous = 0
+    for page_no, count in entries:
+        for value in (page_no - previous, count):
+            while value >= 0x80:
+                data.append((value & 0x7F) | 0x80)
+                value >>= 7
+            data.append(value)
+        previous = page_no
+    return bytes(data)
+
+
+def decode_postings(data):
+    """encode_postings 的逆操作"""
+    if max(data, default=0) < 0x80:
+        # 常见情况：页码差值和次数都小于128，每个数只占一个字节
+        values = list(data)
+    else:
+        values = []
+        value = shift = 0
+        for byte in data:
+            value |= (byte & 0x7F) << shift
+            if byte & 0x80:
+                shift += 7
+                continue
+            values.append(value)
+            value = shift = 0
+    return list(zip(itertools.accumulate(values[0::2]), values[1::2]))
+
+
+def extract_document(path):
+    """
+    提取一个PDF每页的文本并建立该文档的倒排列表（在工作进程中运行）
+
+    Returns:
+        tuple: (路径, 每页文本列表, {词: 编码后的倒排列表}, 错误信息)
+    """
+    from PyPDF2 import PdfReader
+
+    try:
+        reader = PdfReader(path)
+        texts = []
+        for page in reader.pages:
+            try:
+                texts.append(page.extract_text() or "")
+            except Exception:
+                texts.append("")
+    except Exception as e:
+        return path, [], {}, str(e)
+
+    postings = {}
+    for page_no, text in enumerate(texts):
+        counts = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            postings.setdefault(token, []).append((page_no, count))
+    return path, texts, {term: encode_postings(entries) for term, entries in postings.items()}, None
+
+
+def make_snippet(text, terms, phrase, width=40):
+    """取查询词第一次出现位置附近的文本，并用【】标出"""
+    flat = " ".join(text.split())
+    match = None
+    for target in [phrase] + terms:
+        # 英文词只匹配完整的单词
+        pattern = re.escape(target)
+        if target.isascii():
+            pattern = rf"(?<![a-z0-9]){pattern}(?![a-z0-9])"
+        match = re.search(pattern, flat, re.IGNORECASE)
+        if match:
+            break
+    if not match:
+        return flat[:width * 2]
+    start = max(0, match.start() - width)
+    end = min(len(flat), match.end() + width)
+    return ("..." if start else "") + flat[start:match.start()] + "【" + match.group() + "】" + \
+        flat[match.end():end] + ("..." if end < len(flat) else "")
+
+
+class PdfSearchIndex:
+    def __init__(self, db_path):
+        """
+        初始化全文索引
+
+        Args:
+            db_path (str): 索引数据库路径
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def scan(self, folder, exclude=DEFAULT_EXCLUDE):
+        """目录（含子目录）中需要建立索引的PDF：{路径: (修改时间, 大小)}"""
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(folder):
+            # 跳过资源库、浏览器缓存等隐藏目录
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            for name in filenames:
+                if not name.lower().endswith('.pdf') or any(fnmatch.fnmatch(name, pattern) for pattern in exclude):
+                    continue
+                path = os.path.abspath(os.path.join(dirpath, name))
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files[path] = (stat.st_mtime, stat.st_size)
+        return files
+
+    def update(self, folder, workers=None, exclude=DEFAULT_EXCLUDE):
+        """
+        增量更新索引：索引新增和修改过的PDF，删除已不存在的PDF
+
+        Args:
+            folder (str): PDF所在目录
+            workers (int): 并行提取文本的进程数（默认为CPU核数）
+            exclude (tuple): 不建立索引的文件名模式
+
+        Returns:
+            dict: 本次更新的统计
+        """
+        started = time.time()
+        files = self.scan(folder, exclude)
+        indexed = {path: (doc_id, mtime, size) for doc_id, path, mtime, size in
+                   self._conn.execute("SELECT doc_id, path, mtime, size_bytes FROM docs")}
+
+        changed = [path for path, (mtime, size) in files.items()
+                   if path not in indexed or indexed[path][1:] != (mtime, size)]
+        removed = [path for path in indexed if path not in files]
+        stats = {'added': 0, 'updated': 0, 'removed': len(removed), 'unchanged': len(files) - len(changed),
+                 'failed': [], 'pages': 0}
+
+        with self._conn:
+            for path in removed:
+                self._delete(indexed[path][0])
+
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and len(changed) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(changed))) as pool:
+                results = pool.map(extract_document, sorted(changed), chunksize=4)
+                self._store_results(results, files, indexed, stats)
+        else:
+            self._store_results(map(extract_document, sorted(changed)), files, indexed, stats)
+
+        stats['documents'] = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        stats['seconds'] = round(time.time() - started, 2)
+        return stats
+
+    def _store_results(self, results, files, indexed, stats):
+        for path, texts, postings, error in results:
+            if error:
+                stats['failed'].append({'path': path, 'error': error})
+                continue
+            with self._conn:
+                if path in indexed:
+                    self._delete(indexed[path][0])
+                    stats['updated'] += 1
+                else:
+                    stats['added'] += 1
+                mtime, size = files[path]
+                title = os.path.splitext(os.path.basename(path))[0]
+                doc_id = self._conn.execute(
+                    "INSERT INTO docs (path, title, mtime, size_bytes, pages, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, title, mtime, size, len(texts), time.time())).lastrowid
+                self._conn.executemany("INSERT INTO postings (term, doc_id, data) VALUES (?, ?, ?)",
+                                       ((term, doc_id, data) for term, data in postings.items()))
+                self._conn.executemany("INSERT INTO page_text (doc_id, page_no, text) VALUES (?, ?, ?)",
+                                       ((doc_id, page_no, zlib.compress(text.encode('utf-8')))
+                                        for page_no, text in enumerate(texts)))
+            stats['pages'] += len(texts)
+
+    def _delete(self, doc_id):
+        for table in ("postings", "page_text", "docs"):
+            self._conn.execute(f"DELETE FROM {table} WHERE doc_id = ?", (doc_id,))
+
+    def search(self, query, limit=20):
+        """
+        检索同时包含所有查询词的页面
+
+        Returns:
+            list: [{'path', 'title', 'page'（从1开始）, 'score', 'snippet'}, ...]，按相关度排序
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        # 每个词的倒排列表：{(文档, 页码): 次数}
+        lists = []
+        for term in terms:
+            hits = {}
+            for doc_id, data in self._conn.execute("SELECT doc_id, data FROM postings WHERE term = ?", (term,)):
+                for page_no, count in decode_postings(data):
+                    hits[(doc_id, page_no)] = count
+            if not hits:
+                return []
+            lists.append(hits)
+
+        # 从最短的列表开始求交集
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for hits in lists[1:]:
+            candidates &= hits.keys()
+            if not candidates:
+                return []
+
+        total_pages = self._conn.execute("SELECT COALESCE(SUM(pages), 0) FROM docs").fetchone()[0] or 1
+        weights = [math.log(1 + total_pages / len(hits)) for hits in lists]
+        scored = heapq.nlargest(max(limit * 5, 50),
+                                ((sum(weight * hits[key] for weight, hits in zip(weights, lists)), key)
+                                 for key in candidates))
+
+        # 整句完全匹配的页面优先；只为排名靠前的页面读取文本
+        phrase = " ".join(query.lower().split())
+        results = []
+        for score, (doc_id, page_no) in scored:
+            path, title = self._conn.execute("SELECT path, title FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+            row = self._conn.execute("SELECT text FROM page_text WHERE doc_id = ? AND page_no = ?",
+                                     (doc_id, page_no)).fetchone()
+            text = zlib.decompress(row[0]).decode('utf-8') if row else ""
+            exact = phrase in " ".join(text.lower().split())
+            results.append({
+                'path': path,
+                'title': title,
+                'page': page_no + 1,
+                'score': round(score * (2 if exact else 1), 3),
+                'snippet': make_snippet(text, terms, phrase),
+            })
+        results.sort(key=lambda result: -result['score'])
+        return results[:limit]
+
+    def close(self):
+        self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出PDF全文检索")
+    parser.add_argument("--db", help=f"索引数据库路径（默认: PDF目录/{INDEX_NAME}）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="建立或增量更新索引")
+    build.add_argument("folder", nargs="?", default=DEFAULT_FOLDER, help="PDF所在目录")
+    build.add_argument("--workers", type=int, help="并行提取文本的进程数（默认: CPU核数）")
+    add_profile_arguments(build)
+
+    search = subparsers.add_parser("search", help="检索关键词")
+    search.add_argument("query", help="查询内容（多个词之间用空格分隔）")
+    search.add_argument("--folder", default=DEFAULT_FOLDER, help="PDF所在目录（用于确定默认索引路径）")
+    search.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    index = PdfSearchIndex(args.db or os.path.join(args.folder, INDEX_NAME))
+    if args.command == "build":
+        with profile_run("index", args.profile, args.profile_dir):
+            stats = index.update(args.folder, workers=args.workers)
+        print(f"✅ 索引已更新: 新增 {stats['added']}，更新 {stats['updated']}，删除 {stats['removed']}，"
+              f"未变化 {stats['unchanged']}（共 {stats['documents']} 个文档，本次 {stats['pages']} 页，"
+              f"用时 {stats['seconds']} 秒）")
+        for failure in stats['failed']:
+            print(f"❌ 无法读取: {failure['path']}（{failure['error']}）")
+    else:
+        started = time.perf_counter()
+        results = index.search(args.query, limit=args.limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for i, result in enumerate(results, 1):
+            print(f"{i:2d}. {result['title']}  第{result['page']}页")
+            print(f"    {result['snippet']}")
+        print(f"🔍 找到 {len(results)} 个结果（{elapsed_ms:.1f} 毫秒）")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程导出进度汇总
+每个导出进程（可以在不同机器上）把进度事件发给同一个汇总服务，汇总服务在本地HTTP接口上
+以JSON提供总进度、速率、预计剩余时间、每个工作进程（及其标签页、流水线各阶段）的状态和最近的错误。
+
+发送端开销很小：publish() 只是把一个元组追加到队列（不加锁、不做IO），
+后台线程每隔一段时间把积累的事件打包成UDP数据报发出（发送失败直接丢弃，不影响导出）。
+每个数据报带有序号，汇总服务据此统计丢失的批次；还带有该进程累计的文档数和成功/失败数，
+汇总服务直接以最新的累计值覆盖，丢失的数据报不会让总进度永久偏少。
+
+用法：
+    python3 progress_hub.py serve --port 8766 --status-port 8767   # 启动汇总服务
+    python3 progress_hub.py status --url http://127.0.0.1:8767     # 查看汇总进度
+导出时指定汇总服务地址（progress_hub="127.0.0.1:8766"，或 feishu_cli.py export --progress-hub 127.0.0.1:8766）。
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urllib_request
+
+from work_queue import default_worker_id
+
+DEFAULT_EVENT_PORT = 8766
+DEFAULT_STATUS_PORT = 8767
+
+# 单个数据报的最大长度（字节），超出时分成多个数据报发送
+MAX_DATAGRAM_BYTES = 8192
+
+# 超过该时间（秒）没有收到某个工作进程的消息时，将其标记为失联
+STALE_AFTER = 30
+
+
+def parse_address(address):
+    """把 "host:port" 解析为 (host, port)"""
+    host, _, port = address.rpartition(':')
+    return host or "127.0.0.1", int(port)
+
+
+class ProgressPublisher:
+    def __init__(self, address, worker_id=None, flush_interval=0.5, heartbeat_interval=5):
+        """
+        初始化进度发送端
+
+        Args:
+            address (str): 汇总服务的事件地址 "host:port"
+            worker_id (str): 工作进程标识，默认为 主机名:进程号
+            flush_interval (float): 批量发送事件的间隔（秒）
+            heartbeat_interval (float): 没有事件时发送心跳的间隔（秒）
+        """
+        self.address = parse_address(address)
+        self.worker_id = worker_id or default_worker_id()
+        self.flush_interval = flush_interval
+        self.heartbeat_interval = heartbeat_interval
+
+        self._events = deque()
+        self._counters = None
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self._seq = 0
+        self._last_sent = 0.0
+        self.sent_batches = 0
+        self.send_errors = 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def publish(self, event, *fields):
+        """记录一个进度事件（只追加到内存队列，由后台线程发送）"""
+        self._events.append((event, time.time()) + fields)
+
+    def set_counters(self, total, succeeded, failed):
+        """更新本进程的累计文档数和成功/失败数（随之后的每个数据报一起发送）"""
+        self._counters = {'total': total, 'processed': succeeded + failed, 'succeeded': succeeded, 'failed': failed}
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """把积累的事件打包发送；没有事件时按间隔发送心跳"""
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        if not events and time.time() - self._last_sent < self.heartbeat_interval:
+            return
+
+        batch = []
+        for event in events:
+            batch.append(event)
+            if len(batch) >= 50:
+                self._send(batch)
+                batch = []
+        if batch or not events:
+            self._send(batch)
+
+    def _send(self, events):
+        self._seq += 1
+        message = {'w': self.worker_id, 's': self._seq, 'e': events}
+        if self._counters is not None:
+            message['c'] = self._counters
+        payload = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(payload) > MAX_DATAGRAM_BYTES and len(events) > 1:
+            self._seq -= 1
+            half = len(events) // 2
+            self._send(events[:half])
+            self._send(events[half:])
+            return
+        try:
+            self._sock.sendto(payload, self.address)
+            self.sent_batches += 1
+        except OSError:
+            self.send_errors += 1
+        self._last_sent = time.time()
+
+    def close(self):
+        """发送剩余事件并停止后台线程"""
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.flush()
+        self._sock.close()
+
+
+class ProgressAggregator:
+    def __init__(self, host="0.0.0.0", port=DEFAULT_EVENT_PORT, status_port=DEFAULT_STATUS_PORT,
+                 expected_total=None, max_errors=50):
+        """
+        初始化进度汇总服务
+
+        Args:
+            host (str): 监听地址
+            port (int): 接收进度事件的UDP端口（0表示随机端口）
+            status_port (int): 提供 /status 的HTTP端口（0表示随机端口）
+            expected_total (int): 全部文档数；不提供时为各工作进程报告的文档数之和
+            max_errors (int): 保留的最近错误数量
+        """
+        self.expected_total = expected_total
+        self.workers = {}
+        self.errors = deque(maxlen=max_errors)
+        self.completions = deque()
+        self.started_at = time.time()
+        self.received_batches = 0
+        self._lock = threading.Lock()
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((host, port))
+        self._sock.settimeout(0.5)
+        self._stop = threading.Event()
+
+        self.httpd = ThreadingHTTPServer((host, status_port), self._make_handler(self))
+        self.httpd.daemon_threads = True
+        self._threads = []
+
+    @property
+    def event_address(self):
+        host, port = self._sock.getsockname()[:2]
+        return f"{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+    def _receive_loop(self):
+        while not self._stop.is_set():
+            try:
+                data, _ = self._sock.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                message = json.loads(data)
+                self.apply(message['w'], message['s'], message['e'], message.get('c'))
+            except (KeyError, ValueError, TypeError):
+                continue
+
+    def apply(self, worker_id, seq, events, counters=None):
+        """
+        应用一个工作进程发来的一批事件
+
+        Args:
+            worker_id (str): 工作进程标识
+            seq (int): 数据报序号
+            events (list): 事件列表
+            counters (dict): 该进程发送时的累计值 {'total', 'processed', 'succeeded', 'failed'}，
+                             覆盖之前收到的值（比这批更新的数据报已经到达时忽略）
+        """
+        now = time.time()
+        with self._lock:
+            self.received_batches += 1
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                worker = self.workers[worker_id] = {
+                    'state': 'running', 'total': 0, 'succeeded': 0, 'failed': 0,
+                    'current': '', 'note': '', 'tabs': {}, 'stages': None, 'started_at': now,
+                    'last_seen': now, 'last_seq': 0, 'lost_batches': 0,
+                }
+            if seq > worker['last_seq'] + 1:
+                worker['lost_batches'] += seq - worker['last_seq'] - 1
+            if counters and seq > worker['last_seq']:
+                # 速率按累计完成数的增量计算，丢失的数据报中的完成数在下一个数据报中补上
+                completed = counters['processed'] - worker['succeeded'] - worker['failed']
+                self.completions.extend([now] * max(0, completed))  # 按接收时间计算，不受各机器时钟偏差影响
+                worker.update(total=counters['total'], succeeded=counters['succeeded'], failed=counters['failed'])
+            worker['last_seq'] = max(worker['last_seq'], seq)
+            worker['last_seen'] = now
+
+            for event in events:
+                kind, timestamp, fields = event[0], event[1], event[2:]
+                if kind == 'start':
+                    worker.update(state='running', started_at=timestamp)
+                elif kind == 'current':
+                    worker['current'], worker['note'] = fields
+                elif kind == 'tab':
+                    tab_id, status, url = fields
+                    worker['tabs'][str(tab_id)] = {'status': status, 'url': url, 'since': timestamp}
+                elif kind == 'doc':
+                    # 成功/失败数以累计值为准，这里只记录当前文档和错误
+                    url, success, error = fields
+                    worker['current'] = url
+                    if not success:
+                        self.errors.append({'time': timestamp, 'worker': worker_id, 'url': url, 'error': error})
+                elif kind == 'stages':
+                    worker['stages'] = fields[0]
+                elif kind == 'finish':
+                    worker['state'] = 'finished'
+
+    def _rate(self, window, now):
+        """最近 window 秒内的完成速率（文档/分钟）"""
+        recent = sum(1 for timestamp in self.completions if timestamp >= now - window)
+        return round(recent * 60 / window, 2)
+
+    def snapshot(self):
+        """当前汇总状态"""
+        now = time.time()
+        with self._lock:
+            while self.completions and self.completions[0] < now - 900:
+                self.completions.popleft()
+
+            workers = {}
+            for worker_id, worker in self.workers.items():
+                state = worker['state']
+                if state == 'running' and now - worker['last_seen'] > STALE_AFTER:
+                    state = 'stale'
+                workers[worker_id] = {
+                    'state': state,
+                    'total': worker['total'],
+                    'succeeded': worker['succeeded'],
+                    'failed': worker['failed'],
+                    'current': worker['current'],
+                    'note': worker['note'],
+                    'tabs': {tab_id: dict(tab, seconds=round(now - tab['since'], 1))
+                             for tab_id, tab in worker['tabs'].items()},
+                    'pipeline_stages': worker['stages'],
+                    'seconds_since_seen': round(now - worker['last_seen'], 1),
+                    'lost_batches': worker['lost_batches'],
+                }
+
+            succeeded = sum(worker['succeeded'] for worker in self.workers.values())
+            failed = sum(worker['failed'] for worker in self.workers.values())
+            total = self.expected_total or sum(worker['total'] for worker in self.workers.values())
+            rate_5m = self._rate(300, now)
+            remaining = max(0, total - succeeded - failed)
+            return {
+                'totals': {
+                    'total': total,
+                    'succeeded': succeeded,
+                    'failed': failed,
+                    'remaining': remaining,
+                    'percent': round((succeeded + failed) * 100 / total, 1) if total else 0.0,
+                },
+                'rates': {
+                    'docs_per_min_1m': self._rate(60, now),
+                    'docs_per_min_5m': rate_5m,
+                    'eta_seconds': round(remaining * 60 / rate_5m) if rate_5m else None,
+                },
+                'workers': workers,
+                'recent_errors': list(self.errors)[::-1],
+                'received_batches': self.received_batches,
+                'uptime_seconds': round(now - self.started_at, 1),
+            }
+
+    @staticmethod
+    def _make_handler(aggregator):
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, status, data):
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == '/status':
+                    self._send_json(200, aggregator.snapshot())
+                else:
+                    self._send_json(404, {'error': 'not found'})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """在后台线程中接收事件并提供 /status"""
+        for target in (self._receive_loop, self.httpd.serve_forever):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程导出进度汇总")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve", help="启动进度汇总服务")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=DEFAULT_EVENT_PORT, help="接收进度事件的UDP端口")
+    serve.add_argument("--status-port", type=int, default=DEFAULT_STATUS_PORT, help="提供 /status 的HTTP端口")
+    serve.add_argument("--total", type=int, help="全部文档数（默认为各工作进程报告的文档数之和）")
+
+    status = subparsers.add_parser("status", help="查看汇总进度")
+    status.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_STATUS_PORT}", help="汇总服务地址")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        aggregator = ProgressAggregator(args.host, args.port, args.status_port, expected_total=args.total)
+        aggregator.start()
+        print(f"🚀 进度汇总服务已启动: 事件 udp://{aggregator.event_address}，状态 {aggregator.url}/status")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            aggregator.stop()
+            print("\n👋 汇总服务已停止")
+    else:
+        with urllib_request.urlopen(args.url.rstrip('/') + '/status', timeout=10) as response:
+            print(json.dumps(json.loads(response.read()), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
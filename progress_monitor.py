@@ -11,20 +11,29 @@ import os
 from datetime import datetime
 
 class ProgressMonitor:
-    def __init__(self, log_file="export_log.json"):
+    def __init__(self, log_file="export_log.json", state_store=None, publisher=None):
         """
         初始化进度监控器
         
         Args:
             log_file (str): 日志文件路径
+            state_store (ExportStateStore): 导出状态库；提供时日志文件从状态库导出
+            publisher (ProgressPublisher): 进度发送端；提供时同时把进度事件发给汇总服务
         """
         self.log_file = log_file
+        self.state_store = state_store
+        # 当前运行在状态库中的id，日志只导出该次运行的记录
+        self.run_id = None
+        self.publisher = publisher
         self.start_time = None
         self.total_docs = 0
         self.processed_docs = 0
         self.failed_docs = 0
         self.current_doc = ""
         self.errors = []
+        self.tab_status = {}
+        self.pipeline_status = None
+        self._pipeline_signature = None
         
         # 加载之前的日志（如果存在）
         self.load_log()
@@ -47,15 +56,52 @@ class ProgressMonitor:
         self.processed_docs = 0
         self.failed_docs = 0
         self.current_doc = ""
+        if self.publisher:
+            self.publisher.publish('start', total_docs)
+            self.publisher.set_counters(total_docs, 0, 0)
         
         print(f"\n🚀 开始批量导出 {total_docs} 个文档")
         print("=" * 60)
         print(f"⏰ 开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("=" * 60)
     
+    def add_documents(self, count):
+        """导出过程中新增的文档（如链接闭包发现的文档）计入总数"""
+        self.total_docs += count
+        if self.publisher:
+            self.publisher.set_counters(self.total_docs, self.processed_docs, self.failed_docs)
+    
+    def set_current(self, doc_url, note=""):
+        """设置当前正在处理的文档（不计入成功/失败统计）"""
+        self.current_doc = doc_url
+        if self.publisher:
+            self.publisher.publish('current', doc_url, note)
+        if note:
+            print(f"📝 {note} {doc_url[:50]}")
+    
+    def update_tab_status(self, tab_id, status, doc_url=""):
+        """更新多标签页模式下某个标签页的状态（在下次刷新进度时显示）"""
+        self.tab_status[tab_id] = {
+            'status': status,
+            'url': doc_url,
+            'since': time.time()
+        }
+        if self.publisher:
+            self.publisher.publish('tab', tab_id, status, doc_url)
+    
+    def update_pipeline_status(self, stages):
+        """更新流水线各阶段的忙碌数和队列深度（在下次刷新进度时显示）"""
+        self.pipeline_status = stages
+        signature = tuple((stage['busy'], stage['queued']) for stage in stages)
+        if self.publisher and signature != self._pipeline_signature:
+            self.publisher.publish('stages', stages)
+        self._pipeline_signature = signature
+    
     def update_progress(self, doc_url, success=True, error_msg=""):
         """更新进度"""
         self.current_doc = doc_url
+        if self.publisher:
+            self.publisher.publish('doc', doc_url, success, error_msg)
         
         if success:
             self.processed_docs += 1
@@ -72,15 +118,19 @@ class ProgressMonitor:
             }
             self.errors.append(error_info)
         
+        if self.publisher:
+            self.publisher.set_counters(self.total_docs, self.processed_docs, self.failed_docs)
+        
         # 计算进度
         total_processed = self.processed_docs + self.failed_docs
-        progress_percent = (total_processed / self.total_docs) * 100
+        # 共享队列中总数按启动时的队列状态估计，可能为0或少于本进程实际处理的数量
+        progress_percent = min(100.0, total_processed / self.total_docs * 100) if self.total_docs else 0.0
         
         # 计算预估剩余时间
         if self.start_time and total_processed > 0:
             elapsed_time = time.time() - self.start_time
             avg_time_per_doc = elapsed_time / total_processed
-            remaining_docs = self.total_docs - total_processed
+            remaining_docs = max(0, self.total_docs - total_processed)
             eta_seconds = remaining_docs * avg_time_per_doc
             eta = f"{int(eta_seconds // 60)}分{int(eta_seconds % 60)}秒"
         else:
@@ -102,6 +152,17 @@ class ProgressMonitor:
         print(f"⏱️  预计剩余时间: {eta}")
         print(f"📝 当前文档: {doc_url[:50]}...")
         
+        # 多标签页模式下显示每个标签页的状态
+        for tab_id in sorted(self.tab_status):
+            info = self.tab_status[tab_id]
+            elapsed = int(time.time() - info['since'])
+            print(f"   🗂️  标签页{tab_id}: {info['status']} ({elapsed}秒) {info['url'][:50]}")
+        
+        # 流水线模式下显示各阶段的忙碌数和队列深度，队列持续积压的下游阶段即为瓶颈
+        if self.pipeline_status:
+            from export_pipeline import format_pipeline_status
+            print(f"🏭 流水线: {format_pipeline_status(self.pipeline_status)}")
+        
         if not success and error_msg:
             print(f"⚠️  错误信息: {error_msg}")
         
@@ -109,6 +170,8 @@ class ProgressMonitor:
     
     def finish_export(self):
         """完成导出"""
+        if self.publisher:
+            self.publisher.publish('finish')
         if self.start_time:
             total_time = time.time() - self.start_time
             hours = int(total_time // 3600)
@@ -133,6 +196,14 @@ class ProgressMonitor:
     
     def save_log(self):
         """保存日志"""
+        if self.state_store:
+            try:
+                self.state_store.export_log(self.log_file, self.run_id)
+                print(f"📋 日志已保存到: {self.log_file}")
+            except Exception as e:
+                print(f"❌ 保存日志失败: {e}")
+            return
+        
         log_data = {
             'export_time': datetime.now().isoformat(),
             'total_docs': self.total_docs,
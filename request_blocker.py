@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出时的网络请求拦截
+通过Chrome DevTools协议（CDP）屏蔽埋点上报、音视频、头像和第三方脚本等
+对打印出的PDF没有影响的请求。屏蔽本身不需要performance日志；
+拦截的请求数和流量统计需要读取performance日志，只在开启性能剖析（--profile）时收集。
+
+屏蔽规则可以写在JSON文件中：
+{
+    "url_patterns": ["*://mcs.zijieapi.com/*", "*/avatar/*"],
+    "resource_types": ["Media"]
+}
+url_patterns 使用CDP的通配符语法（* 匹配任意字符，规则需匹配整个URL）；
+resource_types 会被转换为对应文件扩展名的URL规则（CDP的屏蔽接口只支持按URL匹配），
+扩展名只匹配路径末尾（其后可以跟查询参数），不会误伤路径或域名中包含同样字符的文档内容。
+"""
+
+import json
+import os
+import re
+
+# 默认屏蔽规则：只屏蔽不影响文档正文渲染的请求
+DEFAULT_URL_PATTERNS = [
+    # 飞书/字节系埋点与性能监控上报
+    "*://mcs.zijieapi.com/*",
+    "*://mon.zijieapi.com/*",
+    "*://*.snssdk.com/*",
+    "*slardar*",
+    # 用户头像（只匹配 avatar 路径段，文件名或文档标题中含 avatar 的内容不受影响）
+    "*/avatar/*",
+    # 第三方统计与广告脚本
+    "*://*.google-analytics.com/*",
+    "*://*.googletagmanager.com/*",
+    "*://*.doubleclick.net/*",
+]
+
+DEFAULT_RESOURCE_TYPES = ["Media"]
+
+# 资源类型对应的URL规则
+RESOURCE_TYPE_EXTENSIONS = {
+    "Media": ["mp4", "webm", "m3u8", "mov", "mp3", "m4a", "ogg"],
+    "Image": ["png", "jpg", "jpeg", "gif", "webp", "svg"],
+    "Font": ["woff", "woff2", "ttf", "otf"],
+    "Stylesheet": ["css"],
+    "Script": ["js"],
+}
+RESOURCE_TYPE_PATTERNS = {
+    resource_type: [pattern for extension in extensions for pattern in (f"*.{extension}", f"*.{extension}?*")]
+    for resource_type, extensions in RESOURCE_TYPE_EXTENSIONS.items()
+}
+
+# 被屏蔽的请求没有实际传输，无法测量节省的流量，只能按资源类型的典型大小估算（字节）
+ESTIMATED_BYTES = {
+    "Media": 2 * 1024 * 1024,
+    "Image": 40 * 1024,
+    "Font": 60 * 1024,
+    "Script": 80 * 1024,
+    "Stylesheet": 20 * 1024,
+    "XHR": 2 * 1024,
+    "Fetch": 2 * 1024,
+    "Ping": 512,
+    "Other": 4 * 1024,
+}
+
+
+def wildcard_regex(pattern):
+    """CDP屏蔽规则（* 匹配任意字符）转换为正则表达式"""
+    return re.compile(".*".join(re.escape(part) for part in pattern.split("*")))
+
+
+class RequestBlocker:
+    def __init__(self, url_patterns=None, resource_types=None):
+        """
+        初始化请求拦截器
+
+        Args:
+            url_patterns (list): 要屏蔽的URL通配符规则，默认使用DEFAULT_URL_PATTERNS
+            resource_types (list): 要屏蔽的资源类型（Media/Image/Font/Stylesheet/Script）
+        """
+        self.url_patterns = list(DEFAULT_URL_PATTERNS if url_patterns is None else url_patterns)
+        self.resource_types = list(DEFAULT_RESOURCE_TYPES if resource_types is None else resource_types)
+
+        # 本次运行的统计
+        self.blocked_requests = 0
+        self.blocked_by_type = {}
+        self.estimated_bytes_saved = 0
+        self.transferred_bytes = 0
+        self._request_types = {}
+
+    @classmethod
+    def from_file(cls, path):
+        """从JSON文件加载屏蔽规则，文件不存在时使用默认规则"""
+        if not path or not os.path.exists(path):
+            return cls()
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            print(f"🚫 已加载请求屏蔽规则: {path}")
+            return cls(config.get('url_patterns'), config.get('resource_types'))
+        except Exception as e:
+            print(f"❌ 加载请求屏蔽规则失败，使用默认规则: {e}")
+            return cls()
+
+    def blocked_patterns(self):
+        """合并URL规则与资源类型规则"""
+        patterns = list(self.url_patterns)
+        for resource_type in self.resource_types:
+            patterns.extend(RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+        return patterns
+
+    def blocks(self, url):
+        """按CDP的通配符语义判断一个URL是否会被屏蔽"""
+        return any(wildcard_regex(pattern).fullmatch(url) for pattern in self.blocked_patterns())
+
+    def apply(self, driver):
+        """
+        在当前标签页上启用请求屏蔽
+
+        CDP的屏蔽设置作用于单个标签页，多标签页模式下每个新标签页都需要调用一次。
+        """
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocked_patterns()})
+            return True
+        except Exception as e:
+            print(f"⚠️  启用请求屏蔽失败: {e}")
+            return False
+
+    def collect(self, driver, entries=None):
+        """
+        读取浏览器的performance日志，累计被屏蔽的请求和实际传输的流量（只在开启性能剖析时调用）
+
+        需要以 goog:loggingPrefs = {'performance': 'ALL'} 启动浏览器；
+        日志读取后即被清空，应在每个文档处理完后调用。
+        已由调用方读取日志时（如同时用于性能剖析），通过 entries 传入。
+        """
+        if entries is None:
+            try:
+                entries = driver.get_log('performance')
+            except Exception:
+                return
+
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+
+            method = message.get('method')
+            params = message.get('params', {})
+
+            if method == 'Network.requestWillBeSent':
+                self._request_types[params.get('requestId')] = params.get('type', 'Other')
+            elif method == 'Network.loadingFinished':
+                self.transferred_bytes += int(params.get('encodedDataLength', 0))
+                self._request_types.pop(params.get('requestId'), None)
+            elif method == 'Network.loadingFailed':
+                resource_type = params.get('type') or self._request_types.get(params.get('requestId'), 'Other')
+                self._request_types.pop(params.get('requestId'), None)
+                if not params.get('blockedReason'):
+                    continue
+                self.blocked_requests += 1
+                self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+                self.estimated_bytes_saved += ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES['Other'])
+
+    def get_stats(self):
+        """本次运行的拦截统计"""
+        return {
+            'blocked_requests': self.blocked_requests,
+            'blocked_by_type': dict(self.blocked_by_type),
+            'estimated_bytes_saved': self.estimated_bytes_saved,
+            'transferred_bytes': self.transferred_bytes,
+        }
+
+    def print_summary(self):
+        """打印拦截统计"""
+        saved_mb = self.estimated_bytes_saved / (1024 * 1024)
+        transferred_mb = self.transferred_bytes / (1024 * 1024)
+        print(f"🚫 已屏蔽请求: {self.blocked_requests} 个（按典型大小估算节省约 {saved_mb:.1f}MB，"
+              f"实测传输 {transferred_mb:.1f}MB）")
+        for resource_type, count in sorted(self.blocked_by_type.items(), key=lambda item: -item[1]):
+            print(f"   {resource_type}: {count}")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按历史耗时排程（缩短总用时）
+按文件顺序处理时，几个特别大的文档排在最后，会让其他工作进程/标签页空等。
+这里先用状态库中的历史记录估计每个文档的耗时，再按“最长优先”（LPT）排序，
+多个工作进程同时从队列头部领取时，总用时接近理论下限 max(总耗时/进程数, 最长文档)。
+
+耗时估计的优先级：
+1. 该文档（按规范化URL）最近几次成功导出耗时的中位数
+2. 该文档上次输出文件的大小 × 历史上的每MB耗时
+3. 同类型文档（wiki/docx/sheets...）历史耗时的中位数
+4. 按文档类型的默认值
+
+用法：
+    python3 scheduler.py plan feishu_links.txt --workers 4
+    python3 scheduler.py plan feishu_links.txt --workers 4 --output shard.txt --split   # 每个进程一个链接文件
+"""
+
+import argparse
+import heapq
+import statistics
+
+from export_state import DB_NAME, DEFAULT_DOWNLOAD_DIR, ExportStateStore, default_db_path, doc_type_of
+from link_collector import canonical_feishu_url
+
+# 没有任何历史记录时各类文档的默认耗时（秒）
+DEFAULT_TYPE_COSTS = {
+    'sheets': 40,
+    'base': 45,
+    'wiki': 25,
+    'docx': 20,
+    'docs': 20,
+    'doc': 20,
+    'other': 25,
+}
+
+# 同类型历史样本少于该数量时使用默认值
+MIN_TYPE_SAMPLES = 3
+
+
+class CostModel:
+    def __init__(self, state_store=None):
+        """
+        初始化耗时模型
+
+        Args:
+            state_store (ExportStateStore): 导出状态库（为 None 时只使用默认值）
+        """
+        self.state = state_store
+        self.type_costs = dict(DEFAULT_TYPE_COSTS)
+        self.learned_types = set()
+        self.seconds_per_mb = None
+        self.base_seconds = 0.0
+        self.sources = {}
+        if state_store is not None:
+            self._learn(state_store.recent_costs())
+
+    def _learn(self, samples):
+        """从最近的成功记录中学习同类型文档耗时，以及耗时与输出大小的线性关系"""
+        by_type = {}
+        for doc_type, duration, _ in samples:
+            by_type.setdefault(doc_type, []).append(duration)
+        for doc_type, durations in by_type.items():
+            if len(durations) >= MIN_TYPE_SAMPLES:
+                self.type_costs[doc_type] = statistics.median(durations)
+                self.learned_types.add(doc_type)
+
+        pairs = [(size / 1024 / 1024, duration) for _, duration, size in samples if size]
+        if len(pairs) >= MIN_TYPE_SAMPLES:
+            sizes = [size for size, _ in pairs]
+            durations = [duration for _, duration in pairs]
+            mean_size = statistics.fmean(sizes)
+            mean_duration = statistics.fmean(durations)
+            variance = sum((size - mean_size) ** 2 for size in sizes)
+            if variance > 0:
+                slope = sum((size - mean_size) * (duration - mean_duration) for size, duration in pairs) / variance
+                if slope > 0:
+                    self.seconds_per_mb = slope
+                    self.base_seconds = max(0.0, mean_duration - slope * mean_size)
+
+    def estimate(self, urls):
+        """
+        估计每个链接的导出耗时
+
+        Returns:
+            dict: {url: 秒}；self.sources 记录每个估计的来源（history/size/type/default）
+        """
+        canonical = {url: canonical_feishu_url(url) for url in urls}
+        history = self.state.document_costs(set(canonical.values())) if self.state is not None else {}
+
+        estimates = {}
+        for url in urls:
+            record = history.get(canonical[url])
+            doc_type = doc_type_of(url)
+            if record and record['durations']:
+                estimates[url] = statistics.median(record['durations'])
+                self.sources[url] = 'history'
+            elif record and record['size_bytes'] and self.seconds_per_mb:
+                estimates[url] = self.base_seconds + self.seconds_per_mb * record['size_bytes'] / 1024 / 1024
+                self.sources[url] = 'size'
+            else:
+                estimates[url] = self.type_costs.get(doc_type, DEFAULT_TYPE_COSTS['other'])
+                self.sources[url] = 'type' if doc_type in self.learned_types else 'default'
+        return estimates
+
+
+def longest_first(urls, estimates):
+    """按估计耗时从长到短排序（耗时相同时保持原顺序）"""
+    return sorted(urls, key=lambda url: -estimates[url])
+
+
+def pack(urls, estimates, workers):
+    """
+    LPT装箱：按耗时从长到短，每个文档分给当前负载最小的工作进程
+
+    Returns:
+        list: 每个工作进程分到的链接列表
+    """
+    workers = max(1, workers)
+    heap = [(0.0, index) for index in range(workers)]
+    assignments = [[] for _ in range(workers)]
+    for url in longest_first(urls, estimates):
+        load, index = heapq.heappop(heap)
+        assignments[index].append(url)
+        heapq.heappush(heap, (load + estimates[url], index))
+    return assignments
+
+
+class MakespanScheduler:
+    def __init__(self, state_store=None, workers=1):
+        """
+        初始化排程器
+
+        Args:
+            state_store (ExportStateStore): 导出状态库
+            workers (int): 并行处理的工作进程/标签页数量
+        """
+        self.model = CostModel(state_store)
+        self.workers = max(1, workers)
+        self.estimates = {}
+        self.plan_stats = None
+
+    def plan(self, urls):
+        """
+        按最长优先排序链接，并估计总用时
+
+        Returns:
+            list: 排序后的链接（多个工作进程从头部依次领取即为LPT调度）
+        """
+        estimates = self.estimates = self.model.estimate(urls)
+        ordered = longest_first(urls, estimates)
+        loads = [sum(estimates[url] for url in group) for group in pack(urls, estimates, self.workers)]
+        total = sum(estimates.values())
+        sources = {}
+        for url in urls:
+            sources[self.model.sources[url]] = sources.get(self.model.sources[url], 0) + 1
+
+        self.plan_stats = {
+            'strategy': 'longest_first',
+            'workers': self.workers,
+            'documents': len(urls),
+            'estimated_total_s': round(total, 1),
+            'estimated_makespan_s': round(max(loads) if loads else 0.0, 1),
+            'lower_bound_s': round(max(total / self.workers, max(estimates.values(), default=0.0)), 1),
+            'file_order_makespan_s': round(self.simulate(urls, estimates), 1),
+            'estimate_sources': sources,
+        }
+        return ordered
+
+    def simulate(self, ordered, estimates):
+        """按给定顺序由空闲的工作进程依次领取时的总用时"""
+        heap = [0.0] * self.workers
+        for url in ordered:
+            heapq.heappush(heap, heapq.heappop(heap) + estimates[url])
+        return max(heap) if ordered else 0.0
+
+    def report(self, actual_seconds):
+        """估计与实际总用时的对比"""
+        if not self.plan_stats:
+            return None
+        stats = dict(self.plan_stats)
+        stats['actual_makespan_s'] = round(actual_seconds, 1)
+        estimated = stats['estimated_makespan_s']
+        stats['actual_vs_estimate'] = round(actual_seconds / estimated, 2) if estimated else None
+        return stats
+
+    def print_plan(self):
+        stats = self.plan_stats
+        print(f"🗓️  排程: {stats['documents']} 个文档，{stats['workers']} 路并行，"
+              f"预计总用时 {stats['estimated_makespan_s'] / 60:.1f} 分钟"
+              f"（按文件顺序 {stats['file_order_makespan_s'] / 60:.1f} 分钟，理论下限 {stats['lower_bound_s'] / 60:.1f} 分钟）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按历史耗时排程")
+    parser.add_argument("--db", help=f"状态库路径（默认: 下载目录/{DB_NAME}）")
+    parser.add_argument("--download-dir", default=DEFAULT_DOWNLOAD_DIR, help="下载目录")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    plan = subparsers.add_parser("plan", help="估计每个文档的耗时并给出最长优先的顺序")
+    plan.add_argument("links_file", nargs="?", default="feishu_links.txt")
+    plan.add_argument("--workers", type=int, default=1)
+    plan.add_argument("--output", help="把排序后的链接写入该文件")
+    plan.add_argument("--split", action="store_true",
+                      help="按LPT装箱拆分为每个工作进程一个文件（<output>.1 ...），用于不共享队列的多个导出进程")
+    args = parser.parse_args()
+
+    with open(args.links_file, 'r', encoding='utf-8') as f:
+        links = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+    scheduler = MakespanScheduler(ExportStateStore(args.db or default_db_path(args.download_dir)), workers=args.workers)
+    ordered = scheduler.plan(links)
+    for url in ordered:
+        print(f"{scheduler.estimates[url]:7.1f}秒  {scheduler.model.sources[url]:8s} {url}")
+    scheduler.print_plan()
+
+    if args.output:
+        groups = pack(links, scheduler.estimates, args.workers) if args.split else [ordered]
+        for index, group in enumerate(groups, 1):
+            path = f"{args.output}.{index}" if args.split else args.output
+            with open(path, 'w', encoding='utf-8') as f:
+                for url in group:
+                    f.write(url + '\n')
+            print(f"💾 已保存到: {path}（{len(group)} 个链接，"
+                  f"预计 {sum(scheduler.estimates[url] for url in group) / 60:.1f} 分钟）")
+
+
+if __name__ == "__main__":
+    main()
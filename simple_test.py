@@ -1,20 +1,23 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-简化版飞书导出测试 - 不依赖外部库
-仅测试链接访问和页面结构分析
+简化版飞书导出测试 - 仅依赖aiohttp，无需浏览器
+通过链接预检真实访问每个链接，分析可访问性和文档类型
 """
 
-import time
 import os
 import json
 from datetime import datetime
 
+from link_preflight import LinkPreflightChecker, STATUS_LABELS, STATUS_REACHABLE, STATUS_REDIRECT
+from export_state import ExportStateStore
+
 class SimpleFeishuTest:
     def __init__(self):
         self.processed_links = []
         self.failed_links = []
         self.test_results = []
+        self.preflight_results = {}
     
     def load_links(self):
         """加载链接"""
@@ -27,20 +30,34 @@ class SimpleFeishuTest:
             return []
     
     def test_link_access(self, url):
-        """测试链接访问（模拟）"""
+        """根据预检结果分析链接的可访问性"""
         print(f"🔍 测试访问: {url}")
         
-        # 模拟页面访问分析
+        preflight = self.preflight_results.get(url, {})
+        status = preflight.get('status')
+        accessible = status in (STATUS_REACHABLE, STATUS_REDIRECT)
+        
         test_result = {
             'url': url,
             'timestamp': datetime.now().isoformat(),
-            'accessible': True,
+            'accessible': accessible,
+            'preflight_status': status,
+            'http_status': preflight.get('http_status'),
+            'final_url': preflight.get('final_url', url),
+            'elapsed_ms': preflight.get('elapsed_ms'),
             'doc_type': 'wiki' if '/wiki/' in url else 'docx',
             'domain': url.split('/')[2] if len(url.split('/')) > 2 else 'unknown',
-            'export_feasible': True,
+            'export_feasible': accessible,
             'notes': []
         }
         
+        # 访问结果
+        test_result['notes'].append(STATUS_LABELS.get(status, '⚠️ 未检查'))
+        if status == STATUS_REDIRECT:
+            test_result['notes'].append(f'↪️ 最终地址: {preflight["final_url"]}')
+        if preflight.get('error'):
+            test_result['notes'].append(f'⚠️ {preflight["error"]}')
+        
         # 分析链接特征
         if 'feishu.cn' in url:
             test_result['notes'].append('✅ 飞书中国域名')
@@ -57,9 +74,6 @@ class SimpleFeishuTest:
             test_result['notes'].append('⚠️ 未知文档格式')
             test_result['export_feasible'] = False
         
-        # 模拟访问延迟
-        time.sleep(1)
-        
         return test_result
     
     def run_test(self):
@@ -74,6 +88,20 @@ class SimpleFeishuTest:
         
         print(f"📋 找到 {len(links)} 个测试链接")
         
+        # 并发预检所有链接
+        checker = LinkPreflightChecker()
+        results = checker.check_links(links)
+        for result in results:
+            self.preflight_results[result['url']] = result
+        
+        # 预检结果同时记录到导出状态库
+        try:
+            store = ExportStateStore()
+            store.add_links(links)
+            store.record_preflight(results)
+        except Exception as e:
+            print(f"⚠️  写入状态库失败: {e}")
+        
         for i, link in enumerate(links, 1):
             print(f"\n[{i}/{len(links)}] 测试链接...")
             
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+边导出边合并
+以前要等所有文档导出完，再单独运行 merge_pdfs.py 重新打开、解析每个文件。
+这里在每个文档导出成功后立即把它并入合并文件，全部导出完成时只需写出一次，合并文件随即可用。
+
+合并顺序与链接文件（或知识库目录树）中的顺序一致，而不是完成顺序：
+- 先完成、但前面还有文档未完成的，暂存在重排缓冲区中（只记录文件路径，并入时才打开解析），
+  前面的文档完成（或失败）后依次并入；
+- 缓冲区有上限，超出时最早的暂存文档按位置插入（之后完成的前序文档再插到它前面），
+  避免一个卡住的文档让后面的文档全部积压到最后才解析；
+- 不在链接列表中的文档（如从共享队列领取的）按完成顺序排在最后。
+
+每个文档在合并文件的目录（书签）中对应一项，标题取自导出的文件名（即文档标题）。
+"""
+
+import os
+import time
+
+from asset_store import PdfImageDeduper
+
+
+class StreamingMerger:
+    def __init__(self, output_path, order, window=20, dedupe_images=True, settle_timeout=30):
+        """
+        初始化边导出边合并
+
+        Args:
+            output_path (str): 合并文件路径
+            order (list): 文档链接的目标顺序（通常为链接文件中的顺序）
+            window (int): 重排缓冲区最多暂存的文档数
+            dedupe_images (bool): 写出前是否合并内容相同的图片对象
+            settle_timeout (int): 结束时等待仍在写入的导出文件的最长时间（秒）
+        """
+        from PyPDF2 import PdfWriter
+
+        self.output_path = output_path
+        self.position = {}
+        for url in order:
+            self.position.setdefault(url, len(self.position))
+        self.window = max(1, window)
+        self.deduper = PdfImageDeduper() if dedupe_images else None
+        self.settle_timeout = settle_timeout
+
+        self.writer = PdfWriter()
+        self.next_index = 0       # 下一个按顺序并入的位置
+        self.pending = {}         # 位置 -> (url, 输出文件路径)：已完成、等待前序文档
+        self.skipped = set()      # 失败或没有输出文件的位置
+        self.merged = {}          # 位置 -> (标题, 页数)
+        self._readers = []        # 已并入的源文件：合并文件和图片去重按 id(reader) 识别对象来源，需保持存活
+
+        self.out_of_order = 0     # 因缓冲区已满而提前按位置插入的文档数
+        self.max_buffered = 0
+        self.missing = []         # 导出成功但无法读取输出文件的链接
+        self.finish_seconds = None
+
+    def _index(self, url):
+        if url not in self.position:
+            self.position[url] = len(self.position)
+        return self.position[url]
+
+    def add(self, url, paths):
+        """一个文档导出成功：按顺序并入合并文件，或暂存在重排缓冲区中"""
+        paths = [path for path in paths if path.lower().endswith('.pdf')]
+        index = self._index(url)
+        if index in self.merged:
+            return
+        if not paths:
+            self.missing.append(url)
+            self.skipped.add(index)
+        else:
+            self.pending[index] = (url, paths)
+            self.max_buffered = max(self.max_buffered, len(self.pending))
+        self._drain()
+
+    def skip(self, url):
+        """一个文档导出失败：不再等待它，让后面的文档继续并入"""
+        self.skipped.add(self._index(url))
+        self._drain()
+
+    def _drain(self):
+        """并入所有前序已就绪的文档；缓冲区超出上限时按位置插入最早的暂存文档"""
+        while self.next_index in self.pending or self.next_index in self.skipped or self.next_index in self.merged:
+            if self.next_index in self.pending and not self._merge(self.next_index):
+                # 输出文件可能还在写入，下次再试
+                break
+            self.next_index += 1
+
+        while len(self.pending) > self.window:
+            index = min(self.pending)
+            if index == self.next_index or not self._merge(index):
+                break
+            self.out_of_order += 1
+
+    def _merge(self, index):
+        """把一个文档插入到合并文件中它所在的位置"""
+        from PyPDF2 import PdfReader
+
+        url, paths = self.pending[index]
+        try:
+            readers = [PdfReader(path) for path in paths]
+        except Exception:
+            return False
+
+        # 合并文件中排在它前面的页数
+        page_position = sum(pages for i, (_, pages) in self.merged.items() if i < index)
+        if self.deduper:
+            # 页面插入时会复制到合并文件中，所以要在插入前把重复图片指向第一次出现的对象
+            for reader in readers:
+                self.deduper.dedupe(reader.pages)
+        self._readers.extend(readers)
+
+        page_count = 0
+        for reader in readers:
+            for page in reader.pages:
+                self.writer.insert_page(page, page_position + page_count)
+                page_count += 1
+
+        # 页面已复制到合并文件中：释放源文件的原始数据，不必等到写出时
+        for reader in readers:
+            reader.stream = None
+
+        title = os.path.splitext(os.path.basename(paths[0]))[0]
+        self.merged[index] = (title, page_count)
+        del self.pending[index]
+        return True
+
+    def finish(self):
+        """
+        并入剩余的暂存文档并写出合并文件
+
+        Returns:
+            str: 合并文件路径，没有可合并的文档时返回 None
+        """
+        started = time.time()
+        deadline = started + self.settle_timeout
+        while self.pending:
+            for index in sorted(self.pending):
+                self._merge(index)
+            if not self.pending or time.time() >= deadline:
+                break
+            time.sleep(1)
+        for index in sorted(self.pending):
+            self.missing.append(self.pending.pop(index)[0])
+
+        if not self.merged:
+            self.finish_seconds = time.time() - started
+            return None
+
+        # 目录在所有页面就位后按文档顺序添加（插入顺序与文档顺序可能不同）
+        page_number = 0
+        for index in sorted(self.merged):
+            title, page_count = self.merged[index]
+            if page_count:
+                self.writer.add_outline_item(title, page_number)
+            page_number += page_count
+
+        temp_path = f"{self.output_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            self.writer.write(f)
+        os.replace(temp_path, self.output_path)
+
+        self.finish_seconds = time.time() - started
+        return self.output_path
+
+    def get_stats(self):
+        """合并统计"""
+        return {
+            'output_path': self.output_path,
+            'documents': len(self.merged),
+            'pages': sum(pages for _, pages in self.merged.values()),
+            'out_of_order_inserts': self.out_of_order,
+            'max_buffered': self.max_buffered,
+            'missing_outputs': self.missing,
+            'image_dedupe': self.deduper.stats if self.deduper else None,
+            'finish_seconds': round(self.finish_seconds, 2) if self.finish_seconds is not None else None,
+        }
+
+    def print_summary(self):
+        stats = self.get_stats()
+        print(f"📚 合并文件: {stats['documents']} 个文档，共 {stats['pages']} 页，"
+              f"导出结束后 {stats['finish_seconds']} 秒写出 → {stats['output_path']}")
+        if stats['missing_outputs']:
+            print(f"⚠️  {len(stats['missing_outputs'])} 个文档没有找到可读取的输出文件，未加入合并文件")
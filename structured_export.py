@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结构化内容导出（Markdown / HTML）
+直接读取浏览器中已渲染的飞书文档块（data-block-type），转换为 Markdown 或自包含的 HTML，
+图片保存到同名的附属目录（<文档名>_files/）。不经过打印和下载对话框，
+适合检索和归档场景：速度比打印PDF快得多，文件也小得多。
+
+飞书文档按需渲染（虚拟列表），提取时会逐屏滚动文档，按块ID收集所有出现过的块。
+"""
+
+import base64
+import hashlib
+import html
+import mimetypes
+import os
+import re
+
+from export_pipeline import claim_path
+
+EXPORT_FORMATS = ("markdown", "html")
+
+FILE_EXTENSIONS = {
+    "markdown": ".md",
+    "html": ".html",
+}
+
+LIST_TYPES = ("bullet", "ordered", "todo")
+
+# 只作为容器、本身没有文字的块
+CONTAINER_TYPES = ("quote_container", "callout", "grid", "grid_column", "view", "synced_source")
+
+# 逐屏滚动并收集文档块。参数：最大滚动次数；回调返回 {title, blocks}
+EXTRACT_BLOCKS_SCRIPT = r"""
+const maxScrolls = arguments[0];
+const done = arguments[arguments.length - 1];
+const LIST_TYPES = ['bullet', 'ordered', 'todo'];
+const QUOTE_TYPES = ['quote_container', 'callout'];
+// 由父块整体导出的块，其内部的子块不再单独导出
+const OWNED_TYPES = ['table', 'table_cell', 'image', 'code'];
+const ZERO_WIDTH = /[\u200b\ufeff]/g;
+const blocks = new Map();
+const visited = new WeakSet();
+
+function parentBlock(el) {
+    return el.parentElement ? el.parentElement.closest('[data-block-type]') : null;
+}
+
+function marksOf(node, root) {
+    const marks = {bold: false, italic: false, code: false, strike: false, href: null};
+    for (let el = node.parentElement; el && el !== root; el = el.parentElement) {
+        const tag = el.tagName;
+        const style = el.style;
+        const weight = style ? style.fontWeight : '';
+        if (tag === 'B' || tag === 'STRONG' || weight === 'bold' || parseInt(weight, 10) >= 600) marks.bold = true;
+        if (tag === 'I' || tag === 'EM' || (style && style.fontStyle === 'italic')) marks.italic = true;
+        if (tag === 'S' || tag === 'DEL' || (style && (style.textDecoration || '').includes('line-through'))) marks.strike = true;
+        if (tag === 'CODE' || (el.className && String(el.className).includes('inline-code'))) marks.code = true;
+        if (!marks.href && tag === 'A' && el.href) marks.href = el.href;
+    }
+    return marks;
+}
+
+function runsOf(el) {
+    const runs = [];
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT, {
+        acceptNode: node => node.parentElement && node.parentElement.closest('[data-block-type]') === el
+            ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_REJECT
+    });
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        const text = node.nodeValue.replace(ZERO_WIDTH, '');
+        if (!text) continue;
+        const marks = marksOf(node, el);
+        const last = runs[runs.length - 1];
+        if (last && last.bold === marks.bold && last.italic === marks.italic && last.code === marks.code
+                && last.strike === marks.strike && last.href === marks.href) {
+            last.text += text;
+        } else {
+            runs.push(Object.assign({text: text}, marks));
+        }
+    }
+    return runs;
+}
+
+function collect() {
+    document.querySelectorAll('[data-block-type]').forEach(el => {
+        if (visited.has(el)) return;
+        visited.add(el);
+        const id = el.getAttribute('data-block-id') || ('dom-' + blocks.size);
+        if (blocks.has(id)) return;
+
+        let depth = 0, quote = false;
+        for (let p = parentBlock(el); p; p = parentBlock(p)) {
+            const ptype = p.getAttribute('data-block-type');
+            if (OWNED_TYPES.includes(ptype)) return;
+            if (LIST_TYPES.includes(ptype)) depth++;
+            if (QUOTE_TYPES.includes(ptype)) quote = true;
+        }
+
+        const type = el.getAttribute('data-block-type');
+        const block = {type: type, depth: depth, quote: quote};
+        if (type === 'image') {
+            const img = el.querySelector('img');
+            block.src = img ? (img.currentSrc || img.src) : null;
+            block.alt = img ? (img.alt || '') : '';
+        } else if (type === 'table') {
+            block.rows = Array.from(el.querySelectorAll('tr')).map(tr =>
+                Array.from(tr.querySelectorAll('td, th')).map(cell => cell.innerText.replace(ZERO_WIDTH, '').trim()));
+        } else if (type === 'code') {
+            const content = el.querySelector('code') || el;
+            block.text = content.innerText.replace(ZERO_WIDTH, '');
+            block.language = el.getAttribute('data-language') || '';
+        } else {
+            block.runs = runsOf(el);
+            if (type === 'todo') {
+                block.checked = !!el.querySelector('[aria-checked="true"], input[type="checkbox"]:checked, .todo-block-checked');
+            }
+        }
+        blocks.set(id, block);
+    });
+}
+
+function scroller() {
+    const first = document.querySelector('[data-block-type]');
+    for (let el = first; el; el = el.parentElement) {
+        const overflow = getComputedStyle(el).overflowY;
+        if ((overflow === 'auto' || overflow === 'scroll') && el.scrollHeight > el.clientHeight) return el;
+    }
+    return document.scrollingElement || document.documentElement;
+}
+
+const container = scroller();
+let steps = 0;
+function step() {
+    collect();
+    const atEnd = container.scrollTop + container.clientHeight >= container.scrollHeight - 2;
+    if (atEnd || steps >= maxScrolls) {
+        container.scrollTop = 0;
+        done({title: document.title, blocks: Array.from(blocks.values())});
+        return;
+    }
+    steps++;
+    container.scrollTop += Math.max(200, container.clientHeight * 0.8);
+    setTimeout(step, 150);
+}
+step();
+"""
+
+# 在页面中下载图片（复用页面的登录状态）。参数：图片URL；回调返回 {type, data} 或 {error}
+FETCH_IMAGE_SCRIPT = r"""
+const done = arguments[arguments.length - 1];
+fetch(arguments[0], {credentials: 'include'})
+    .then(response => {
+        if (!response.ok) throw new Error('HTTP ' + response.status);
+        return response.blob();
+    })
+    .then(blob => new Promise((resolve, reject) => {
+        const reader = new FileReader();
+        reader.onload = () => resolve({type: blob.type, data: String(reader.result).split(',')[1] || ''});
+        reader.onerror = () => reject(reader.error);
+        reader.readAsDataURL(blob);
+    }))
+    .then(done)
+    .catch(error => done({error: String(error)}));
+"""
+
+HTML_STYLE = """
+body { max-width: 860px; margin: 40px auto; padding: 0 20px; font: 16px/1.7 -apple-system, "PingFang SC", "Microsoft YaHei", sans-serif; color: #1f2329; }
+img { max-width: 100%; }
+pre { background: #f5f6f7; padding: 12px 16px; overflow-x: auto; border-radius: 4px; }
+code { font-family: Menlo, Consolas, monospace; font-size: 0.9em; }
+blockquote { margin: 0; padding-left: 14px; border-left: 3px solid #bbbfc4; color: #646a73; }
+table { border-collapse: collapse; }
+td, th { border: 1px solid #dee0e3; padding: 6px 10px; }
+.todo { list-style: none; }
+"""
+
+
+def heading_level(block_type):
+    """heading1..heading9 对应的标题级别（Markdown/HTML最多6级），非标题返回0"""
+    match = re.fullmatch(r"heading(\d)", block_type)
+    return min(int(match.group(1)), 6) if match else 0
+
+
+def safe_filename(name, fallback="untitled"):
+    """把文档标题转换为可用的文件名"""
+    name = re.sub(r'[\\/:*?"<>|\r\n\t]+', "_", name).strip(" ._")
+    return name[:120] or fallback
+
+
+def plain_text(block):
+    return "".join(run["text"] for run in block.get("runs", []))
+
+
+# ---------- Markdown ----------
+
+def escape_markdown(text):
+    return re.sub(r"([\\`*_\[\]])", r"\\\1", text)
+
+
+def markdown_runs(runs):
+    parts = []
+    for run in runs:
+        text = run["text"]
+        core = text.strip()
+        if not core:
+            parts.append(text)
+            continue
+        if run.get("code"):
+            core = f"`{core}`"
+        else:
+            core = escape_markdown(core)
+            if run.get("bold"):
+                core = f"**{core}**"
+            if run.get("italic"):
+                core = f"*{core}*"
+            if run.get("strike"):
+                core = f"~~{core}~~"
+        if run.get("href"):
+            core = f"[{core}]({run['href']})"
+        leading = text[:len(text) - len(text.lstrip())]
+        trailing = text[len(text.rstrip()):]
+        parts.append(leading + core + trailing)
+    return "".join(parts).replace("\n", "  \n")
+
+
+def render_markdown(title, blocks, source_url=""):
+    """
+    把文档块转换为Markdown
+
+    Args:
+        title (str): 文档标题
+        blocks (list): EXTRACT_BLOCKS_SCRIPT 返回的块（图片块的 src 已替换为本地相对路径）
+        source_url (str): 原文链接
+    """
+    lines = [f"# {escape_markdown(title)}", ""]
+    if source_url:
+        lines += [f"> 原文: <{source_url}>", ""]
+
+    previous_list = False
+    for block in blocks:
+        block_type = block["type"]
+        indent = "    " * block.get("depth", 0)
+        prefix = "> " if block.get("quote") else ""
+        is_list = block_type in LIST_TYPES
+
+        if block_type in CONTAINER_TYPES or block_type == "page":
+            continue
+        if previous_list and not is_list:
+            lines.append("")
+        previous_list = is_list
+
+        level = heading_level(block_type)
+        if level:
+            lines += [prefix + "#" * level + " " + markdown_runs(block.get("runs", [])), ""]
+        elif block_type == "bullet":
+            lines.append(prefix + indent + "- " + markdown_runs(block.get("runs", [])))
+        elif block_type == "ordered":
+            lines.append(prefix + indent + "1. " + markdown_runs(block.get("runs", [])))
+        elif block_type == "todo":
+            mark = "x" if block.get("checked") else " "
+            lines.append(prefix + indent + f"- [{mark}] " + markdown_runs(block.get("runs", [])))
+        elif block_type == "code":
+            fence = "````" if "```" in block.get("text", "") else "```"
+            body = [fence + block.get("language", "")] + block.get("text", "").rstrip("\n").split("\n") + [fence]
+            lines += [prefix + line for line in body] + [""]
+        elif block_type == "divider":
+            lines += ["---", ""]
+        elif block_type == "image":
+            if block.get("src"):
+                target = f"<{block['src']}>" if " " in block["src"] else block["src"]
+                lines += [prefix + f"![{escape_markdown(block.get('alt', ''))}]({target})", ""]
+        elif block_type == "table":
+            rows = block.get("rows") or []
+            if rows:
+                width = max(len(row) for row in rows)
+                cells = [[cell.replace("|", "\\|").replace("\n", "<br>") for cell in row] + [""] * (width - len(row))
+                         for row in rows]
+                lines.append("| " + " | ".join(cells[0]) + " |")
+                lines.append("|" + " --- |" * width)
+                lines += ["| " + " | ".join(row) + " |" for row in cells[1:]]
+                lines.append("")
+        else:
+            text = markdown_runs(block.get("runs", []))
+            if text.strip():
+                lines += [prefix + text, ""]
+
+    return "\n".join(lines).rstrip() + "\n"
+
+
+# ---------- HTML ----------
+
+def html_runs(runs):
+    parts = []
+    for run in runs:
+        text = html.escape(run["text"]).replace("\n", "<br>")
+        if run.get("code"):
+            text = f"<code>{text}</code>"
+        if run.get("bold"):
+            text = f"<strong>{text}</strong>"
+        if run.get("italic"):
+            text = f"<em>{text}</em>"
+        if run.get("strike"):
+            text = f"<s>{text}</s>"
+        if run.get("href"):
+            text = f'<a href="{html.escape(run["href"])}">{text}</a>'
+        parts.append(text)
+    return "".join(parts)
+
+
+def render_html(title, blocks, source_url=""):
+    """
+    把文档块转换为自包含的HTML（样式内联，图片引用附属目录中的文件）
+
+    Args:
+        title (str): 文档标题
+        blocks (list): EXTRACT_BLOCKS_SCRIPT 返回的块（图片块的 src 已替换为本地相对路径）
+        source_url (str): 原文链接
+    """
+    body = [f"<h1>{html.escape(title)}</h1>"]
+    if source_url:
+        body.append(f'<p><a href="{html.escape(source_url)}">原文</a></p>')
+
+    open_lists = []
+    in_quote = False
+
+    for block in blocks:
+        block_type = block["type"]
+        if block_type in CONTAINER_TYPES or block_type == "page":
+            continue
+
+        # 列表按缩进层级嵌套
+        if block_type in LIST_TYPES:
+            tag = "ol" if block_type == "ordered" else "ul"
+            target = block.get("depth", 0) + 1
+            while len(open_lists) > target or (len(open_lists) == target and open_lists[-1] != tag):
+                body.append(f"</{open_lists.pop()}>")
+            while len(open_lists) < target:
+                open_lists.append(tag)
+                body.append(f"<{tag}>")
+        else:
+            while open_lists:
+                body.append(f"</{open_lists.pop()}>")
+
+        if block.get("quote") != in_quote:
+            in_quote = bool(block.get("quote"))
+            body.append("<blockquote>" if in_quote else "</blockquote>")
+
+        level = heading_level(block_type)
+        if level:
+            body.append(f"<h{level}>{html_runs(block.get('runs', []))}</h{level}>")
+        elif block_type in ("bullet", "ordered"):
+            body.append(f"<li>{html_runs(block.get('runs', []))}</li>")
+        elif block_type == "todo":
+            checked = " checked" if block.get("checked") else ""
+            body.append(f'<li class="todo"><input type="checkbox" disabled{checked}> {html_runs(block.get("runs", []))}</li>')
+        elif block_type == "code":
+            language = html.escape(block.get("language", ""))
+            body.append(f'<pre><code class="language-{language}">{html.escape(block.get("text", ""))}</code></pre>')
+        elif block_type == "divider":
+            body.append("<hr>")
+        elif block_type == "image":
+            if block.get("src"):
+                body.append(f'<p><img src="{html.escape(block["src"])}" alt="{html.escape(block.get("alt", ""))}"></p>')
+        elif block_type == "table":
+            rows = block.get("rows") or []
+            if rows:
+                body.append("<table>")
+                for index, row in enumerate(rows):
+                    cell_tag = "th" if index == 0 else "td"
+                    cells = "".join(f"<{cell_tag}>{html.escape(cell).replace(chr(10), '<br>')}</{cell_tag}>" for cell in row)
+                    body.append(f"<tr>{cells}</tr>")
+                body.append("</table>")
+        else:
+            text = html_runs(block.get("runs", []))
+            if plain_text(block).strip():
+                body.append(f"<p>{text}</p>")
+
+    while open_lists:
+        body.append(f"</{open_lists.pop()}>")
+    if in_quote:
+        body.append("</blockquote>")
+
+    return (
+        "<!DOCTYPE html>\n"
+        '<html lang="zh-CN">\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{html.escape(title)}</title>\n"
+        f'<meta name="source-url" content="{html.escape(source_url)}">\n'
+        f"<style>{HTML_STYLE}</style>\n</head>\n<body>\n"
+        + "\n".join(body)
+        + "\n</body>\n</html>\n"
+    )
+
+
+RENDERERS = {
+    "markdown": render_markdown,
+    "html": render_html,
+}
+
+
+class StructuredExporter:
+    def __init__(self, output_dir, export_format="markdown", max_scrolls=400, script_timeout=60,
+                 asset_store=None):
+        """
+        初始化结构化导出器
+
+        Args:
+            output_dir (str): 输出目录
+            export_format (str): "markdown" 或 "html"
+            max_scrolls (int): 提取时最多滚动的屏数（防止无限加载的页面）
+            script_timeout (int): 页面脚本（滚动提取、下载图片）的超时时间（秒）
+            asset_store (AssetStore): 内容寻址资源库，提供时同一图片只下载一次，各文档以硬链接引用
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+        self.output_dir = output_dir
+        self.export_format = export_format
+        self.max_scrolls = max_scrolls
+        self.script_timeout = script_timeout
+        self.asset_store = asset_store
+
+        self.documents = 0
+        self.images_saved = 0
+        self.image_failures = 0
+        self.bytes_written = 0
+
+    def export(self, driver, url):
+        """
+        导出当前窗口中已加载完成的文档
+
+        Args:
+            driver: Selenium WebDriver实例
+            url (str): 文档URL
+
+        Returns:
+            str: 生成的文件路径；页面中没有找到文档块时返回 None
+        """
+        driver.set_script_timeout(self.script_timeout)
+        page = driver.execute_async_script(EXTRACT_BLOCKS_SCRIPT, self.max_scrolls)
+        blocks = page.get("blocks") or []
+        if not [block for block in blocks if block["type"] != "page"]:
+            return None
+
+        title_block = next((block for block in blocks if block["type"] == "page"), None)
+        title = plain_text(title_block).strip() if title_block else ""
+        title = title or re.sub(r"\s*-\s*(飞书云文档|Feishu Docs|Lark Docs)\s*$", "", page.get("title") or "").strip()
+        title = title or url.rstrip("/").rsplit("/", 1)[-1]
+
+        # 先独占文件名：与本批次或以前运行导出的同名文档不会互相覆盖，附属图片目录与文件名一致
+        path = claim_path(os.path.join(self.output_dir, safe_filename(title) + FILE_EXTENSIONS[self.export_format]))
+        stem = os.path.splitext(os.path.basename(path))[0]
+        try:
+            for block in blocks:
+                if block["type"] == "image" and block.get("src"):
+                    block["src"] = self.save_image(driver, block["src"], stem)
+
+            content = RENDERERS[self.export_format](title, blocks, url)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+        except BaseException:
+            os.remove(path)
+            raise
+
+        self.documents += 1
+        self.bytes_written += os.path.getsize(path)
+        return path
+
+    def save_image(self, driver, src, stem):
+        """
+        下载图片到附属目录，返回在文档中引用的相对路径（失败时保留原链接）
+        """
+        if src.startswith("data:"):
+            return src
+        folder = stem + "_files"
+
+        cached = self.asset_store.lookup_url(src) if self.asset_store else None
+        if cached:
+            sha256, asset_path = cached
+            name = sha256[:16] + os.path.splitext(asset_path)[1]
+            self.link_asset(asset_path, os.path.join(self.output_dir, folder, name))
+            self.images_saved += 1
+            return f"{folder}/{name}"
+
+        try:
+            result = driver.execute_async_script(FETCH_IMAGE_SCRIPT, src)
+            if not result or result.get("error"):
+                raise RuntimeError(result.get("error") if result else "no response")
+            data = base64.b64decode(result["data"])
+        except Exception as e:
+            self.image_failures += 1
+            print(f"⚠️  图片下载失败，保留原链接: {src[:80]} ({e})")
+            return src
+
+        extension = mimetypes.guess_extension((result.get("type") or "").split(";")[0]) or ".bin"
+        path = os.path.join(self.output_dir, folder, hashlib.sha256(data).hexdigest()[:16] + extension)
+        if self.asset_store:
+            sha256, asset_path = self.asset_store.put(data, extension, url=src)
+            path = os.path.join(self.output_dir, folder, sha256[:16] + os.path.splitext(asset_path)[1])
+            self.link_asset(asset_path, path)
+        elif not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            self.bytes_written += len(data)
+        self.images_saved += 1
+        return f"{folder}/{os.path.basename(path)}"
+
+    def link_asset(self, asset_path, path):
+        """在文档附属目录中引用资源库中的图片（硬链接或复制），新出现在输出目录中的文件计入写出字节数"""
+        if os.path.exists(path):
+            return
+        self.asset_store.link(asset_path, path)
+        self.bytes_written += os.path.getsize(path)
+
+    def get_stats(self):
+        """本次运行的结构化导出统计"""
+        return {
+            'format': self.export_format,
+            'documents': self.documents,
+            'images_saved': self.images_saved,
+            'image_failures': self.image_failures,
+            'bytes_written': self.bytes_written,
+        }
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单浏览器多标签页池
+在同一个Chrome中同时打开多个标签页：一个标签页在打印时，其他标签页继续加载文档，
+从而在单个浏览器的内存占用下重叠多个页面的网络等待时间。
+
+注意：需要以 page_load_strategy = 'none' 启动浏览器，否则切换标签页时
+ChromeDriver 会阻塞等待页面加载完成。
+"""
+
+import time
+
+
+class BrowserTab:
+    def __init__(self, tab_id, handle):
+        """
+        浏览器中的一个标签页及其当前任务
+
+        Args:
+            tab_id (int): 标签页编号（从1开始，替换后保持不变）
+            handle (str): Selenium窗口句柄
+        """
+        self.tab_id = tab_id
+        self.handle = handle
+        self.url = None
+        self.state = 'idle'  # idle / loading / ready / printing
+        self.started_at = None
+        self.ready_at = None
+        self.settle_delay = None  # 本次任务的渲染等待时间（None表示使用标签页池的默认值）
+
+    def reset(self):
+        """清空当前任务"""
+        self.url = None
+        self.state = 'idle'
+        self.started_at = None
+        self.ready_at = None
+        self.settle_delay = None
+
+
+class TabPool:
+    def __init__(self, driver, size=3, load_timeout=60, settle_delay=3, on_new_tab=None):
+        """
+        初始化标签页池
+
+        Args:
+            driver: Selenium WebDriver实例
+            size (int): 标签页数量
+            load_timeout (int): 单个标签页加载文档的超时时间（秒），超时视为卡死
+            settle_delay (int): 页面加载完成后等待渲染的时间（秒）
+            on_new_tab (callable): 新标签页打开后（已切换到该标签页）的回调，用于按标签页初始化设置
+        """
+        self.driver = driver
+        self.size = size
+        self.load_timeout = load_timeout
+        self.settle_delay = settle_delay
+        self.on_new_tab = on_new_tab
+        self.tabs = []
+        self.replaced_tabs = 0
+
+    def open(self):
+        """打开全部标签页（复用浏览器当前窗口作为第一个标签页）"""
+        self.tabs = [BrowserTab(1, self.driver.current_window_handle)]
+        for tab_id in range(2, self.size + 1):
+            self.driver.switch_to.new_window('tab')
+            if self.on_new_tab:
+                self.on_new_tab()
+            self.tabs.append(BrowserTab(tab_id, self.driver.current_window_handle))
+        print(f"🗂️  已打开 {len(self.tabs)} 个标签页")
+
+    def idle_tabs(self):
+        """空闲的标签页"""
+        return [tab for tab in self.tabs if tab.state == 'idle']
+
+    def busy_tabs(self):
+        """正在加载或等待打印的标签页"""
+        return [tab for tab in self.tabs if tab.state != 'idle']
+
+    def assign(self, tab, url, settle_delay=None):
+        """让标签页开始加载文档（不阻塞等待加载完成）；settle_delay 可为该文档单独指定渲染等待时间"""
+        self.driver.switch_to.window(tab.handle)
+        self.driver.execute_script("window.location.href = arguments[0];", url)
+        tab.url = url
+        tab.state = 'loading'
+        tab.started_at = time.time()
+        tab.ready_at = None
+        tab.settle_delay = settle_delay
+
+    def poll(self):
+        """
+        检查所有加载中的标签页
+
+        Returns:
+            list: 加载超时（疑似卡死）的标签页
+        """
+        hung_tabs = []
+        now = time.time()
+        for tab in self.tabs:
+            if tab.state != 'loading':
+                continue
+
+            if now - tab.started_at > self.load_timeout:
+                hung_tabs.append(tab)
+                continue
+
+            try:
+                self.driver.switch_to.window(tab.handle)
+                ready = self.driver.execute_script(
+                    "return document.readyState === 'complete' && !!document.body;"
+                )
+            except Exception:
+                # 标签页已崩溃或无响应
+                hung_tabs.append(tab)
+                continue
+            if ready:
+                tab.state = 'ready'
+                tab.ready_at = time.time()
+        return hung_tabs
+
+    def next_printable(self):
+        """返回已加载完成且渲染等待已结束的标签页（最早就绪的优先）"""
+        now = time.time()
+        candidates = [
+            tab for tab in self.tabs
+            if tab.state == 'ready' and now - tab.ready_at >= (
+                self.settle_delay if tab.settle_delay is None else tab.settle_delay)
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda tab: tab.ready_at)
+
+    def activate(self, tab):
+        """切换到标签页并将其置于前台（键盘打印需要焦点）"""
+        self.driver.switch_to.window(tab.handle)
+        try:
+            self.driver.execute_cdp_cmd('Target.activateTarget', {'targetId': tab.handle})
+        except Exception:
+            pass
+        tab.state = 'printing'
+
+    def release(self, tab):
+        """任务完成，标签页回到空闲状态"""
+        tab.reset()
+
+    def replace(self, tab):
+        """关闭卡死的标签页并打开一个新标签页顶替它，不影响其他标签页"""
+        old_handle = tab.handle
+        self.driver.switch_to.new_window('tab')
+        if self.on_new_tab:
+            self.on_new_tab()
+        tab.handle = self.driver.current_window_handle
+        tab.reset()
+
+        try:
+            # 通过CDP关闭，无需切换到已卡死的页面
+            self.driver.execute_cdp_cmd('Target.closeTarget', {'targetId': old_handle})
+        except Exception:
+            try:
+                self.driver.switch_to.window(old_handle)
+                self.driver.close()
+                self.driver.switch_to.window(tab.handle)
+            except Exception as e:
+                print(f"⚠️  关闭标签页 {tab.tab_id} 失败: {e}")
+
+        self.replaced_tabs += 1
+        print(f"🔁 标签页 {tab.tab_id} 已替换")
+
+    def in_flight_urls(self):
+        """所有尚未完成的文档URL（浏览器重启时需要重新排队）"""
+        return [tab.url for tab in self.tabs if tab.url]
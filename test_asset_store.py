@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源库测试 - 内容寻址、URL映射只在本次运行内有效、LRU淘汰和PDF图片去重
+"""
+
+import os
+import zlib
+
+from PyPDF2 import PdfMerger, PdfReader, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject, StreamObject
+
+from asset_store import AssetStore, dedupe_pdf_images, image_content_key
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = AssetStore(str(tmp_path / "assets"))
+
+    sha_a, path_a = store.put(b"logo" * 100, ".png", url="https://a/logo?doc=1")
+    sha_b, path_b = store.put(b"logo" * 100, ".png", url="https://a/logo?doc=2")
+    assert (sha_a, path_a) == (sha_b, path_b)
+    assert store.lookup_url("https://a/logo?doc=1") == (sha_a, path_a)
+
+    target = store.link(path_a, str(tmp_path / "doc_files" / "logo.png"))
+    assert os.path.samefile(target, path_a) or open(target, "rb").read() == b"logo" * 100
+
+    stats = store.get_stats()
+    assert stats["references"] == 3
+    assert stats["unique_assets"] == 1
+    assert stats["bytes_saved"] == 800
+
+
+def test_evicts_least_recently_used_from_previous_runs(tmp_path):
+    root = str(tmp_path / "assets")
+    old = AssetStore(root)
+    _, first = old.put(b"a" * 600, ".png")
+    _, second = old.put(b"b" * 600, ".png")
+    old.close()
+
+    store = AssetStore(root, max_bytes=1000)
+    _, third = store.put(b"c" * 300, ".png")
+
+    assert not os.path.exists(first)
+    assert os.path.exists(second) and os.path.exists(third)
+    assert store.get_stats()["evicted"] == 1
+
+
+def make_pdf(path, pixels):
+    writer = PdfWriter()
+    writer.add_blank_page(100, 100)
+    page = writer.pages[-1]
+    image = DecodedStreamObject()
+    image.set_data(pixels)
+    image.update({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Image"),
+        NameObject("/Width"): NumberObject(len(pixels) // 3),
+        NameObject("/Height"): NumberObject(1),
+        NameObject("/ColorSpace"): NameObject("/DeviceRGB"),
+        NameObject("/BitsPerComponent"): NumberObject(8),
+    })
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): writer._add_object(image)}),
+    })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_dedupe_pdf_images_across_documents(tmp_path):
+    logo = bytes(range(256)) * 30
+    for name, pixels in (("a", logo), ("b", logo), ("c", b"\x01\x02\x03" * 10)):
+        make_pdf(str(tmp_path / f"{name}.pdf"), pixels)
+
+    merger = PdfMerger()
+    for name in "abc":
+        merger.append(str(tmp_path / f"{name}.pdf"))
+    stats = dedupe_pdf_images([page.pagedata for page in merger.pages])
+    merger.write(str(tmp_path / "merged.pdf"))
+    merger.close()
+
+    assert stats == {"images": 3, "unique_images": 2, "bytes_saved": len(logo)}
+    refs = [page["/Resources"]["/XObject"].raw_get("/Im0").idnum for page in PdfReader(str(tmp_path / "merged.pdf")).pages]
+    assert refs[0] == refs[1] != refs[2]
+
+
+def test_url_mapping_is_scoped_to_the_run(tmp_path):
+    root = str(tmp_path / "assets")
+    first_run = AssetStore(root)
+    sha256, path = first_run.put(b"old logo", ".png", url="https://a/logo")
+    assert first_run.lookup_url("https://a/logo") == (sha256, path)
+    first_run.close()
+
+    # 以后的运行不信任上次的URL映射（图片可能已被替换），重新下载后按内容复用
+    store = AssetStore(root)
+    assert store.lookup_url("https://a/logo") is None
+    assert store.put(b"old logo", ".png", url="https://a/logo") == (sha256, path)
+    assert store.get_stats()["content_hits"] == 1
+
+
+def test_images_with_different_compression_share_a_key():
+    pixels = bytes(range(256)) * 4
+    images = []
+    for level in (1, 9):
+        image = StreamObject.initialize_from_dictionary({
+            NameObject("/Filter"): NameObject("/FlateDecode"),
+            NameObject("/Length"): NumberObject(0),
+            "__streamdata__": zlib.compress(pixels, level),
+        })
+        image.update({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(256),
+            NameObject("/Height"): NumberObject(4),
+            NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+            NameObject("/BitsPerComponent"): NumberObject(8),
+        })
+        images.append(image)
+
+    cache = {}
+    assert image_content_key(images[0], cache) == image_content_key(images[1], cache)
+    assert images[0].decoded_self is None
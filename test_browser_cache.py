@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器磁盘缓存测试 - 槽位分配与释放、Chrome参数、命中率统计
+"""
+
+import json
+import os
+
+import pytest
+
+from browser_cache import BrowserDiskCache
+
+
+class FakeChromeOptions:
+    def __init__(self):
+        self.arguments = []
+        self.capabilities = {}
+
+    def add_argument(self, argument):
+        self.arguments.append(argument)
+
+    def set_capability(self, name, value):
+        self.capabilities[name] = value
+
+
+def event(method, **params):
+    return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+
+def test_each_cache_holds_its_own_slot(tmp_path):
+    root = str(tmp_path / "cache")
+    first, second, third = (BrowserDiskCache(root, max_slots=2) for _ in range(3))
+
+    assert first.acquire() == os.path.join(root, "slot-0")
+    assert first.acquire() == first.slot_dir          # 重复获取返回同一个槽位
+    assert second.acquire() == os.path.join(root, "slot-1")
+    with pytest.raises(RuntimeError):
+        third.acquire()
+
+    first.release()
+    assert first.slot_dir is None
+    assert third.acquire() == os.path.join(root, "slot-0")
+    second.release()
+    third.release()
+
+
+def test_configure_chrome_uses_slot_and_size_limit(tmp_path):
+    cache = BrowserDiskCache(str(tmp_path / "cache"), max_mb=64)
+    options = FakeChromeOptions()
+    try:
+        cache.configure_chrome(options)
+    finally:
+        cache.release()
+
+    assert options.arguments == [
+        f"--disk-cache-dir={os.path.abspath(str(tmp_path / 'cache' / 'slot-0'))}",
+        f"--disk-cache-size={64 * 1024 * 1024}",
+    ]
+    assert options.capabilities == {"goog:loggingPrefs": {"performance": "ALL"}}
+
+
+def test_hit_ratio_from_performance_log(tmp_path):
+    cache = BrowserDiskCache(str(tmp_path / "cache"))
+    cache.collect([
+        event('Network.responseReceived', requestId="1", response={'url': "https://a/app.js"}),
+        event('Network.loadingFinished', requestId="1", encodedDataLength=4096),
+        event('Network.responseReceived', requestId="2", response={'url': "data:image/png;base64,"}),
+    ])
+    cache.collect([
+        event('Network.requestServedFromCache', requestId="3"),
+        event('Network.responseReceived', requestId="3", response={'url': "https://a/app.js"}),
+        event('Network.loadingFinished', requestId="3", encodedDataLength=4096),
+        event('Network.responseReceived', requestId="4", response={'url': "https://a/font.woff", 'fromDiskCache': True}),
+        event('Network.responseReceived', requestId="5", response={'url': "https://a/doc"}),
+        event('Network.loadingFinished', requestId="5", encodedDataLength=1024),
+        {'message': "not json"},
+    ])
+
+    stats = cache.get_stats()
+    assert stats['overall'] == {'documents': 2, 'requests': 4, 'cache_hits': 2,
+                                'hit_ratio': 0.5, 'avg_network_kb': 2.5}
+    assert stats['first_document']['avg_network_kb'] == 4.0
+    assert stats['later_documents']['hit_ratio'] == round(2 / 3, 3)
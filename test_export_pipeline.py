@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段导出流水线测试 - 有界队列的背压、写入阶段的校验和文件命名
+"""
+
+import base64
+import io
+import threading
+
+from PyPDF2 import PdfWriter
+
+from export_pipeline import ExportPipeline, PdfWriterStage, QueueStage, pdf_filename
+from export_verifier import ExportVerifier
+
+
+def pdf_base64(pages):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(100, 100)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_full_queue_blocks_upstream_until_consumed():
+    release = threading.Event()
+    done = []
+    stage = QueueStage('post', lambda item: release.wait() and done.append(item), workers=1, queue_size=1)
+    stage.start()
+
+    stage.put(1)   # 被线程取走后阻塞在 handler 中
+    stage.put(2)   # 占满队列
+    blocked = threading.Thread(target=stage.put, args=(3,))
+    blocked.start()
+    blocked.join(timeout=0.3)
+    assert blocked.is_alive()
+
+    release.set()
+    blocked.join(timeout=2)
+    stage.close()
+    assert done == [1, 2, 3]
+    assert stage.blocked_seconds > 0
+
+
+def test_pipeline_writes_valid_pdfs_and_reports_failures(tmp_path):
+    (tmp_path / "周报.pdf").write_bytes(b"%PDF- earlier run")
+    posted = []
+    errors = []
+    writer = PdfWriterStage(str(tmp_path))
+    pipeline = ExportPipeline(writer, posted.append, lambda stage, job, e: errors.append((stage, job['url'])),
+                              stage_workers={'write': 2}, queue_size=2).start()
+
+    pipeline.submit({'url': 'u1', 'title': '周报 - 飞书云文档', 'pdf_base64': pdf_base64(2)})
+    pipeline.submit({'url': 'u2', 'title': '周报 - 飞书云文档', 'pdf_base64': pdf_base64(1)})
+    pipeline.submit({'url': 'u3', 'title': '坏文档', 'pdf_base64': base64.b64encode(b"<html>").decode()})
+    pipeline.close()
+
+    assert sorted(job['url'] for job in posted) == ['u1', 'u2']
+    assert sorted(job['path'].rsplit('/', 1)[1] for job in posted) == ['周报 (1).pdf', '周报 (2).pdf']
+    assert sorted(job['pages'] for job in posted) == [1, 2]
+    assert errors == [('write', 'u3')]
+    # 以前运行留下的同名文件不会被覆盖，写入失败的文档不占用名称
+    assert (tmp_path / "周报.pdf").read_bytes() == b"%PDF- earlier run"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['周报 (1).pdf', '周报 (2).pdf', '周报.pdf']
+    assert [(s['stage'], s['processed'], s['failed']) for s in pipeline.snapshot()[3:]] == [
+        ('write', 3, 1), ('post', 2, 0)]
+
+
+def test_suspect_export_is_written_and_flagged_for_retry(tmp_path):
+    writer = PdfWriterStage(str(tmp_path), verifier=ExportVerifier())
+    signals = {'blocks': 12, 'text_length': 300, 'images': 0, 'pending_images': 0, 'placeholders': 0,
+               'scroll_height': 2000}
+
+    # 空白的打印结果也先写入文件，重新导出成功之前保留
+    job = writer({'url': 'u1', 'title': '空白', 'pdf_base64': pdf_base64(1), 'page_signals': signals,
+                  'retry_suspect': True})
+    assert job['suspect'] and job['verification']['reasons']
+    assert open(job['path'], 'rb').read().startswith(b"%PDF")
+
+    job = writer({'url': 'u1', 'title': '空白', 'pdf_base64': pdf_base64(1), 'page_signals': signals,
+                  'retry_suspect': False})
+    assert not job['suspect'] and job['path'].endswith("空白 (1).pdf")
+
+
+def test_pdf_filename_strips_site_suffix_and_invalid_characters():
+    assert pdf_filename("a/b: 计划 | 飞书文档") == "a_b_ 计划.pdf"
+    assert pdf_filename("") == "untitled.pdf"
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行剖析测试 - 未开启时无开销、cProfile摘要、按文档保存Chrome追踪
+"""
+
+import contextlib
+import json
+import os
+
+from export_profiler import RunProfiler, profile_run
+
+
+class FakeDriver:
+    def __init__(self):
+        self.commands = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append(command)
+        if command == 'Performance.getMetrics':
+            return {'metrics': [{'name': 'JSHeapUsedSize', 'value': 1024}]}
+        return {}
+
+
+def busy():
+    return sum(i * i for i in range(20000))
+
+
+def test_disabled_profile_is_a_null_context(tmp_path):
+    with profile_run("merge", False, str(tmp_path)) as profiler:
+        assert profiler is None
+    assert isinstance(profile_run("merge", False), contextlib.nullcontext)
+    assert os.listdir(tmp_path) == []
+
+
+def test_profile_writes_stats_and_summary(tmp_path):
+    with profile_run("merge", True, str(tmp_path)) as profiler:
+        busy()
+
+    assert os.path.dirname(profiler.run_dir) == str(tmp_path)
+    assert os.path.basename(profiler.run_dir).startswith("merge-")
+    assert os.path.exists(os.path.join(profiler.run_dir, "python.prof"))
+    with open(os.path.join(profiler.run_dir, "summary.txt"), encoding='utf-8') as f:
+        summary = f.read()
+    assert "按累计时间排序" in summary and "按自身时间排序" in summary
+    assert "busy" in summary
+
+
+def test_chrome_trace_only_for_selected_documents(tmp_path):
+    profiler = RunProfiler("export", str(tmp_path), trace_urls=["https://a/doc1"])
+    assert profiler.chrome_tracing_enabled
+    assert profiler.should_trace("https://a/doc1") and not profiler.should_trace("https://a/doc2")
+
+    entries = [
+        {'message': json.dumps({'message': {'method': 'Tracing.dataCollected', 'params': {'name': 'Layout'}}})},
+        {'message': json.dumps({'message': {'method': 'Network.responseReceived', 'params': {}}})},
+        {'message': "not json"},
+    ]
+    driver = FakeDriver()
+    profiler.record_document(driver, "https://a/doc2", entries)
+    assert not os.path.exists(os.path.join(profiler.run_dir, "chrome"))
+
+    profiler.record_document(driver, "https://a/doc1", entries)
+    chrome_dir = os.path.join(profiler.run_dir, "chrome")
+    trace_file = next(name for name in os.listdir(chrome_dir) if name.endswith(".trace.json"))
+    with open(os.path.join(chrome_dir, trace_file), encoding='utf-8') as f:
+        assert json.load(f) == {'traceEvents': [{'name': 'Layout'}], 'metadata': {'url': "https://a/doc1"}}
+    with open(os.path.join(chrome_dir, trace_file.replace(".trace.", ".metrics.")), encoding='utf-8') as f:
+        assert json.load(f)['metrics'] == {'JSHeapUsedSize': 1024}
+    assert driver.commands == ['Performance.enable', 'Performance.getMetrics']
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出状态库测试 - 尝试与错误记录、按类别查询错误、按运行导出旧格式日志
+"""
+
+import argparse
+import json
+import os
+
+from export_state import ExportStateStore, add_report_arguments, default_db_path, run_report
+
+A = "https://team.feishu.cn/docx/AAA"
+B = "https://team.feishu.cn/docx/BBB"
+
+
+def fail(store, run_id, url, kind, message):
+    attempt_id = store.start_attempt(run_id, url)
+    store.finish_attempt(attempt_id, 'failed', error_kind=kind, error_msg=message)
+
+
+def test_timeout_category_includes_load_timeouts(tmp_path):
+    store = ExportStateStore(str(tmp_path / "state.db"))
+    run_id = store.start_run(2)
+    fail(store, run_id, A, 'timeout', "阶段 render 超过 30 秒")
+    fail(store, run_id, B, 'load_timeout', "页面加载超时")
+    fail(store, run_id, B, 'no_export_button', "找不到导出按钮")
+
+    assert sorted(row['kind'] for row in store.failed_since(kind='timeout')) == ['load_timeout', 'timeout']
+    assert [row['url'] for row in store.failed_since(kind='load_timeout')] == [B]
+    assert len(store.failed_since()) == 3
+
+
+def test_export_log_only_contains_the_run(tmp_path):
+    store = ExportStateStore(str(tmp_path / "state.db"))
+    first = store.start_run(1)
+    fail(store, first, A, 'error', "上一次运行的错误")
+    second = store.start_run(2)
+    fail(store, second, B, 'error', "本次运行的错误")
+    attempt_id = store.start_attempt(second, A)
+    store.finish_attempt(attempt_id, 'success')
+
+    path = str(tmp_path / "export_log.json")
+    store.export_log(path, first)
+    with open(path, encoding='utf-8') as f:
+        assert [e['error'] for e in json.load(f)['errors']] == ["上一次运行的错误"]
+
+    store.export_log(path)
+    with open(path, encoding='utf-8') as f:
+        log = json.load(f)
+    assert [(e['url'], e['error']) for e in log['errors']] == [(B, "本次运行的错误")]
+    assert (log['total_docs'], log['processed_docs'], log['failed_docs']) == (2, 1, 1)
+
+
+def test_default_database_follows_download_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    download_dir = str(tmp_path / "exports")
+    store = ExportStateStore(default_db_path(download_dir))
+    run_id = store.start_run(1)
+    fail(store, run_id, A, 'error', "失败")
+    store.close()
+
+    parser = argparse.ArgumentParser()
+    add_report_arguments(parser)
+    run_report(parser.parse_args(["--download-dir", download_dir, "export"]))
+
+    assert os.path.exists(os.path.join(download_dir, "export_state.db"))
+    with open(os.path.join(download_dir, "failed_links.txt"), encoding='utf-8') as f:
+        assert f.read().split() == [A]
+    assert not os.path.exists(tmp_path / "feishu_exports")
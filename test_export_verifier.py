@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出结果校验测试 - PDF统计与页面信号比较，发现截断和空白的导出
+"""
+
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import DecodedStreamObject, NameObject
+
+from export_verifier import ExportVerifier, pdf_stats
+from test_pdf_search_index import make_text_pdf
+
+SIGNALS = {'blocks': 12, 'text_length': 300, 'images': 0, 'pending_images': 0, 'placeholders': 0,
+           'scroll_height': 2000}
+
+
+def test_complete_export_passes(tmp_path):
+    path = str(tmp_path / "完整.pdf")
+    make_text_pdf(path, ["a" * 150, "b" * 150])
+
+    verifier = ExportVerifier()
+    result = verifier.verify([path], SIGNALS)
+
+    assert result == {'stats': {'pages': 2, 'text_length': 300, 'blank_pages': 0}, 'reasons': []}
+    assert verifier.get_stats() == {'checked': 1, 'suspects': 0, 'unreadable': 0}
+
+
+def test_truncated_and_blank_exports_are_flagged(tmp_path):
+    truncated = str(tmp_path / "截断.pdf")
+    make_text_pdf(truncated, ["a" * 100, ""])
+    assert pdf_stats(truncated) == {'pages': 2, 'text_length': 100, 'blank_pages': 1}
+
+    verifier = ExportVerifier()
+    reasons = verifier.verify([truncated], SIGNALS)['reasons']
+    assert reasons == ["PDF中只有 100 字，页面中有 300 字", "1/2 页为空白"]
+
+    # 文档很长但PDF只有2页
+    assert verifier.check({'pages': 2, 'text_length': 300, 'blank_pages': 0},
+                          dict(SIGNALS, scroll_height=11000)) == ["PDF只有 2 页，按文档高度估计约 10 页"]
+    assert verifier.check({'pages': 1, 'text_length': 0, 'blank_pages': 1}, SIGNALS)[-1] == "PDF为空白页"
+
+
+def test_vector_only_pages_are_not_blank(tmp_path):
+    path = str(tmp_path / "白板.pdf")
+    writer = PdfWriter()
+    for operations in [
+        b"1 1 1 rg 0 0 300 300 re f",                                       # 只有白色背景
+        b"1 1 1 rg 0 0 300 300 re f q 0 0 0 RG 10 10 m 200 200 l S Q",      # 流程图连线
+        b"q 0.2 0.4 0.8 rg 20 20 100 60 re f Q",                            # 彩色色块
+    ]:
+        writer.add_blank_page(300, 300)
+        content = DecodedStreamObject()
+        content.set_data(operations)
+        writer.pages[-1][NameObject("/Contents")] = writer._add_object(content)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+    assert pdf_stats(path) == {'pages': 3, 'text_length': 0, 'blank_pages': 1}
+
+
+def test_unreadable_output_is_not_judged(tmp_path):
+    partial = tmp_path / "下载中.pdf"
+    partial.write_bytes(b"%PDF-1.4\n")
+
+    verifier = ExportVerifier()
+    assert verifier.verify([str(partial)], SIGNALS) is None
+    assert verifier.get_stats()['unreadable'] == 1
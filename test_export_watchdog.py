@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出看门狗测试 - 阶段/文档超时、恢复回调、中断卡住的主线程、迟到的中断和用户 Ctrl-C 的区分，以及取消文档
+"""
+
+import _thread
+import time
+
+import pytest
+
+from export_watchdog import DocumentCancelledError, ExportWatchdog, StageTimeoutError
+
+
+def make_watchdog(**options):
+    resets = []
+    watchdog = ExportWatchdog(**dict(dict(document_timeout=5, stage_timeouts={'render': 0.2, 'print': 0.2},
+                                          on_timeout=resets.append, interrupt_grace=0.2, poll_interval=0.02),
+                                     **options))
+    watchdog.start()
+    return watchdog, resets
+
+
+def test_stage_timeout_runs_recovery_and_raises():
+    watchdog, resets = make_watchdog()
+    try:
+        watchdog.start_document("u1")
+        with pytest.raises(StageTimeoutError) as error:
+            with watchdog.stage('render'):
+                time.sleep(0.5)
+        assert (error.value.stage, error.value.scope) == ('render', 'stage')
+        assert resets == ['render']
+
+        with watchdog.stage('render'):
+            time.sleep(0.01)
+        watchdog.finish_document()
+        assert watchdog.get_stats()['timeouts'] == 1
+    finally:
+        watchdog.stop()
+
+
+def test_stuck_main_thread_is_interrupted():
+    watchdog, resets = make_watchdog()
+    try:
+        watchdog.start_document("u1")
+        with pytest.raises(StageTimeoutError):
+            with watchdog.stage('print'):
+                while True:          # 恢复回调无法让它退出（如卡在键盘操作上）
+                    pass
+        assert resets == ['print']
+    finally:
+        watchdog.stop()
+
+
+def test_late_watchdog_interrupt_is_ignored_but_ctrl_c_is_not():
+    watchdog, _ = make_watchdog()
+    try:
+        with watchdog.stage('print'):
+            pass
+        # 看门狗在阶段结束前决定中断，信号在阶段结束后才送达
+        with watchdog._lock:
+            watchdog._interrupt_pending = True
+            _thread.interrupt_main()
+        time.sleep(0.05)
+
+        with pytest.raises(KeyboardInterrupt):
+            _thread.interrupt_main()
+            time.sleep(0.05)
+    finally:
+        watchdog.stop()
+
+
+def test_document_deadline_applies_between_stages():
+    watchdog, resets = make_watchdog(document_timeout=0.2)
+    try:
+        watchdog.start_document("u1")
+        with watchdog.stage('render'):
+            pass
+        time.sleep(0.4)              # 阶段之外卡住
+        assert resets == ['render']
+
+        with pytest.raises(StageTimeoutError) as error:
+            with watchdog.stage('print'):
+                pass
+        assert error.value.scope == 'document'
+        watchdog.finish_document()
+    finally:
+        watchdog.stop()
+
+
+def test_cancelled_document_stops_at_next_stage():
+    cancelled = set()
+    watchdog, resets = make_watchdog(is_cancelled=lambda url: "租约已丢失" if url in cancelled else None)
+    try:
+        watchdog.start_document("u1")
+        with watchdog.stage('render'):
+            cancelled.add("u1")          # 正在执行的阶段不会被打断
+        with pytest.raises(DocumentCancelledError) as error:
+            with watchdog.stage('print'):
+                pass
+        assert (error.value.url, error.value.reason) == ("u1", "租约已丢失")
+        watchdog.finish_document()
+
+        watchdog.start_document("u2")
+        with watchdog.stage('print'):
+            pass
+        watchdog.finish_document()
+        assert resets == [] and watchdog.get_stats()['timeouts'] == 0
+    finally:
+        watchdog.stop()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量导出测试 - 按文档数和浏览器内存回收浏览器、多标签页模式下超时的文档
+"""
+
+from export_watchdog import StageTimeoutError
+from feishu_batch_export import FeishuBatchExporter
+from work_queue import LocalLinkQueue
+
+
+def make_exporter(tmp_path, rss_mb, **options):
+    exporter = FeishuBatchExporter("links.txt", str(tmp_path / "exports"), block_requests=False,
+                                   verify_exports=False, **options)
+    exporter.get_browser_rss_mb = lambda: rss_mb
+    return exporter
+
+
+def test_recycles_after_document_count(tmp_path):
+    exporter = make_exporter(tmp_path, 100, recycle_after_docs=3)
+
+    exporter.docs_since_restart = 2
+    assert exporter.should_recycle_browser() is None
+    exporter.docs_since_restart = 3
+    assert "3 个文档" in exporter.should_recycle_browser()
+
+    exporter.recycle_after_docs = 0           # 0 表示不按数量回收
+    exporter.docs_since_restart = 1000
+    assert exporter.should_recycle_browser() is None
+
+
+def test_recycles_when_browser_memory_exceeds_threshold(tmp_path):
+    exporter = make_exporter(tmp_path, 1500, recycle_after_docs=0, max_browser_rss_mb=2048)
+    assert exporter.should_recycle_browser() is None
+
+    exporter.get_browser_rss_mb = lambda: 2100
+    assert "2100MB" in exporter.should_recycle_browser()
+    assert exporter.peak_browser_rss_mb == 2100
+
+    exporter.max_browser_rss_mb = 0          # 0 表示不限制内存
+    assert exporter.should_recycle_browser() is None
+
+    exporter.max_browser_rss_mb = 2048
+    exporter.get_browser_rss_mb = lambda: None   # 无法统计内存（未安装psutil）时不回收
+    assert exporter.should_recycle_browser() is None
+    assert exporter.peak_browser_rss_mb == 2100
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def new_window(self, kind):
+        self.driver.opened += 1
+        self.driver.current_window_handle = f"tab-{self.driver.opened}"
+        self.driver.window_handles.append(self.driver.current_window_handle)
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+
+class FakeDriver:
+    def __init__(self):
+        self.opened = 1
+        self.window_handles = ["tab-1"]
+        self.current_window_handle = "tab-1"
+        self.switch_to = FakeSwitchTo(self)
+        self.closed = []
+
+    def execute_script(self, script, *args):
+        return True          # 页面立即加载完成
+
+    def execute_cdp_cmd(self, command, params):
+        if command == 'Target.closeTarget':
+            self.window_handles.remove(params['targetId'])
+            self.closed.append(params['targetId'])
+
+
+def test_tab_timeout_with_live_browser_replaces_only_that_tab(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    exporter = make_exporter(tmp_path, None, concurrency_mode="tabs", tab_count=2, delay=0, recycle_after_docs=0)
+    exporter.driver = FakeDriver()
+    restarts = []
+    exporter.restart_chrome_driver = lambda reason: restarts.append(reason) or True
+
+    def export_loaded_document(url):
+        if url == "slow":
+            # 看门狗超时，但结束浏览器进程失败，浏览器仍可响应
+            raise StageTimeoutError('print', 60)
+        exporter.processed_links.append(url)
+        return 'success'
+    exporter.export_loaded_document = export_loaded_document
+
+    exporter.export_with_tabs(LocalLinkQueue(["a", "slow", "b", "c"]), 4)
+
+    assert exporter.processed_links == ["a", "b", "c"]
+    assert exporter.failed_links == ["slow"]
+    assert [t['url'] for t in exporter.timed_out_links] == ["slow"]
+    assert restarts == [] and len(exporter.driver.closed) == 1
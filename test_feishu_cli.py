@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统一命令行测试 - 配置合并顺序和延迟导入
+"""
+
+import json
+import subprocess
+import sys
+
+from feishu_cli import build_parser, load_config, resolve_options
+
+
+def test_flags_override_config_sections(tmp_path):
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({
+        "download_dir": "./out",
+        "delay": 5,
+        "export": {"concurrency_mode": "tabs", "tab_count": 4},
+        "merge": {"folder": "./merged"},
+    }), encoding="utf-8")
+
+    args = build_parser().parse_args(["--config", str(config_file), "export", "--tab-count", "6", "--no-preflight"])
+    options = resolve_options(args, load_config(args.config))
+
+    assert options["links_file"] == "feishu_links.txt"
+    assert options["download_dir"] == "./out"
+    assert options["delay"] == 5
+    assert options["concurrency_mode"] == "tabs"
+    assert options["tab_count"] == 6
+    assert options["preflight"] is False
+    assert "folder" not in options and "merge" not in options
+
+
+def test_help_does_not_import_heavy_dependencies():
+    code = ("import sys, feishu_cli\n"
+            "try:\n"
+            "    feishu_cli.main(['export', '--help'])\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "heavy = [m for m in ('selenium', 'pyautogui', 'webdriver_manager', 'aiohttp', 'PyPDF2') if m in sys.modules]\n"
+            "print('heavy=' + ','.join(heavy))\n")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.splitlines()[-1] == "heavy="
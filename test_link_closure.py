@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链接闭包测试 - 深度限制、域名白名单，以及按内容哈希跳过已扫描的文件
+"""
+
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import AnnotationBuilder
+
+from export_state import ExportStateStore
+from link_closure import LinkClosure
+
+A = "https://team.feishu.cn/docx/AAA"
+B = "https://team.feishu.cn/docx/BBB"
+C = "https://team.feishu.cn/wiki/CCC"
+
+
+def make_linked_pdf(path, urls):
+    writer = PdfWriter()
+    writer.add_blank_page(300, 300)
+    for index, url in enumerate(urls):
+        writer.add_annotation(0, AnnotationBuilder.link(rect=(10, 10 + index * 20, 200, 25 + index * 20), url=url))
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_closure_follows_new_links_within_depth_and_domains(tmp_path):
+    state = ExportStateStore(str(tmp_path / "state.db"))
+    discovered = []
+    closure = LinkClosure([A], state, max_depth=1, on_discovered=lambda found, depth: discovered.extend(found))
+
+    closure.submit(A, [make_linked_pdf(tmp_path / "a.pdf", [
+        A + "?from=wiki#section",               # 自身（规范化后相同）
+        B + "/",
+        "https://example.com/docx/XYZ",        # 不在白名单中的域名
+        "https://www.baidu.com/",
+    ])])
+    closure.wait_idle()
+    assert discovered == [B]
+
+    # B 是第1层，从它发现的 C 是第2层，超出深度
+    closure.submit(B, [make_linked_pdf(tmp_path / "b.pdf", [A, C])])
+    closure.wait_idle()
+    closure.close()
+    assert discovered == [B]
+    assert closure.get_stats()["beyond_depth"] == 1
+
+
+def test_depth_from_shared_queue_overrides_local_depth(tmp_path):
+    # B 由其他进程发现（共享队列记录为第1层），本进程领取后不会从第0层重新计算
+    closure = LinkClosure([A], ExportStateStore(str(tmp_path / "state.db")), max_depth=1)
+    assert closure.scan(B, [make_linked_pdf(tmp_path / "b.pdf", [C])], depth=1) == []
+    assert closure.get_stats()["beyond_depth"] == 1
+
+
+def test_files_with_scanned_content_are_not_parsed_again(tmp_path):
+    state = ExportStateStore(str(tmp_path / "state.db"))
+    first = make_linked_pdf(tmp_path / "a.pdf", [B])
+    copy = tmp_path / "a (2).pdf"
+    copy.write_bytes(open(first, "rb").read())
+
+    LinkClosure([A], state).scan(A, [first])
+
+    closure = LinkClosure([A], state)
+    assert closure.scan(A, [str(copy)]) == [B]
+    assert (closure.files_scanned, closure.files_reused) == (0, 1)
+    closure.close()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链接预检测试 - 使用本地HTTP服务模拟飞书页面
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from link_preflight import (
+    LinkPreflightChecker,
+    STATUS_ERROR,
+    STATUS_LOGIN_REQUIRED,
+    STATUS_NOT_FOUND,
+    STATUS_REACHABLE,
+    STATUS_REDIRECT,
+)
+
+# 路径 -> (状态码, 跳转地址)
+ROUTES = {
+    "/wiki/ok": (200, None),
+    "/wiki/moved": (302, "/wiki/new"),
+    "/wiki/new": (200, None),
+    "/wiki/private": (302, "/accounts/page/login?redirect_uri=/wiki/private"),
+    "/accounts/page/login": (200, None),
+    "/wiki/forbidden": (403, None),
+    "/wiki/flaky": (503, None),
+}
+
+
+class FakeFeishuHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, location = ROUTES.get(self.path.split('?')[0].rstrip('/'), (404, None))
+        self.send_response(status)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_checker(paths):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeFeishuHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        checker = LinkPreflightChecker(concurrency=4, timeout=5)
+        return base, checker.check_links([base + path for path in paths])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_classifies_links():
+    base, results = run_checker(["/wiki/ok", "/wiki/moved", "/wiki/private", "/wiki/forbidden", "/wiki/missing"])
+    statuses = [result['status'] for result in results]
+
+    assert statuses == [STATUS_REACHABLE, STATUS_REDIRECT, STATUS_LOGIN_REQUIRED,
+                        STATUS_LOGIN_REQUIRED, STATUS_NOT_FOUND]
+    assert results[1]['final_url'] == base + "/wiki/new"
+
+
+def test_exportable_links_deduplicates_redirect_targets():
+    base, results = run_checker(["/wiki/new", "/wiki/moved", "/wiki/ok/", "/wiki/missing"])
+
+    assert LinkPreflightChecker.exportable_links(results) == [base + "/wiki/new", base + "/wiki/ok/"]
+
+
+def test_check_errors_are_kept_as_unverified():
+    base, results = run_checker(["/wiki/flaky", "/wiki/private", "/wiki/missing"])
+
+    assert [result['status'] for result in results] == [STATUS_ERROR, STATUS_LOGIN_REQUIRED, STATUS_NOT_FOUND]
+    assert LinkPreflightChecker.exportable_links(results) == [base + "/wiki/flaky"]
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量合并测试 - 只重新解析修改过的文件，页面顺序、目录、文档内链接和共享图片与完整重建一致
+"""
+
+import os
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, NameObject, NumberObject,
+                            create_string_object)
+
+import merge_pdfs as merge_pdfs_module
+from merge_pdfs import OUTPUT_NAME, IncrementalPdfMerger, merge_pdfs
+from test_pdf_search_index import make_text_pdf
+
+
+def merged(folder):
+    reader = PdfReader(os.path.join(folder, OUTPUT_NAME), strict=True)
+    texts = [page.extract_text().strip() for page in reader.pages]
+    titles = [(item.title, reader.get_destination_page_number(item))
+              for item in reader.outline if not isinstance(item, list)]
+    return texts, titles
+
+
+def test_only_changed_documents_are_parsed_again(tmp_path, capsys):
+    folder = str(tmp_path)
+    make_text_pdf(str(tmp_path / "b.pdf"), ["b1", "b2"])
+    make_text_pdf(str(tmp_path / "c.pdf"), ["c1"])
+    make_text_pdf(str(tmp_path / "选调面试总览.pdf"), ["z1"])
+    merge_pdfs(folder)
+    assert merged(folder) == (["z1", "b1", "b2", "c1"], [("选调面试总览", 0), ("b", 1), ("c", 3)])
+
+    make_text_pdf(str(tmp_path / "b.pdf"), ["B1"])
+    make_text_pdf(str(tmp_path / "a.pdf"), ["a1"])
+    os.remove(tmp_path / "c.pdf")
+    capsys.readouterr()
+    merge_pdfs(folder)
+
+    out = capsys.readouterr().out
+    assert "增量重建：解析 2 个，复用 1 个，移除 1 个" in out
+    # 合并文件本身不作为输入
+    assert OUTPUT_NAME not in out.split("✅")[0]
+    assert merged(folder) == (["z1", "a1", "B1"], [("选调面试总览", 0), ("a", 1), ("b", 2)])
+
+
+def test_source_bookmarks_become_children(tmp_path):
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(200, 200)
+    chapter = writer.add_outline_item("第一章", 1)
+    writer.add_outline_item("第一节", 2, parent=chapter)
+    with open(tmp_path / "b.pdf", "wb") as f:
+        writer.write(f)
+    make_text_pdf(str(tmp_path / "a.pdf"), ["a1"])
+
+    merge_pdfs(str(tmp_path))
+
+    reader = PdfReader(str(tmp_path / OUTPUT_NAME))
+    outline = reader.outline
+    assert [item.title for item in outline if not isinstance(item, list)] == ["a", "b"]
+    chapter, section = outline[2][0], outline[2][1][0]
+    assert (chapter.title, reader.get_destination_page_number(chapter)) == ("第一章", 2)
+    assert (section.title, reader.get_destination_page_number(section)) == ("第一节", 3)
+
+
+def test_named_destinations_resolve_to_merged_pages(tmp_path):
+    writer = PdfWriter()
+    for _ in range(2):
+        writer.add_blank_page(200, 200)
+    writer.add_named_destination("第二页", 1)
+    link = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Annot"),
+        NameObject("/Subtype"): NameObject("/Link"),
+        NameObject("/Rect"): ArrayObject([NumberObject(0), NumberObject(0), NumberObject(50), NumberObject(50)]),
+        NameObject("/Dest"): create_string_object("第二页"),
+    }))
+    writer.pages[0][NameObject("/Annots")] = ArrayObject([link])
+    with open(tmp_path / "b.pdf", "wb") as f:
+        writer.write(f)
+    make_text_pdf(str(tmp_path / "a.pdf"), ["a1"])
+
+    merge_pdfs(str(tmp_path))
+
+    reader = PdfReader(str(tmp_path / OUTPUT_NAME), strict=True)
+    dest = reader.pages[1]["/Annots"][0].get_object()["/Dest"]
+    assert dest[0].idnum == reader.pages[2].indirect_reference.idnum
+
+
+def test_page_labels_follow_each_document(tmp_path):
+    make_text_pdf(str(tmp_path / "a.pdf"), ["a1", "a2"])
+    writer = PdfWriter()
+    for _ in range(2):
+        writer.add_blank_page(200, 200)
+    writer._root_object[NameObject("/PageLabels")] = DictionaryObject({NameObject("/Nums"): ArrayObject([
+        NumberObject(0), DictionaryObject({NameObject("/S"): NameObject("/r")}),
+    ])})
+    with open(tmp_path / "b.pdf", "wb") as f:
+        writer.write(f)
+
+    merge_pdfs(str(tmp_path))
+
+    nums = PdfReader(str(tmp_path / OUTPUT_NAME)).trailer["/Root"]["/PageLabels"]["/Nums"]
+    assert [(start, dict(label)) for start, label in zip(nums[::2], nums[1::2])] == [(0, {"/S": "/D"}),
+                                                                                     (2, {"/S": "/r"})]
+
+
+def make_image_pdf(path, pixels):
+    """每页一张 1x1 灰度图片，pixels 为每页的像素值"""
+    writer = PdfWriter()
+    for value in pixels:
+        writer.add_blank_page(100, 100)
+        image = DecodedStreamObject()
+        image.set_data(bytes([value]))
+        image.update({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(1),
+            NameObject("/Height"): NumberObject(1),
+            NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+            NameObject("/BitsPerComponent"): NumberObject(8),
+        })
+        content = DecodedStreamObject()
+        content.set_data(b"q 100 0 0 100 0 0 cm /Im0 Do Q")
+        page = writer.pages[-1]
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): writer._add_object(image)}),
+        })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_image_pool_is_shared_and_reused_after_removal(tmp_path):
+    folder = str(tmp_path)
+    make_image_pdf(str(tmp_path / "a.pdf"), [1, 2])
+    make_image_pdf(str(tmp_path / "b.pdf"), [1])
+    merger = IncrementalPdfMerger(folder)
+    stats = merger.merge(["a.pdf", "b.pdf"])
+    assert (stats['images'], stats['unique_images']) == (3, 2)
+    pool_size = os.path.getsize(merger.pool_path)
+
+    # a.pdf 移除后 b.pdf 直接复用图片池中的图片，重新加入 a.pdf 时也不再追加
+    merger = IncrementalPdfMerger(folder)
+    assert merger.merge(["b.pdf"])['reused'] == 1
+    merger = IncrementalPdfMerger(folder)
+    stats = merger.merge(["a.pdf", "b.pdf"])
+    assert (stats['parsed'], stats['reused']) == (1, 1)
+    assert os.path.getsize(merger.pool_path) == pool_size
+
+    reader = PdfReader(os.path.join(folder, OUTPUT_NAME), strict=True)
+    images = [page["/Resources"]["/XObject"].raw_get("/Im0") for page in reader.pages]
+    assert images[0].idnum == images[2].idnum != images[1].idnum
+    assert [image.get_object().get_data() for image in images] == [b"\x01", b"\x02", b"\x01"]
+
+
+def test_stale_cache_triggers_full_rebuild(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    make_image_pdf(str(tmp_path / "a.pdf"), [1, 2, 3])
+    make_image_pdf(str(tmp_path / "b.pdf"), [4])
+    IncrementalPdfMerger(folder).merge(["a.pdf", "b.pdf"])
+
+    merger = IncrementalPdfMerger(folder)
+    merger.manifest = merger._load_manifest()
+    assert not merger._needs_compaction(["a.pdf", "b.pdf"])
+    # 只剩 b.pdf 时，图片池中 a.pdf 的图片和释放的对象编号都已失效
+    monkeypatch.setattr(merge_pdfs_module, "COMPACT_SLACK_NUMBERS", 0)
+    monkeypatch.setattr(merge_pdfs_module, "COMPACT_SLACK_BYTES", 0)
+    assert merger._needs_compaction(["b.pdf"])
+
+    stats = IncrementalPdfMerger(folder).merge(["b.pdf"])
+    assert stats['full_rebuild'] and stats['parsed'] == 1
+    # 重建后图片池只保存 b.pdf 的图片
+    merger = IncrementalPdfMerger(folder)
+    [(number, offset, length)] = merger._load_manifest()['images'].values()
+    assert (offset, length) == (0, os.path.getsize(merger.pool_path))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全文检索测试 - 中英文分词、倒排列表编码、增量更新和查询
+"""
+
+import os
+
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from pdf_search_index import PdfSearchIndex, decode_postings, encode_postings, tokenize
+
+
+def make_text_pdf(path, pages):
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for text in pages:
+        writer.add_blank_page(300, 300)
+        page = writer.pages[-1]
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 20 200 Td ({text}) Tj ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_tokenize_and_postings_roundtrip():
+    assert tokenize("飞书导出 Hello PyPDF2，的") == ["飞书", "书导", "导出", "hello", "pypdf2", "的"]
+    entries = [(0, 1), (5, 300), (1000, 2)]
+    assert decode_postings(encode_postings(entries)) == entries
+
+
+def test_incremental_update_and_search(tmp_path):
+    folder = tmp_path / "exports"
+    folder.mkdir()
+    make_text_pdf(str(folder / "interview.pdf"), ["structured interview notes", "policy analysis checklist"])
+    make_text_pdf(str(folder / "policy.pdf"), ["policy briefing"])
+    make_text_pdf(str(folder / "all_合并.pdf"), ["policy analysis checklist"])
+
+    index = PdfSearchIndex(str(tmp_path / "index.db"))
+    stats = index.update(str(folder), workers=2)
+    assert (stats['added'], stats['documents'], stats['pages']) == (2, 2, 3)
+
+    results = index.search("Policy Analysis")
+    assert [(r['title'], r['page']) for r in results] == [("interview", 2)]
+    assert "【policy analysis】" in results[0]['snippet']
+    assert {r['title'] for r in index.search("policy")} == {"interview", "policy"}
+
+    os.remove(str(folder / "policy.pdf"))
+    make_text_pdf(str(folder / "interview.pdf"), ["group discussion"])
+    stats = index.update(str(folder), workers=1)
+    assert (stats['updated'], stats['removed'], stats['unchanged']) == (1, 1, 0)
+    assert index.search("policy") == []
+    assert index.search("discussion")[0]['page'] == 1
+    assert index.update(str(folder))['unchanged'] == 1
+    index.close()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进度汇总测试 - 多个工作进程批量发送事件，汇总服务通过 /status 提供总进度
+"""
+
+import json
+import time
+from urllib import request as urllib_request
+
+from progress_hub import ProgressAggregator, ProgressPublisher
+
+
+def test_aggregates_workers_over_status_endpoint():
+    aggregator = ProgressAggregator("127.0.0.1", 0, 0).start()
+    try:
+        workers = [ProgressPublisher(aggregator.event_address, f"worker-{i}", flush_interval=0.05)
+                   for i in range(2)]
+        for index, publisher in enumerate(workers):
+            publisher.publish('start', 150)
+            for doc in range(150):
+                publisher.publish('doc', f"https://example.feishu.cn/docx/{index}-{doc}", doc != 7, "" if doc != 7 else "超时")
+                publisher.set_counters(150, doc + (doc < 7), int(doc >= 7))
+        workers[1].publish('tab', 2, "打印中", "https://example.feishu.cn/docx/next")
+        for publisher in workers:
+            publisher.close()
+
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            with urllib_request.urlopen(aggregator.url + "/status", timeout=5) as response:
+                status = json.loads(response.read())
+            if status['totals']['succeeded'] + status['totals']['failed'] == 300:
+                break
+            time.sleep(0.05)
+
+        assert status['totals'] == {'total': 300, 'succeeded': 298, 'failed': 2, 'remaining': 0, 'percent': 100.0}
+        assert status['rates']['docs_per_min_1m'] == 300.0
+        assert status['workers']['worker-1']['tabs']['2']['status'] == "打印中"
+        assert status['workers']['worker-0']['lost_batches'] == 0
+        assert [error['error'] for error in status['recent_errors']] == ["超时", "超时"]
+    finally:
+        aggregator.stop()
+
+
+def test_lost_datagrams_do_not_undercount():
+    aggregator = ProgressAggregator("127.0.0.1", 0, 0).start()
+    try:
+        counters = lambda succeeded, failed: {'total': 10, 'processed': succeeded + failed,
+                                              'succeeded': succeeded, 'failed': failed}
+        aggregator.apply("w", 1, [['start', 0, 10]], counters(0, 0))
+        # 第2、3个数据报丢失，第5个先于第4个到达
+        aggregator.apply("w", 5, [['doc', 0, "u9", False, "超时"]], counters(8, 1))
+        aggregator.apply("w", 4, [['doc', 0, "u8", True, ""]], counters(7, 1))
+
+        totals = aggregator.snapshot()['totals']
+        assert totals == {'total': 10, 'succeeded': 8, 'failed': 1, 'remaining': 1, 'percent': 90.0}
+        assert aggregator.snapshot()['rates']['docs_per_min_1m'] == 9.0
+        assert aggregator.snapshot()['workers']['w']['lost_batches'] == 3
+    finally:
+        aggregator.stop()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求屏蔽测试 - 默认规则只屏蔽与PDF无关的请求，统计来自performance日志
+"""
+
+import json
+
+from request_blocker import ESTIMATED_BYTES, RequestBlocker
+
+
+def test_default_patterns_spare_document_content():
+    blocker = RequestBlocker()
+
+    for url in [
+        "https://mcs.zijieapi.com/list",
+        "https://www.google-analytics.com/collect?v=1",
+        "https://s1-imfile.feishucdn.com/static-resource/avatar/abc~72x72.image",
+        "https://cdn.example.com/intro.mp4",
+        "https://cdn.example.com/intro.mov?token=1",
+    ]:
+        assert blocker.blocks(url), url
+
+    for url in [
+        "https://example.feishu.cn/docx/AvatarDesign",
+        "https://internal-api-drive-stream.feishu.cn/space/api/box/stream/download/preview/avatar_guide.png",
+        "https://cdn.example.com/movement.js",
+        "https://example.mov.example.com/docx/abc",
+        "https://cdn.example.com/app.css",
+    ]:
+        assert not blocker.blocks(url), url
+
+
+def test_collects_blocked_requests_from_performance_log():
+    def entry(method, **params):
+        return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+    blocker = RequestBlocker()
+    blocker.collect(None, [
+        entry('Network.requestWillBeSent', requestId="1", type="Media"),
+        entry('Network.loadingFailed', requestId="1", blockedReason="inspector"),
+        entry('Network.requestWillBeSent', requestId="2", type="Script"),
+        entry('Network.loadingFinished', requestId="2", encodedDataLength=1500),
+        entry('Network.loadingFailed', requestId="3", type="XHR", errorText="net::ERR_ABORTED"),
+    ])
+
+    assert blocker.get_stats() == {
+        'blocked_requests': 1,
+        'blocked_by_type': {'Media': 1},
+        'estimated_bytes_saved': ESTIMATED_BYTES['Media'],
+        'transferred_bytes': 1500,
+    }
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排程测试 - 历史耗时估计和最长优先排序
+"""
+
+from export_state import ExportStateStore
+from scheduler import MakespanScheduler, longest_first, pack
+
+
+def record(store, run_id, url, seconds):
+    attempt_id = store.start_attempt(run_id, url)
+    with store.transaction() as conn:
+        conn.execute("UPDATE attempts SET started_at = started_at - ? WHERE id = ?", (seconds, attempt_id))
+    store.finish_attempt(attempt_id, 'success')
+
+
+def test_history_drives_longest_first_order(tmp_path):
+    store = ExportStateStore(str(tmp_path / "state.db"))
+    run_id = store.start_run(3)
+    record(store, run_id, "https://x.feishu.cn/docx/small", 5)
+    record(store, run_id, "https://x.feishu.cn/docx/giant?from=home", 300)
+
+    links = ["https://x.feishu.cn/docx/small", "https://x.feishu.cn/sheets/unknown", "https://x.feishu.cn/docx/giant"]
+    scheduler = MakespanScheduler(store, workers=2)
+    ordered = scheduler.plan(links)
+
+    assert ordered == ["https://x.feishu.cn/docx/giant", "https://x.feishu.cn/sheets/unknown",
+                       "https://x.feishu.cn/docx/small"]
+    assert scheduler.model.sources["https://x.feishu.cn/docx/giant"] == "history"
+    assert scheduler.model.sources["https://x.feishu.cn/sheets/unknown"] == "default"
+    assert scheduler.plan_stats["estimated_makespan_s"] == scheduler.plan_stats["lower_bound_s"]
+
+
+def test_lpt_beats_file_order():
+    estimates = {"a": 1, "b": 1, "c": 1, "d": 1, "e": 4}
+    scheduler = MakespanScheduler(workers=2)
+
+    assert scheduler.simulate(list(estimates), estimates) == 6
+    assert scheduler.simulate(longest_first(list(estimates), estimates), estimates) == 4
+    assert sorted(map(len, pack(list(estimates), estimates, 2))) == [1, 4]
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+边导出边合并测试 - 乱序完成时保持链接顺序，并生成目录
+"""
+
+from PyPDF2 import PdfReader, PdfWriter
+
+from streaming_merge import StreamingMerger
+
+
+def make_pdf(path, pages):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(100 + pages, 100)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def test_out_of_order_completion_keeps_link_order(tmp_path):
+    def pdf(title, pages):
+        return [make_pdf(str(tmp_path / f"{title}.pdf"), pages)]
+
+    merger = StreamingMerger(str(tmp_path / "merged.pdf"), ["u0", "u1", "u2", "u3", "u4"], window=2)
+    merger.add("u2", pdf("第三篇", 3))
+    merger.add("u3", pdf("第四篇", 1))
+    assert merger.pending == {2: ("u2", [str(tmp_path / "第三篇.pdf")]), 3: ("u3", [str(tmp_path / "第四篇.pdf")])}
+    merger.add("u4", pdf("第五篇", 2))   # 缓冲区已满：第三篇提前按位置插入
+    merger.add("u0", pdf("第一篇", 1))
+    merger.skip("u1")
+    merger.add("https://other", pdf("队列文档", 1))
+
+    output = merger.finish()
+    reader = PdfReader(output)
+
+    assert [int(page.mediabox.width) for page in reader.pages] == [101, 103, 103, 103, 101, 102, 102, 101]
+    assert [(item.title, reader.get_destination_page_number(item)) for item in reader.outline] == [
+        ("第一篇", 0), ("第三篇", 1), ("第四篇", 4), ("第五篇", 5), ("队列文档", 7)]
+    assert merger.get_stats()["out_of_order_inserts"] == 1
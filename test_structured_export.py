@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结构化导出测试 - 文档块转换为Markdown/HTML，图片经资源库引用
+"""
+
+import base64
+
+from asset_store import AssetStore
+from structured_export import StructuredExporter, render_html, render_markdown
+
+BLOCKS = [
+    {"type": "page", "depth": 0, "quote": False, "runs": [{"text": "周报"}]},
+    {"type": "heading2", "depth": 0, "quote": False, "runs": [{"text": "进展"}]},
+    {"type": "text", "depth": 0, "quote": False, "runs": [
+        {"text": "完成 "}, {"text": "导出", "bold": True}, {"text": " 和 "},
+        {"text": "文档", "href": "https://example.feishu.cn/docx/abc"}]},
+    {"type": "bullet", "depth": 0, "quote": False, "runs": [{"text": "第一项"}]},
+    {"type": "ordered", "depth": 1, "quote": False, "runs": [{"text": "子项 a_b"}]},
+    {"type": "todo", "depth": 0, "quote": False, "checked": True, "runs": [{"text": "已完成"}]},
+    {"type": "code", "depth": 0, "quote": False, "language": "python", "text": "print('hi')\n"},
+    {"type": "quote_container", "depth": 0, "quote": False, "runs": []},
+    {"type": "text", "depth": 0, "quote": True, "runs": [{"text": "引用 <b>"}]},
+    {"type": "image", "depth": 0, "quote": False, "src": "周报_files/abc.png", "alt": ""},
+    {"type": "table", "depth": 0, "quote": False, "rows": [["名称", "数量"], ["a|b", "2"]]},
+]
+
+
+def test_render_markdown():
+    markdown = render_markdown("周报", BLOCKS)
+
+    assert markdown.startswith("# 周报\n")
+    assert "## 进展" in markdown
+    assert "完成 **导出** 和 [文档](https://example.feishu.cn/docx/abc)" in markdown
+    assert "- 第一项\n    1. 子项 a\\_b\n- [x] 已完成\n" in markdown
+    assert "```python\nprint('hi')\n```" in markdown
+    assert "> 引用 <b>" in markdown
+    assert "![](周报_files/abc.png)" in markdown
+    assert "| 名称 | 数量 |\n| --- | --- |\n| a\\|b | 2 |" in markdown
+
+
+def test_render_html_nests_lists_and_escapes_text():
+    page = render_html("周报", BLOCKS, source_url="https://example.feishu.cn/docx/abc")
+
+    assert "<h2>进展</h2>" in page
+    assert "<ul>\n<li>第一项</li>\n<ol>\n<li>子项 a_b</li>\n</ol>\n<li class=\"todo\">" in page
+    assert "<blockquote>\n<p>引用 &lt;b&gt;</p>\n</blockquote>" in page
+    assert '<img src="周报_files/abc.png" alt="">' in page
+    assert "<th>名称</th>" in page
+
+
+class FakeDriver:
+    def __init__(self, data):
+        self.data = data
+        self.fetches = 0
+
+    def execute_async_script(self, script, src):
+        self.fetches += 1
+        return {"data": base64.b64encode(self.data).decode(), "type": "image/png"}
+
+
+def test_images_from_asset_store_count_as_written(tmp_path):
+    store = AssetStore(str(tmp_path / "assets"))
+    exporter = StructuredExporter(str(tmp_path / "out"), asset_store=store)
+    driver = FakeDriver(b"png" * 100)
+
+    first = exporter.save_image(driver, "https://example.feishu.cn/img/1", "周报")
+    second = exporter.save_image(driver, "https://example.feishu.cn/img/1", "月报")   # 资源库中已有，不再下载
+
+    assert driver.fetches == 1
+    assert first.startswith("周报_files/") and second.startswith("月报_files/")
+    assert exporter.bytes_written == 600
+
+
+class PageDriver:
+    """返回固定文档块的驱动"""
+
+    def __init__(self, title):
+        self.title = title
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script, *args):
+        return {"title": "", "blocks": [
+            {"type": "page", "depth": 0, "quote": False, "runs": [{"text": self.title}]},
+            {"type": "text", "depth": 0, "quote": False, "runs": [{"text": "正文"}]},
+        ]}
+
+
+def test_same_title_never_overwrites_existing_documents(tmp_path):
+    (tmp_path / "周报.md").write_text("上一次运行导出的周报", encoding="utf-8")
+    exporter = StructuredExporter(str(tmp_path))
+
+    first = exporter.export(PageDriver("周报"), "https://example.feishu.cn/docx/a")
+    second = exporter.export(PageDriver("周报"), "https://example.feishu.cn/docx/b")
+
+    assert [p.rsplit("/", 1)[-1] for p in (first, second)] == ["周报 (1).md", "周报 (2).md"]
+    assert (tmp_path / "周报.md").read_text(encoding="utf-8") == "上一次运行导出的周报"
+    assert "正文" in (tmp_path / "周报 (2).md").read_text(encoding="utf-8")
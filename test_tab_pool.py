@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标签页池测试 - 分配/释放、加载超时和崩溃的标签页、替换标签页
+"""
+
+from tab_pool import TabPool
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def new_window(self, kind):
+        self.driver.opened += 1
+        handle = f"tab-{self.driver.opened}"
+        self.driver.handles.append(handle)
+        self.driver.current_window_handle = handle
+
+    def window(self, handle):
+        if handle not in self.driver.handles:
+            raise RuntimeError(f"no such window: {handle}")
+        self.driver.current_window_handle = handle
+
+
+class FakeDriver:
+    def __init__(self):
+        self.opened = 1
+        self.handles = ["tab-1"]
+        self.current_window_handle = "tab-1"
+        self.switch_to = FakeSwitchTo(self)
+        self.ready = set()       # 已加载完成的句柄
+        self.crashed = set()     # 执行脚本时报错的句柄
+        self.closed = []
+        self.cdp_fails = False
+
+    def execute_script(self, script, *args):
+        handle = self.current_window_handle
+        if handle in self.crashed:
+            raise RuntimeError("tab crashed")
+        if args:
+            return None
+        return handle in self.ready
+
+    def execute_cdp_cmd(self, command, params):
+        if self.cdp_fails:
+            raise RuntimeError("cdp unavailable")
+        if command == 'Target.closeTarget':
+            self.handles.remove(params['targetId'])
+            self.closed.append(params['targetId'])
+
+    def close(self):
+        self.handles.remove(self.current_window_handle)
+        self.closed.append(self.current_window_handle)
+
+
+def make_pool(**options):
+    driver = FakeDriver()
+    initialized = []
+    pool = TabPool(driver, on_new_tab=lambda: initialized.append(driver.current_window_handle),
+                   **dict(dict(size=3, load_timeout=60, settle_delay=0), **options))
+    pool.open()
+    return pool, driver, initialized
+
+
+def test_assign_poll_and_release():
+    pool, driver, initialized = make_pool()
+    assert [tab.handle for tab in pool.tabs] == ["tab-1", "tab-2", "tab-3"]
+    assert initialized == ["tab-2", "tab-3"]
+
+    first, second = pool.idle_tabs()[:2]
+    pool.assign(first, "u1")
+    pool.assign(second, "u2", settle_delay=3600)
+    assert pool.busy_tabs() == [first, second]
+    assert pool.in_flight_urls() == ["u1", "u2"]
+
+    driver.ready.update({first.handle, second.handle})
+    assert pool.poll() == []
+    assert (first.state, second.state) == ('ready', 'ready')
+    assert pool.next_printable() is first   # second 还在等待自己的渲染时间
+
+    pool.activate(first)
+    assert first.state == 'printing' and driver.current_window_handle == first.handle
+    pool.release(first)
+    assert (first.state, first.url, first.settle_delay) == ('idle', None, None)
+    assert pool.in_flight_urls() == ["u2"]
+
+
+def test_hung_and_crashed_tabs_are_reported():
+    pool, driver, _ = make_pool(load_timeout=10)
+    slow, crashed, loading = pool.tabs
+    for tab, url in zip(pool.tabs, ("u1", "u2", "u3")):
+        pool.assign(tab, url)
+    slow.started_at -= 11
+    driver.crashed.add(crashed.handle)
+
+    assert pool.poll() == [slow, crashed]
+    assert loading.state == 'loading'
+    assert pool.next_printable() is None
+
+
+def test_replace_keeps_tab_id_and_closes_old_handle():
+    pool, driver, initialized = make_pool()
+    tab = pool.tabs[1]
+    pool.assign(tab, "u1")
+
+    pool.replace(tab)
+    assert (tab.tab_id, tab.handle, tab.state, tab.url) == (2, "tab-4", 'idle', None)
+    assert driver.closed == ["tab-2"] and initialized[-1] == "tab-4"
+
+    # CDP不可用时切换过去关闭，再切回新标签页
+    driver.cdp_fails = True
+    pool.replace(tab)
+    assert driver.closed == ["tab-2", "tab-4"]
+    assert tab.handle == driver.current_window_handle == "tab-5"
+    assert pool.replaced_tabs == 2
+
+
+def test_replace_survives_failure_to_close_old_tab():
+    pool, driver, _ = make_pool()
+    tab = pool.tabs[2]
+    driver.cdp_fails = True
+    driver.handles.remove(tab.handle)     # 旧标签页已经不存在，无法切换过去
+
+    pool.replace(tab)
+    assert tab.handle == "tab-4" and tab.state == 'idle'
+    assert pool.replaced_tabs == 1
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享工作队列测试 - 租约领取、过期重新分配、租约丢失和HTTP协调服务（令牌校验）
+"""
+
+import threading
+import time
+from urllib.error import HTTPError
+
+import pytest
+
+from work_queue import HTTPWorkQueue, LeasedLinkQueue, SQLiteWorkQueue, WorkQueueServer
+
+LINKS = [f"https://example.feishu.cn/wiki/doc{i}" for i in range(20)]
+
+
+def test_claims_in_order_and_completes(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    assert queue.enqueue(LINKS) == 20
+    assert queue.enqueue(LINKS[:5]) == 0
+
+    leases = queue.claim("worker-a", count=2)
+    assert [lease['url'] for lease in leases] == LINKS[:2]
+    assert queue.complete("worker-a", leases[0]['url'], leases[0]['token'])
+    assert not queue.complete("worker-b", leases[1]['url'], leases[1]['token'])
+    assert queue.release("worker-a", leases[1]['url'], leases[1]['token'])
+
+    stats = queue.stats()
+    assert (stats['done'], stats['pending'], stats['leased']) == (1, 19, 0)
+
+
+def test_expired_lease_is_reissued_and_old_token_rejected(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue(LINKS[:1])
+
+    first = queue.claim("worker-a", lease_seconds=0.05)[0]
+    assert queue.claim("worker-b") == []
+    time.sleep(0.1)
+
+    second = queue.claim("worker-b")[0]
+    assert second['url'] == first['url']
+    assert second['reissued'] and not first['reissued']
+    assert not queue.heartbeat("worker-a", first['url'], first['token'])
+    assert not queue.complete("worker-a", first['url'], first['token'])
+    assert queue.complete("worker-b", second['url'], second['token'])
+
+
+def test_depth_travels_with_the_queue_entry(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue(LINKS[:1])
+    queue.enqueue(LINKS[1:3], depth=2)
+    queue.enqueue(LINKS[2:3], depth=1)     # 已存在的链接取较小的深度
+
+    assert [lease['depth'] for lease in queue.claim("worker-a", count=3)] == [0, 2, 1]
+
+
+def test_concurrent_workers_never_share_a_document(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    SQLiteWorkQueue(db_path).enqueue(LINKS)
+    claimed = []
+
+    def worker(name):
+        queue = SQLiteWorkQueue(db_path)
+        while True:
+            leases = queue.claim(name)
+            if not leases:
+                return
+            claimed.append(leases[0]['url'])
+            queue.complete(name, leases[0]['url'], leases[0]['token'])
+
+    threads = [threading.Thread(target=worker, args=(f"worker-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(LINKS)
+
+
+def test_http_coordinator_with_leased_link_queue(tmp_path):
+    server = WorkQueueServer(SQLiteWorkQueue(str(tmp_path / "queue.db")), host="127.0.0.1", port=0).start()
+    try:
+        client = HTTPWorkQueue(server.url)
+        client.enqueue(LINKS[:3])
+
+        queue = LeasedLinkQueue(client, worker_id="remote-worker")
+        exported = []
+        while queue.has_work():
+            url = queue.claim_next()
+            if url == LINKS[1] and LINKS[1] not in exported:
+                exported.append(url)
+                queue.appendleft(url)
+                continue
+            assert queue.finish(url, "success")
+            exported.append(url)
+
+        assert not queue.wait_for_outstanding()
+        assert client.stats()['done'] == 3
+    finally:
+        server.stop()
+
+
+def test_remote_coordinator_requires_token(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    with pytest.raises(ValueError):
+        WorkQueueServer(queue, host="0.0.0.0", port=0)
+
+    server = WorkQueueServer(queue, host="127.0.0.1", port=0, token="secret").start()
+    try:
+        with pytest.raises(HTTPError) as error:
+            HTTPWorkQueue(server.url, token="wrong").enqueue(LINKS[:1])
+        assert error.value.code == 401
+        assert HTTPWorkQueue(server.url, token="secret").enqueue(LINKS[:1]) == 1
+    finally:
+        server.stop()
+
+
+def test_lost_lease_is_dropped_and_reported(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue(LINKS[:2])
+    leased = LeasedLinkQueue(queue, worker_id="worker-a", lease_seconds=0.05, heartbeat_interval=0.2)
+    first, second = leased.claim_next(), leased.claim_next()
+    leased.append(second)
+    time.sleep(0.1)
+    assert {lease['url'] for lease in queue.claim("worker-b", count=2)} == {first, second}
+
+    leased.start()
+    try:
+        deadline = time.time() + 5
+        while len(leased.lost_leases) < 2 and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        leased.stop()
+    assert leased.is_lost(first) and leased.is_lost(second)
+    # 排在本进程队尾的文档也不再处理，提交结果时不会误用旧令牌
+    assert leased.claim_next() is None
+    assert not leased.finish(first, "success")
+    assert not leased.is_lost(first)
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享导出工作队列（租约模式）
+把同一批链接分给多个导出进程/多台机器：每个工作进程领取（claim）文档时获得一个有时限的租约，
+处理期间定期续约（heartbeat），完成后提交（complete）或退回（release）。
+租约过期未续约的文档会自动重新分配，提交时校验租约令牌，保证不会重复导出或丢失文档。
+
+两种后端：
+- SQLiteWorkQueue：本机多个进程共享一个SQLite文件
+- HTTPWorkQueue：通过 WorkQueueServer（简单的本地HTTP协调服务）跨机器共享
+
+协调服务默认只监听本机（127.0.0.1）；监听其他地址供其他机器访问时必须设置共享令牌
+（--token 或环境变量 FEISHU_WORK_QUEUE_TOKEN），客户端在请求头中携带相同的令牌。
+
+用法：
+    python3 work_queue.py serve --links feishu_links.txt --port 8765   # 启动协调服务（仅本机）
+    python3 work_queue.py serve --host 0.0.0.0 --token <令牌>          # 开放给其他机器
+    python3 work_queue.py stats --url http://127.0.0.1:8765            # 查看队列状态
+"""
+
+import argparse
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urllib_request
+
+DEFAULT_QUEUE_DB = "feishu_exports/work_queue.db"
+DEFAULT_HOST = "127.0.0.1"
+
+# 共享令牌的环境变量（命令行未指定 --token 时使用）
+TOKEN_ENV = "FEISHU_WORK_QUEUE_TOKEN"
+TOKEN_HEADER = "X-Work-Queue-Token"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_items (
+    url TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    completed_at REAL,
+    depth INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_queue_pending ON queue_items(state, position);
+CREATE INDEX IF NOT EXISTS idx_queue_leases ON queue_items(state, lease_expires);
+"""
+
+
+def default_worker_id():
+    """主机名+进程号，作为工作进程标识"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def is_loopback(host):
+    """监听地址是否只接受本机连接"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class SQLiteWorkQueue:
+    def __init__(self, db_path=DEFAULT_QUEUE_DB, lease_seconds=300, max_attempts=3):
+        """
+        初始化SQLite工作队列
+
+        Args:
+            db_path (str): 队列数据库路径
+            lease_seconds (int): 默认租约时长（秒），超时未续约的文档会被重新分配
+            max_attempts (int): 同一文档最多被领取的次数，超过后标记为失败
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        # 旧版本创建的队列库没有 depth 列
+        if 'depth' not in {row['name'] for row in conn.execute("PRAGMA table_info(queue_items)")}:
+            conn.execute("ALTER TABLE queue_items ADD COLUMN depth INTEGER NOT NULL DEFAULT 0")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def enqueue(self, urls, depth=0):
+        """
+        加入链接（已存在的链接保持原状态），返回新加入的数量
+
+        Args:
+            urls (list): 链接
+            depth (int): 链接闭包中的深度（链接文件中的文档为0），随租约一起返回给领取的进程；
+                         已存在的链接取较小的深度
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT COALESCE(MAX(position), -1) AS last FROM queue_items").fetchone()
+            position = row['last'] + 1
+            added = 0
+            for url in urls:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO queue_items (url, position, depth) VALUES (?, ?, ?)",
+                    (url, position, depth))
+                if cursor.rowcount:
+                    added += 1
+                    position += 1
+                else:
+                    conn.execute("UPDATE queue_items SET depth = ? WHERE url = ? AND depth > ?", (depth, url, depth))
+        return added
+
+    def claim(self, worker_id, count=1, lease_seconds=None):
+        """
+        领取文档（优先按加入顺序领取待处理文档，其次是租约已过期的文档）
+
+        Returns:
+            list: [{'url': ..., 'token': ..., 'expires': ..., 'depth': ..., 'reissued': ...}]，
+                  reissued 表示该文档的上一个租约已过期（持有它的进程已退出或失去响应）
+        """
+        lease_seconds = lease_seconds or self.lease_seconds
+        now = time.time()
+        leases = []
+        with self._transaction() as conn:
+            # 超过最大尝试次数且租约已过期的文档不再分配
+            conn.execute(
+                "UPDATE queue_items SET state = 'failed', result = 'lease_expired', lease_owner = NULL "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts))
+            rows = conn.execute(
+                "SELECT url, depth, state FROM queue_items WHERE state = 'pending' ORDER BY position LIMIT ?",
+                (count,)).fetchall()
+            if len(rows) < count:
+                rows += conn.execute(
+                    "SELECT url, depth, state FROM queue_items WHERE state = 'leased' AND lease_expires < ? "
+                    "ORDER BY position LIMIT ?", (now, count - len(rows))).fetchall()
+            for row in rows:
+                token = uuid.uuid4().hex
+                expires = now + lease_seconds
+                conn.execute(
+                    "UPDATE queue_items SET state = 'leased', lease_owner = ?, lease_token = ?, "
+                    "lease_expires = ?, attempts = attempts + 1 WHERE url = ?",
+                    (worker_id, token, expires, row['url']))
+                leases.append({'url': row['url'], 'token': token, 'expires': expires, 'depth': row['depth'],
+                               'reissued': row['state'] == 'leased'})
+        return leases
+
+    def heartbeat(self, worker_id, url, token, lease_seconds=None):
+        """续约，返回False表示租约已丢失（已过期并被重新分配）"""
+        lease_seconds = lease_seconds or self.lease_seconds
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE queue_items SET lease_expires = ? "
+                "WHERE url = ? AND state = 'leased' AND lease_owner = ? AND lease_token = ?",
+                (time.time() + lease_seconds, url, worker_id, token))
+            return cursor.rowcount == 1
+
+    def complete(self, worker_id, url, token, result="success"):
+        """提交处理结果（success/failed/timeout），租约不匹配时返回False"""
+        state = 'done' if result == 'success' else 'failed'
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE queue_items SET state = ?, result = ?, completed_at = ?, lease_owner = NULL, "
+                "lease_token = NULL, lease_expires = NULL "
+                "WHERE url = ? AND state = 'leased' AND lease_owner = ? AND lease_token = ?",
+                (state, result, time.time(), url, worker_id, token))
+            return cursor.rowcount == 1
+
+    def release(self, worker_id, url, token):
+        """退回文档，立即可被任意工作进程重新领取"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE queue_items SET state = 'pending', lease_owner = NULL, lease_token = NULL, "
+                "lease_expires = NULL "
+                "WHERE url = ? AND state = 'leased' AND lease_owner = ? AND lease_token = ?",
+                (url, worker_id, token))
+            return cursor.rowcount == 1
+
+    def stats(self):
+        """队列统计：各状态数量及已过期的租约数"""
+        conn = self._connect()
+        counts = {row['state']: row['n'] for row in
+                  conn.execute("SELECT state, COUNT(*) AS n FROM queue_items GROUP BY state")}
+        expired = conn.execute(
+            "SELECT COUNT(*) AS n FROM queue_items WHERE state = 'leased' AND lease_expires < ?",
+            (time.time(),)).fetchone()['n']
+        return {
+            'total': sum(counts.values()),
+            'pending': counts.get('pending', 0),
+            'leased': counts.get('leased', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'expired_leases': expired,
+        }
+
+
+class WorkQueueServer:
+    def __init__(self, queue, host=DEFAULT_HOST, port=8765, token=None):
+        """
+        简单的HTTP协调服务，把工作队列开放给其他机器上的导出进程
+
+        Args:
+            queue (SQLiteWorkQueue): 实际存储队列的后端
+            host (str): 监听地址（默认只监听本机）
+            port (int): 监听端口（0表示随机端口）
+            token (str): 共享令牌，设置后每个请求都必须携带；监听非本机地址时必须设置
+        """
+        if not token and not is_loopback(host):
+            raise ValueError(f"监听 {host} 时必须设置共享令牌（--token 或环境变量 {TOKEN_ENV}）")
+        self.queue = queue
+        handler = self._make_handler(queue, token)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+    @staticmethod
+    def _make_handler(queue, token):
+        actions = {
+            '/enqueue': lambda p: {'added': queue.enqueue(p['urls'], p.get('depth', 0))},
+            '/claim': lambda p: {'leases': queue.claim(p['worker_id'], p.get('count', 1), p.get('lease_seconds'))},
+            '/heartbeat': lambda p: {'ok': queue.heartbeat(p['worker_id'], p['url'], p['token'],
+                                                           p.get('lease_seconds'))},
+            '/complete': lambda p: {'ok': queue.complete(p['worker_id'], p['url'], p['token'],
+                                                         p.get('result', 'success'))},
+            '/release': lambda p: {'ok': queue.release(p['worker_id'], p['url'], p['token'])},
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, status, data):
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _authorized(self):
+                if not token:
+                    return True
+                if hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), token):
+                    return True
+                self._send_json(401, {'error': 'unauthorized'})
+                return False
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                if self.path == '/stats':
+                    self._send_json(200, queue.stats())
+                else:
+                    self._send_json(404, {'error': 'not found'})
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                action = actions.get(self.path)
+                if not action:
+                    self._send_json(404, {'error': 'not found'})
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                    self._send_json(200, action(payload))
+                except (KeyError, ValueError) as e:
+                    self._send_json(400, {'error': str(e)})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class HTTPWorkQueue:
+    def __init__(self, base_url, timeout=30, token=None):
+        """
+        协调服务的客户端，接口与 SQLiteWorkQueue 相同
+
+        Args:
+            base_url (str): 协调服务地址，如 http://10.0.0.5:8765
+            timeout (int): 请求超时（秒）
+            token (str): 共享令牌，默认取环境变量 FEISHU_WORK_QUEUE_TOKEN
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.token = token or os.environ.get(TOKEN_ENV)
+
+    def _call(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers[TOKEN_HEADER] = self.token
+        req = urllib_request.Request(self.base_url + path, data=data, headers=headers)
+        with urllib_request.urlopen(req, timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def enqueue(self, urls, depth=0):
+        return self._call('/enqueue', {'urls': list(urls), 'depth': depth})['added']
+
+    def claim(self, worker_id, count=1, lease_seconds=None):
+        return self._call('/claim', {'worker_id': worker_id, 'count': count,
+                                     'lease_seconds': lease_seconds})['leases']
+
+    def heartbeat(self, worker_id, url, token, lease_seconds=None):
+        return self._call('/heartbeat', {'worker_id': worker_id, 'url': url, 'token': token,
+                                         'lease_seconds': lease_seconds})['ok']
+
+    def complete(self, worker_id, url, token, result="success"):
+        return self._call('/complete', {'worker_id': worker_id, 'url': url, 'token': token,
+                                        'result': result})['ok']
+
+    def release(self, worker_id, url, token):
+        return self._call('/release', {'worker_id': worker_id, 'url': url, 'token': token})['ok']
+
+    def stats(self):
+        return self._call('/stats')
+
+
+class LeasedLinkQueue:
+    def __init__(self, work_queue, worker_id=None, lease_seconds=300, heartbeat_interval=60, poll_interval=5,
+                 on_reissued=None):
+        """
+        把共享工作队列包装成导出循环使用的队列接口（has_work/claim_next/appendleft/append），
+        并在后台线程中为所有持有的租约续约
+
+        Args:
+            work_queue: SQLiteWorkQueue 或 HTTPWorkQueue
+            worker_id (str): 工作进程标识，默认为 主机名:进程号
+            lease_seconds (int): 租约时长（秒）
+            heartbeat_interval (int): 续约间隔（秒），应明显小于租约时长
+            poll_interval (int): 其他进程仍持有租约时，等待其完成或过期的轮询间隔（秒）
+            on_reissued (callable): 领取到其他进程过期的租约时的回调，参数为链接
+        """
+        self.work_queue = work_queue
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.on_reissued = on_reissued
+
+        self._buffer = deque()
+        self._active = {}
+        self._lost = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.lost_leases = []
+
+    def start(self):
+        """启动续约线程"""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._heartbeat_loop, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止续约并退回所有未完成的租约"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            leases = list(self._buffer) + list(self._active.values())
+            self._buffer.clear()
+            self._active.clear()
+        for lease in leases:
+            try:
+                self.work_queue.release(self.worker_id, lease['url'], lease['token'])
+            except Exception as e:
+                print(f"⚠️  退回租约失败: {lease['url']} {e}")
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(self.heartbeat_interval):
+            with self._lock:
+                leases = list(self._buffer) + list(self._active.values())
+            for lease in leases:
+                try:
+                    ok = self.work_queue.heartbeat(self.worker_id, lease['url'], lease['token'], self.lease_seconds)
+                except Exception as e:
+                    print(f"⚠️  续约失败: {e}")
+                    continue
+                if not ok:
+                    self._drop_lost(lease)
+
+    def _drop_lost(self, lease):
+        """租约已被重新分配给其他工作进程：不再持有和续约，正在处理的文档由 is_lost 通知导出流程取消"""
+        url = lease['url']
+        with self._lock:
+            if self._active.get(url) is lease:
+                del self._active[url]
+            elif lease in self._buffer:
+                self._buffer.remove(lease)
+            else:
+                return
+            self._lost.add(url)
+        print(f"⚠️  租约已丢失（已被重新分配），取消处理: {url}")
+        self.lost_leases.append(url)
+
+    def is_lost(self, url):
+        """文档的租约是否已丢失（之后重新领取到该文档时恢复为False）"""
+        with self._lock:
+            return url in self._lost
+
+    def has_work(self):
+        """当前是否还有可领取的文档（只查询，不领取；不等待其他进程持有的租约）"""
+        with self._lock:
+            if self._buffer:
+                return True
+        stats = self.work_queue.stats()
+        return bool(stats['pending'] or stats['expired_leases'])
+
+    def claim_next(self):
+        """
+        领取下一个文档
+
+        Returns:
+            str: 文档URL；没有可领取的文档时返回None
+        """
+        with self._lock:
+            lease = self._buffer.popleft() if self._buffer else None
+        if lease is None:
+            leases = self.work_queue.claim(self.worker_id, 1, self.lease_seconds)
+            if not leases:
+                return None
+            lease = leases[0]
+            if lease.get('reissued') and self.on_reissued:
+                self.on_reissued(lease['url'])
+        with self._lock:
+            self._active[lease['url']] = lease
+            self._lost.discard(lease['url'])
+        return lease['url']
+
+    def appendleft(self, url):
+        """放回文档：退回租约，任意工作进程（包括本进程）都可以重新领取"""
+        with self._lock:
+            lease = self._active.pop(url, None)
+        if lease:
+            self.work_queue.release(self.worker_id, url, lease['token'])
+
+    def append(self, url):
+        """把文档排到本进程队列末尾稍后重试（保留租约，续约线程继续续约）"""
+        with self._lock:
+            lease = self._active.pop(url, None)
+            if lease:
+                self._buffer.append(lease)
+
+    def depth(self, url):
+        """正在处理的文档在链接闭包中的深度（由加入队列的进程记录，任何进程领取都相同）"""
+        with self._lock:
+            lease = self._active.get(url)
+        return lease.get('depth') if lease else None
+
+    def finish(self, url, result):
+        """
+        提交文档处理结果
+
+        Returns:
+            bool: 租约仍然有效并提交成功时返回True
+        """
+        with self._lock:
+            lease = self._active.pop(url, None)
+            self._lost.discard(url)
+        if not lease:
+            return False
+        ok = self.work_queue.complete(self.worker_id, url, lease['token'], result)
+        if not ok:
+            print(f"⚠️  提交结果时租约已失效: {url}")
+        return ok
+
+    def wait_for_outstanding(self):
+        """
+        本进程已无可领取的文档时，等待其他进程持有的租约完成或过期
+
+        Returns:
+            bool: 有新的可领取文档时返回True；全部完成时返回False
+        """
+        while True:
+            stats = self.work_queue.stats()
+            if stats['pending'] or stats['expired_leases']:
+                return True
+            if not stats['leased']:
+                return False
+            print(f"⏳ 其他导出进程仍在处理 {stats['leased']} 个文档，等待中...")
+            time.sleep(self.poll_interval)
+
+
+class LocalLinkQueue(deque):
+    """本进程内的导出队列，提供与 LeasedLinkQueue 相同的 has_work/claim_next 接口"""
+
+    def has_work(self):
+        return bool(self)
+
+    def claim_next(self):
+        return self.popleft() if self else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享导出工作队列")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve", help="启动HTTP协调服务")
+    serve.add_argument("--db", default=DEFAULT_QUEUE_DB, help="队列数据库路径")
+    serve.add_argument("--links", help="启动时加入队列的链接文件")
+    serve.add_argument("--host", default=DEFAULT_HOST, help="监听地址（默认只监听本机）")
+    serve.add_argument("--token", default=os.environ.get(TOKEN_ENV),
+                       help=f"共享令牌（默认取环境变量 {TOKEN_ENV}），监听非本机地址时必须设置")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--lease-seconds", type=int, default=300)
+
+    stats = subparsers.add_parser("stats", help="查看队列状态")
+    stats.add_argument("--db", default=DEFAULT_QUEUE_DB, help="队列数据库路径")
+    stats.add_argument("--url", help="协调服务地址（指定时忽略 --db）")
+    stats.add_argument("--token", help=f"共享令牌（默认取环境变量 {TOKEN_ENV}）")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        queue = SQLiteWorkQueue(args.db, lease_seconds=args.lease_seconds)
+        try:
+            server = WorkQueueServer(queue, args.host, args.port, token=args.token)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        if args.links:
+            with open(args.links, 'r', encoding='utf-8') as f:
+                links = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+            print(f"📋 新加入队列 {queue.enqueue(links)} 个链接")
+        print(f"🚀 工作队列协调服务已启动: {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n👋 协调服务已停止")
+    else:
+        queue = HTTPWorkQueue(args.url, token=args.token) if args.url else SQLiteWorkQueue(args.db)
+        print(json.dumps(queue.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()